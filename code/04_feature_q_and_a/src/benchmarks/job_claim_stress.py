@@ -0,0 +1,105 @@
+# Stress test for the BackgroundJob queue: many processes, each with many concurrent claimers, drain a
+# queue of jobs from a local MongoDB. Every job must be claimed exactly once. Use --racy to run the same
+# load through the old read, check, then save claim and see the double claims it allowed.
+#
+# Needs MongoDB running locally. Uses its own scratch database, whose jobs collection it empties.
+# Run from the src folder:
+#
+#     python -m benchmarks.job_claim_stress --jobs 5000 --processes 4 --claimers 16
+#
+import argparse
+import asyncio
+import collections
+import datetime
+import multiprocessing
+import time
+
+from db import mongo_setup
+from db.job import BackgroundJob, JobActions, JobStatus
+from services import background_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stress test concurrent BackgroundJob claiming.')
+    parser.add_argument('--jobs', type=int, default=5_000)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--claimers', type=int, default=16, help='Concurrent claimers per process.')
+    parser.add_argument('--racy', action='store_true', help='Claim with the old read, check, then save.')
+    parser.add_argument('--database', default='xray_podcasts_stress')
+    parser.add_argument('--server', default='localhost')
+    parser.add_argument('--port', type=int, default=27017)
+    args = parser.parse_args()
+
+    if args.database == 'xray_podcasts':
+        raise SystemExit('Refusing to empty the jobs of the app database, use a scratch --database.')
+
+    asyncio.run(create_jobs(args))
+
+    t0 = time.perf_counter()
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(args.processes) as pool:
+        claimed = pool.map(claim_in_process, [args] * args.processes)
+    dt = time.perf_counter() - t0
+
+    counts = collections.Counter(job_id for ids in claimed for job_id in ids)
+    duplicates = sum(1 for c in counts.values() if c > 1)
+    total = sum(counts.values())
+
+    print(f'{args.processes} processes x {args.claimers} claimers, {"racy" if args.racy else "atomic"} claims.')
+    print(f'Claimed {total:,} times for {len(counts):,} of {args.jobs:,} jobs in {dt:,.2f} sec '
+          f'({total / dt:,.0f} claims/sec).')
+    print(f'Jobs claimed more than once: {duplicates:,}, never claimed: {args.jobs - len(counts):,}.')
+
+
+async def create_jobs(args: argparse.Namespace):
+    await mongo_setup.init_connection(args.database, server=args.server, port=args.port)
+    collection = BackgroundJob.get_motor_collection()
+    await collection.delete_many({})
+
+    now = datetime.datetime.now()
+    actions = list(JobActions)
+    await collection.insert_many([
+        BackgroundJob(
+            action=actions[idx % len(actions)], podcast_id='stress-test', episode_number=idx,
+            created_date=now + datetime.timedelta(microseconds=idx),
+        ).model_dump(exclude={'id'})
+        for idx in range(args.jobs)
+    ])
+
+
+def claim_in_process(args: argparse.Namespace) -> list[str]:
+    return asyncio.run(claim_all(args))
+
+
+async def claim_all(args: argparse.Namespace) -> list[str]:
+    await mongo_setup.init_connection(args.database, server=args.server, port=args.port)
+    claim = claim_racy if args.racy else background_service.claim_job
+
+    async def claimer() -> list[str]:
+        ids = []
+        while job := await claim():
+            ids.append(str(job.id))
+        return ids
+
+    results = await asyncio.gather(*(claimer() for _ in range(args.claimers)))
+    return [job_id for ids in results for job_id in ids]
+
+
+async def claim_racy():
+    # How jobs were claimed before claim_job(): find a waiting job, check it, then save it as processing.
+    job = await BackgroundJob.find(
+        BackgroundJob.processing_status == JobStatus.awaiting
+    ).sort('created_date').first_or_none()
+    if not job:
+        return None
+
+    await asyncio.sleep(0)
+    await BackgroundJob.get_motor_collection().update_one(
+        {'_id': job.id}, {'$set': {'processing_status': JobStatus.processing, 'started_date': datetime.datetime.now()}}
+    )
+
+    return job
+
+
+if __name__ == '__main__':
+    main()
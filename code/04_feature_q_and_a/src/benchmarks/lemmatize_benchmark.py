@@ -0,0 +1,61 @@
+# Compares per-episode lemmatization (the old indexer loop) against the batched nlp.pipe path.
+#
+# Run from the src folder:
+#
+#     python -m benchmarks.lemmatize_benchmark --docs 200 --words 15000 --batch-size 16 --n-process 4
+#
+import argparse
+import random
+import time
+
+from services import search_service
+
+sample_text = (
+    'Welcome to the show. Today we are talking about Python, asyncio, and the removal of the GIL. '
+    'Our guest has been building web frameworks and data pipelines for years, and they share '
+    'what it takes to run free-threaded Python in production. We cover packaging, type hints, '
+    'performance profiling, and why async database drivers matter for FastAPI and MongoDB apps. '
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark search indexer lemmatization throughput.')
+    parser.add_argument('--docs', type=int, default=100, help='Number of synthetic episodes.')
+    parser.add_argument('--words', type=int, default=15_000, help='Words per episode, ~15k for 90 minutes.')
+    parser.add_argument('--batch-size', type=int, default=search_service.indexing_batch_size)
+    # The app sticks to one process (see indexing_n_process), this compares what more would buy offline.
+    parser.add_argument('--n-process', type=int, default=2)
+    args = parser.parse_args()
+
+    if not search_service.load_search_model():
+        return
+
+    texts = build_texts(args.docs, args.words)
+    print(f'Benchmarking {len(texts):,} docs of {args.words:,} words each.')
+
+    t0 = time.perf_counter()
+    old_results = [search_service.build_keyword_counts(t) for t in texts]
+    dt_old = time.perf_counter() - t0
+    print(f'One doc at a time:  {len(texts) / dt_old:,.2f} docs/sec ({dt_old:,.1f} sec)')
+
+    search_service.indexing_batch_size = args.batch_size
+    search_service.indexing_n_process = args.n_process
+
+    t0 = time.perf_counter()
+    new_results = search_service.build_keyword_counts_batch(texts)
+    dt_new = time.perf_counter() - t0
+    print(f'nlp.pipe batch={args.batch_size} n_process={args.n_process}: '
+          f'{len(texts) / dt_new:,.2f} docs/sec ({dt_new:,.1f} sec)')
+
+    print(f'Speedup: {dt_old / dt_new:,.2f}x, identical keywords: {old_results == new_results}')
+
+
+def build_texts(doc_count: int, word_count: int) -> list[str]:
+    words = sample_text.split()
+    rnd = random.Random(42)
+
+    return [' '.join(rnd.choice(words) for _ in range(word_count)) for _ in range(doc_count)]
+
+
+if __name__ == '__main__':
+    main()
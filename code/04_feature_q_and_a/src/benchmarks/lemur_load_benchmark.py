@@ -0,0 +1,112 @@
+# Load test for page latency while LeMUR summaries run in the same process. Pages are requested at a
+# steady rate through the ASGI app while summaries run alongside them, once the old way (the SDK's
+# blocking Lemur.task(), one prompt after the other) and once through assemblyai_service. AssemblyAI
+# is faked with an httpx.MockTransport that takes --lemur-sec to answer, no API key or network needed.
+#
+# Run from the src folder:
+#
+#     python -m benchmarks.lemur_load_benchmark --summaries 4 --lemur-sec 2 --pages-per-sec 50
+#
+import argparse
+import asyncio
+import statistics
+import time
+
+import assemblyai
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse
+from starlette.routing import Route
+
+from services import assemblyai_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Page latency while LeMUR summaries run.')
+    parser.add_argument('--summaries', type=int, default=4, help='Episodes summarized during the run.')
+    parser.add_argument('--lemur-sec', type=float, default=2.0, help='How long the fake LeMUR takes to answer.')
+    parser.add_argument('--pages-per-sec', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f'{"Mode":<10} {"Summaries (sec)":>16} {"Pages":>6} {"p50 (ms)":>9} {"p99 (ms)":>9} {"max (ms)":>9}')
+    for mode in ['idle', 'blocking', 'async']:
+        asyncio.run(run_mode(mode, args))
+
+
+async def run_mode(mode: str, args: argparse.Namespace):
+    assemblyai.settings.api_key = 'benchmark'
+    assemblyai_service.transport = httpx.MockTransport(fake_lemur(args.lemur_sec))
+    await assemblyai_service.close()
+
+    pages = httpx.AsyncClient(transport=httpx.ASGITransport(app=page_app()), base_url='http://benchmark')
+
+    t0 = time.perf_counter()
+    if mode == 'idle':
+        summaries = asyncio.ensure_future(asyncio.sleep(args.lemur_sec * 2))
+    else:
+        summarize = summarize_blocking if mode == 'blocking' else summarize_async
+        summaries = asyncio.gather(*(summarize(args.lemur_sec) for _ in range(args.summaries)))
+    summaries.add_done_callback(lambda _: record_summary_time(mode, t0))
+
+    # Latency counts from when the page was due, a page stuck behind a blocked loop is a slow page.
+    # Every page due while the summaries ran is requested, even if the loop only gets to it afterwards.
+    latencies = []
+    due = t0
+    while True:
+        due += 1 / args.pages_per_sec
+        if summaries.done() and due > t0 + summary_times[mode]:
+            break
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        response = await pages.get('/page')
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - due) * 1000)
+
+    await summaries
+    await pages.aclose()
+    await assemblyai_service.close()
+
+    latencies.sort()
+    print(f'{mode:<10} {summary_times[mode]:>16.1f} {len(latencies):>6} {statistics.median(latencies):>9.1f} '
+          f'{latencies[int(len(latencies) * 0.99)]:>9.1f} {latencies[-1]:>9.1f}')
+
+
+summary_times: dict[str, float] = {}
+
+
+def record_summary_time(mode: str, t0: float):
+    summary_times[mode] = time.perf_counter() - t0
+
+
+async def summarize_blocking(lemur_sec: float):
+    # What worker_summarize_episode used to do: two synchronous HTTP calls inside the coroutine.
+    time.sleep(lemur_sec)
+    time.sleep(lemur_sec)
+
+
+async def summarize_async(_: float):
+    # What worker_summarize_episode does now.
+    await asyncio.gather(
+        assemblyai_service.lemur_task('TL;DR prompt', 'transcript text', max_output_size=2000, temperature=0.25,
+                                     background=True),
+        assemblyai_service.lemur_task('Key moments prompt', 'transcript text', max_output_size=2000, temperature=0.25,
+                                     background=True),
+    )
+
+
+def fake_lemur(lemur_sec: float):
+    async def handler(_: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(lemur_sec)
+        return httpx.Response(200, json={'request_id': 'benchmark', 'response': 'A summary.'})
+
+    return handler
+
+
+def page_app() -> Starlette:
+    async def page(_):
+        return HTMLResponse('<html><body>' + '<p>An episode page.</p>' * 200 + '</body></html>')
+
+    return Starlette(routes=[Route('/page', page)])
+
+
+if __name__ == '__main__':
+    main()
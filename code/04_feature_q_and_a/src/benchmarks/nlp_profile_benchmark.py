@@ -0,0 +1,88 @@
+# Compares startup time, memory, and query latency of the search_service NLP profiles.
+# Each profile is loaded in its own fresh process so the RSS numbers don't bleed into each other.
+#
+# Run from the src folder (the models need to be downloaded first):
+#
+#     python -m benchmarks.nlp_profile_benchmark --profiles full lemma-only small
+#
+import argparse
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+
+sample_queries = [
+    'python asyncio',
+    'GIL removal',
+    'fastapi and mongodb',
+    'hackers breaking into banks',
+    'type hints for data science',
+    'running free-threaded python',
+    'podcasting about security',
+    'what is new in django',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark spaCy NLP profiles for search queries.')
+    parser.add_argument('--profiles', nargs='+', default=['full', 'lemma-only', 'small'])
+    parser.add_argument('--rounds', type=int, default=200, help='How many times to run the query set.')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    for profile in args.profiles:
+        with ctx.Pool(1) as pool:
+            results[profile] = pool.apply(measure_profile, (profile, args.rounds))
+
+    print()
+    print(f'{"Profile":<12} {"Load (s)":>9} {"RSS (MB)":>9} {"p50 (ms)":>9} {"p95 (ms)":>9}')
+    for profile, r in results.items():
+        if r is None:
+            print(f'{profile:<12} model not installed')
+            continue
+        print(f'{profile:<12} {r["load_sec"]:>9.2f} {r["rss_mb"]:>9,.0f} {r["p50_ms"]:>9.3f} {r["p95_ms"]:>9.3f}')
+
+    loaded = {p: r for p, r in results.items() if r}
+    baseline = loaded.get('full')
+    if baseline:
+        print()
+        for profile, r in loaded.items():
+            same = r['keywords'] == baseline['keywords']
+            print(f'Keywords for {profile} identical to full: {same}')
+
+
+def measure_profile(profile: str, rounds: int):
+    from services import search_service
+
+    t0 = time.perf_counter()
+    if not search_service.load_search_model(profile):
+        return None
+    load_sec = time.perf_counter() - t0
+
+    timings = []
+    for _ in range(rounds):
+        for q in sample_queries:
+            t0 = time.perf_counter()
+            search_service.build_keywords(q)
+            timings.append((time.perf_counter() - t0) * 1000)
+
+    timings.sort()
+    return {
+        'load_sec': load_sec,
+        'rss_mb': max_rss_mb(),
+        'p50_ms': statistics.median(timings),
+        'p95_ms': timings[int(len(timings) * 0.95)],
+        'keywords': [sorted(search_service.build_keywords(q)) for q in sample_queries],
+    }
+
+
+def max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes.
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+if __name__ == '__main__':
+    main()
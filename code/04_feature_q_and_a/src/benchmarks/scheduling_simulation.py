@@ -0,0 +1,153 @@
+# Simulates the transcribe queue under each job scheduling policy and reports how long jobs wait to
+# be claimed: a bulk import of a back catalog lands at once, a power user clicks through dozens of
+# episodes, and casual users keep asking for the odd transcript. Jobs are ordered with the policies'
+# own sort specs (and fair share's user order) from services/job_scheduler.py, no database needed.
+#
+# Run from the src folder:
+#
+#     python -m benchmarks.scheduling_simulation --bulk 500 --casual-per-hour 12 --hours 6
+#
+import argparse
+import datetime
+import heapq
+import random
+import statistics
+from typing import Optional
+
+from db.job import JobActions
+from services import background_service, job_scheduler
+
+start = datetime.datetime(2024, 1, 1)
+
+
+class SimJob:
+    __slots__ = ['kind', 'user_id', 'priority', 'duration_in_sec', 'created_date', 'arrival', 'run_seconds']
+
+    def __init__(self, kind: str, user_id: Optional[str], priority: int, duration: int, arrival: float, speed: float):
+        self.kind = kind
+        self.user_id = user_id
+        self.priority = priority
+        self.duration_in_sec = duration
+        self.arrival = arrival
+        self.created_date = start + datetime.timedelta(seconds=arrival)
+        # AssemblyAI turnaround grows with the audio length, plus a fixed overhead for upload and polling.
+        self.run_seconds = 30 + duration * speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate job wait times under each scheduling policy.')
+    parser.add_argument('--bulk', type=int, default=500, help='Episodes in the bulk import, queued at the start.')
+    parser.add_argument('--power-clicks', type=int, default=60, help='Episodes the power user asks for.')
+    parser.add_argument('--power-at', type=float, default=10, help='Minutes in when the power user shows up.')
+    parser.add_argument('--casual-per-hour', type=float, default=12, help='Casual user requests per hour.')
+    parser.add_argument('--hours', type=float, default=6, help='How long casual users keep arriving.')
+    parser.add_argument('--slots', type=int, default=background_service.max_jobs_per_action[JobActions.transcribe])
+    parser.add_argument('--speed', type=float, default=0.25, help='Transcription time as a fraction of audio.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    jobs = build_workload(args)
+    print(f'{len(jobs):,} jobs on {args.slots} slots: {args.bulk} bulk, {args.power_clicks} from a power user, '
+          f'{sum(1 for j in jobs if j.kind == "casual")} casual. Wait in minutes until claimed.')
+    print()
+    print(f'{"Policy":<15} {"Class":<8} {"Jobs":>6} {"Mean":>8} {"p95":>8} {"Max":>8}')
+
+    for name, policy in job_scheduler.policies.items():
+        waits = simulate(jobs, policy, args.slots)
+        for kind in ['casual', 'power', 'bulk', 'all']:
+            values = sorted(w for j, w in waits if kind in ('all', j.kind))
+            if not values:
+                continue
+            print(f'{name:<15} {kind:<8} {len(values):>6,} {statistics.mean(values) / 60:>8,.1f} '
+                  f'{percentile(values, 0.95) / 60:>8,.1f} {values[-1] / 60:>8,.1f}')
+        print()
+
+
+def build_workload(args: argparse.Namespace) -> list[SimJob]:
+    rnd = random.Random(args.seed)
+
+    def duration() -> int:
+        # Mostly 20 to 90 minute episodes, the odd 3 hour one.
+        minutes = rnd.uniform(90, 180) if rnd.random() < 0.25 else rnd.uniform(20, 90)
+        return int(minutes * 60)
+
+    jobs = [
+        SimJob('bulk', None, job_scheduler.bulk_priority, duration(), i * 0.01, args.speed)
+        for i in range(args.bulk)
+    ]
+    jobs.extend(
+        SimJob('power', 'power', job_scheduler.interactive_priority, duration(), args.power_at * 60 + i * 5, args.speed)
+        for i in range(args.power_clicks)
+    )
+
+    t = 0.0
+    casual = 0
+    while True:
+        t += rnd.expovariate(args.casual_per_hour / 3600)
+        if t > args.hours * 3600:
+            break
+        casual += 1
+        jobs.append(SimJob('casual', f'casual-{casual}', job_scheduler.interactive_priority, duration(), t, args.speed))
+
+    jobs.sort(key=lambda j: j.arrival)
+    return jobs
+
+
+def simulate(jobs: list[SimJob], policy: job_scheduler.SchedulingPolicy, slots: int) -> list[tuple[SimJob, float]]:
+    waiting: list[SimJob] = []
+    running: dict[Optional[str], int] = {}
+    finishing: list[tuple[float, int, SimJob]] = []
+    waits: list[tuple[SimJob, float]] = []
+
+    arrivals = iter(jobs)
+    upcoming = next(arrivals, None)
+    now = 0.0
+    while upcoming or waiting or finishing:
+        # Next event: an arrival or a job finishing, finishes first on a tie so their slot is reused.
+        if finishing and (upcoming is None or finishing[0][0] <= upcoming.arrival):
+            now, _, job = heapq.heappop(finishing)
+            running[job.user_id] -= 1
+        else:
+            now = upcoming.arrival
+            waiting.append(upcoming)
+            upcoming = next(arrivals, None)
+
+        while waiting and len(finishing) < slots:
+            job = claim(waiting, running, policy)
+            waiting.remove(job)
+            running[job.user_id] = running.get(job.user_id, 0) + 1
+            heapq.heappush(finishing, (now + job.run_seconds, id(job), job))
+            waits.append((job, now - job.arrival))
+
+    return waits
+
+
+def claim(waiting: list[SimJob], running: dict, policy: job_scheduler.SchedulingPolicy) -> SimJob:
+    candidates = waiting
+    if policy.candidates:
+        oldest: dict = {}
+        for job in waiting:
+            oldest[job.user_id] = min(oldest.get(job.user_id, job.created_date), job.created_date)
+        user_id = job_scheduler.fair_share_order(oldest, running)[0]
+        candidates = [j for j in waiting if j.user_id == user_id]
+
+    return min(candidates, key=lambda j: sort_key(j, policy.sort))
+
+
+def sort_key(job: SimJob, sort: list[tuple[str, int]]) -> tuple:
+    key = []
+    for field, direction in sort:
+        value = getattr(job, field)
+        if isinstance(value, datetime.datetime):
+            value = (value - start).total_seconds()
+        key.append(value * direction)
+
+    return tuple(key)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Measures the in-memory semantic and hybrid search at catalog sizes well beyond what we host today.
+# Vectors and keywords are synthetic, so no spaCy model or MongoDB is needed.
+#
+# Run from the src folder:
+#
+#     python -m benchmarks.semantic_benchmark --episodes 10000 100000 --chunks 4
+#
+import argparse
+import datetime
+import random
+import statistics
+import time
+
+import numpy as np
+
+from services import search_engine
+
+vocabulary = [f'word{i}' for i in range(20_000)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark semantic (vector) episode search.')
+    parser.add_argument('--episodes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--chunks', type=int, default=4, help='Transcript chunk vectors per episode.')
+    parser.add_argument('--dims', type=int, default=300, help='en_core_web_lg vectors are 300 dims.')
+    parser.add_argument('--keywords', type=int, default=200, help='Distinct keywords per episode.')
+    parser.add_argument('--queries', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f'{"Episodes":>9} {"Vectors":>10} {"Matrix (MB)":>12} {"Build (s)":>10} '
+          f'{"Semantic p50/p95 (ms)":>22} {"Hybrid p50/p95 (ms)":>20}')
+    for episode_count in args.episodes:
+        r = measure(episode_count, args.chunks, args.dims, args.keywords, args.queries)
+        print(f'{episode_count:>9,} {r["vectors"]:>10,} {r["matrix_mb"]:>12,.1f} {r["build_sec"]:>10.2f} '
+              f'{r["semantic_p50"]:>11.2f} / {r["semantic_p95"]:<8.2f} '
+              f'{r["hybrid_p50"]:>9.2f} / {r["hybrid_p95"]:<8.2f}')
+
+
+def measure(episode_count: int, chunks: int, dims: int, keyword_count: int, query_count: int) -> dict:
+    rnd = random.Random(42)
+    rng = np.random.default_rng(42)
+    start = datetime.datetime(2015, 1, 1)
+
+    index = search_engine.InMemorySearchIndex()
+    t0 = time.perf_counter()
+    for number in range(episode_count):
+        vectors = normalized(rng.standard_normal((1 + chunks, dims), dtype=np.float32))
+        keywords = {w: rnd.randint(1, 20) for w in rnd.sample(vocabulary, keyword_count)}
+        index.add_episode('benchmark', number, start + datetime.timedelta(hours=number), keywords, 0, vectors)
+    build_sec = time.perf_counter() - t0
+
+    queries = normalized(rng.standard_normal((query_count, dims), dtype=np.float32))
+    query_words = [set(rnd.sample(vocabulary, 2)) for _ in range(query_count)]
+
+    semantic = time_queries(lambda i: index.ranked_semantic(queries[i], 100), query_count)
+    hybrid = time_queries(lambda i: index.ranked_semantic(queries[i], 100, query_words[i]), query_count)
+
+    return {
+        'vectors': index.vectors.count,
+        'matrix_mb': index.vectors.rows.nbytes / 1024 / 1024,
+        'build_sec': build_sec,
+        'semantic_p50': statistics.median(semantic),
+        'semantic_p95': semantic[int(len(semantic) * 0.95)],
+        'hybrid_p50': statistics.median(hybrid),
+        'hybrid_p95': hybrid[int(len(hybrid) * 0.95)],
+    }
+
+
+def time_queries(run_query, query_count: int) -> list[float]:
+    timings = []
+    for i in range(query_count):
+        t0 = time.perf_counter()
+        run_query(i)
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    timings.sort()
+    return timings
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+if __name__ == '__main__':
+    main()
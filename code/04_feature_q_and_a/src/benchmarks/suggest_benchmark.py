@@ -0,0 +1,71 @@
+# Measures search-as-you-type completion latency from the in-memory term dictionary,
+# for cold (first hit on a prefix), warm, and while the indexer keeps adding episodes.
+#
+# Run from the src folder:
+#
+#     python -m benchmarks.suggest_benchmark --terms 200000
+#
+import argparse
+import random
+import statistics
+import string
+import time
+
+from services import search_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark keyword prefix suggestions.')
+    parser.add_argument('--terms', type=int, default=200_000, help='Distinct keywords in the dictionary.')
+    parser.add_argument('--prefixes', type=int, default=2_000)
+    parser.add_argument('--updates', type=int, default=200, help='Episodes indexed between query rounds.')
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    weights = {random_term(rnd): rnd.randint(1, 5_000) for _ in range(args.terms)}
+
+    t0 = time.perf_counter()
+    dictionary = search_engine.TermDictionary(weights)
+    print(f'Built dictionary of {len(dictionary.terms):,} terms in {time.perf_counter() - t0:,.2f} sec.')
+
+    terms = dictionary.terms
+    prefixes = [t[:rnd.randint(1, 4)] for t in rnd.sample(terms, args.prefixes)]
+
+    report('Cold', time_suggestions(dictionary, prefixes))
+    report('Warm', time_suggestions(dictionary, prefixes))
+
+    # An episode touches a few thousand keywords, mostly existing ones plus a few new ones.
+    t0 = time.perf_counter()
+    for _ in range(args.updates):
+        for term in rnd.sample(terms, 2_000):
+            dictionary.increment(term)
+        for _ in range(20):
+            dictionary.increment(random_term(rnd))
+    dt = time.perf_counter() - t0
+    print(f'Incremental updates: {dt / args.updates * 1000:,.2f} ms per episode.')
+
+    report('After updates', time_suggestions(dictionary, prefixes))
+
+
+def time_suggestions(dictionary: search_engine.TermDictionary, prefixes: list[str]) -> list[float]:
+    timings = []
+    for prefix in prefixes:
+        t0 = time.perf_counter()
+        dictionary.suggest(prefix, 8)
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    timings.sort()
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    print(f'{label:<14} p50 {statistics.median(timings):.4f} ms, p95 {timings[int(len(timings) * 0.95)]:.4f} ms, '
+          f'max {timings[-1]:.4f} ms')
+
+
+def random_term(rnd: random.Random) -> str:
+    return ''.join(rnd.choices(string.ascii_lowercase, k=rnd.randint(3, 12)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# Compares the legacy list-of-subdocuments transcript words against the packed columnar format:
+# BSON document size, decode + validate latency, and the memory of holding loaded transcripts.
+# Each format's RSS is measured in its own fresh process so they don't bleed into each other.
+#
+# Run from the src folder (pip install zstandard to include the compressed format):
+#
+#     python -m benchmarks.transcript_format_benchmark --words 15000 --rounds 20 --held 50
+#
+import argparse
+import multiprocessing
+import random
+import resource
+import statistics
+import sys
+import time
+
+import bson
+
+from db import transcripts
+from db.transcripts import EpisodeTranscriptWords, PackedWords, TranscriptWord
+
+sample_text = (
+    'Welcome to the show. Today we are talking about Python, asyncio, and the removal of the GIL. '
+    'Our guest has been building web frameworks and data pipelines for years, and they share '
+    'what it takes to run free-threaded Python in production.'
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark transcript word storage formats.')
+    parser.add_argument('--words', type=int, default=15_000, help='Words per transcript, ~15k for 90 minutes.')
+    parser.add_argument('--rounds', type=int, default=20, help='Loads timed per format.')
+    parser.add_argument('--held', type=int, default=50, help='Transcripts held in memory for the RSS number.')
+    args = parser.parse_args()
+
+    formats = ['legacy', 'packed']
+    if transcripts.zstandard is not None:
+        formats.append('packed-zstd')
+
+    ctx = multiprocessing.get_context('spawn')
+    print(f'{"Format":<12} {"Doc (KB)":>9} {"Load p50 (ms)":>14} {"+ text (ms)":>12} {"+ iterate (ms)":>15} '
+          f'{"RSS for " + str(args.held):>12}')
+    for fmt in formats:
+        with ctx.Pool(1) as pool:
+            r = pool.apply(measure_format, (fmt, args.words, args.rounds, args.held))
+        print(f'{fmt:<12} {r["doc_kb"]:>9,.0f} {r["load_ms"]:>14.2f} {r["text_ms"]:>12.2f} {r["iterate_ms"]:>15.2f} '
+              f'{r["rss_mb"]:>9,.0f} MB')
+
+
+def measure_format(fmt: str, word_count: int, rounds: int, held: int) -> dict:
+    doc_bytes = bson.encode(build_document(fmt, word_count))
+
+    load_times, text_times, iterate_times = [], [], []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        transcript = EpisodeTranscriptWords(**bson.decode(doc_bytes))
+        t1 = time.perf_counter()
+        _ = transcript.transcript_string
+        t2 = time.perf_counter()
+        for _ in transcript.transcript_words:
+            pass
+        t3 = time.perf_counter()
+
+        load_times.append((t1 - t0) * 1000)
+        text_times.append((t2 - t0) * 1000)
+        iterate_times.append((t3 - t0) * 1000)
+
+    rss_before = max_rss_mb()
+    loaded = [EpisodeTranscriptWords(**bson.decode(doc_bytes)) for _ in range(held)]
+    for transcript in loaded:
+        _ = transcript.transcript_words[0]
+
+    return {
+        'doc_kb': len(doc_bytes) / 1024,
+        'load_ms': statistics.median(load_times),
+        'text_ms': statistics.median(text_times),
+        'iterate_ms': statistics.median(iterate_times),
+        'rss_mb': max_rss_mb() - rss_before,
+    }
+
+
+def build_document(fmt: str, word_count: int) -> dict:
+    rnd = random.Random(42)
+    vocabulary = sample_text.split()
+    words = [
+        TranscriptWord(text=rnd.choice(vocabulary), start_in_sec=i * 0.36, confidence=rnd.uniform(0.6, 1.0))
+        for i in range(word_count)
+    ]
+
+    doc = {'podcast_id': 'benchmark', 'episode_number': 1, 'successful': True, 'assemblyai_id': 'benchmark'}
+    if fmt == 'legacy':
+        doc['words'] = [w.model_dump() for w in words]
+    else:
+        doc['packed_words'] = PackedWords.from_words(words, compress=fmt == 'packed-zstd').model_dump()
+
+    return doc
+
+
+def max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes.
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# Measures the transcript page for a 3 hour episode rendered whole versus the first page with the
+# rest loading through htmx: server render time (the response is buffered, so this is the server side
+# time to first byte), HTML payload with and without gzip, and the cost of one infinite scroll page.
+#
+# Run from the src folder:
+#
+#     python -m benchmarks.transcript_page_benchmark --hours 3 --rounds 20
+#
+import argparse
+import gzip
+import random
+import statistics
+import time
+import types
+from pathlib import Path
+
+import chameleon_partials
+import fastapi_chameleon
+from starlette.requests import Request
+
+from db.transcripts import EpisodeTranscriptWords, PackedSentences, PackedWords
+from infrastructure import cache_buster
+from services import transcript_service
+from services.transcript_service import TranscriptPage
+from viewmodels.podcasts.podcasts_episode_viewmodel import PodcastEpisodeViewModel
+from viewmodels.podcasts.transcript_page_viewmodel import TranscriptPageViewModel
+
+sample_text = (
+    'Welcome to the show. Today we are talking about Python, asyncio, and the removal of the GIL! '
+    'Our guest has been building web frameworks and data pipelines for years, and they share '
+    'what it takes to run free-threaded Python in production. Does it really pay off?'
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark full versus paginated transcript page rendering.')
+    parser.add_argument('--hours', type=float, default=3.0)
+    parser.add_argument('--words-per-minute', type=int, default=160)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    src = Path(__file__).parent.parent
+    chameleon_partials.register_extensions((src / 'templates').as_posix())
+    fastapi_chameleon.global_init((src / 'templates').as_posix())
+    cache_buster.global_init(False, src.as_posix())
+
+    word_count = int(args.hours * 60 * args.words_per_minute)
+    db_tx = build_transcript(word_count, args.words_per_minute)
+
+    t0 = time.perf_counter()
+    sentences = transcript_service.sentences_for_transcript(db_tx)
+    dt = time.perf_counter() - t0
+    print(f'Fixture: {word_count:,} words, {len(sentences):,} sentences, decoded in {dt * 1000:,.1f} ms '
+          f'(cache miss only, the LRU serves the rest).')
+    print()
+
+    request = Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': [], 'query_string': b''})
+    per_page = transcript_service.sentences_per_page
+    pages = (len(sentences) + per_page - 1) // per_page
+
+    full = TranscriptPage(sentences, 0, 1)
+    first = TranscriptPage(sentences[:per_page], 0, pages)
+    middle = pages // 2
+    scroll = TranscriptPage(sentences[middle * per_page:(middle + 1) * per_page], middle, pages)
+
+    print(f'{"Response":<28} {"Render p50 (ms)":>16} {"HTML (KB)":>10} {"gzip (KB)":>10} {"Sentences":>10}')
+    report('Whole transcript page', lambda: render_page(request, full), args.rounds, len(sentences))
+    report(f'First page ({per_page} sentences)', lambda: render_page(request, first), args.rounds, per_page)
+    report('htmx scroll page', lambda: render_scroll_page(request, scroll), args.rounds, per_page)
+
+
+def report(label: str, render, rounds: int, sentence_count: int):
+    timings = []
+    html = ''
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        html = render()
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    payload = html.encode('utf-8')
+    print(f'{label:<28} {statistics.median(timings):>16.2f} {len(payload) / 1024:>10,.0f} '
+          f'{len(gzip.compress(payload)) / 1024:>10,.0f} {sentence_count:>10,}')
+
+
+def render_page(request: Request, page: TranscriptPage) -> str:
+    vm = PodcastEpisodeViewModel(request, 'benchmark', 1)
+    vm.podcast = types.SimpleNamespace(id='benchmark', image='', title='Benchmark Podcast', subtitle='')
+    vm.episode = types.SimpleNamespace(episode_number=1, title='A three hour episode', enclosure_url='')
+    vm.transcript_page = page
+    vm.transcript_sentences = page.sentences
+
+    return fastapi_chameleon.engine.render('podcasts/transcript.html', **vm.to_dict())
+
+
+def render_scroll_page(request: Request, page: TranscriptPage) -> str:
+    vm = TranscriptPageViewModel(request, 'benchmark', 1, page.page, 'later')
+    vm.transcript_page = page
+
+    return fastapi_chameleon.engine.render('podcasts/partials/transcript-page.html', **vm.to_dict())
+
+
+def build_transcript(word_count: int, words_per_minute: int) -> EpisodeTranscriptWords:
+    rnd = random.Random(42)
+    vocabulary = sample_text.split()
+    texts = [rnd.choice(vocabulary) for _ in range(word_count)]
+    starts = [i * 60 / words_per_minute for i in range(word_count)]
+
+    return EpisodeTranscriptWords(
+        podcast_id='benchmark', episode_number=1, successful=True, assemblyai_id='benchmark',
+        packed_words=PackedWords.pack(texts, starts, [rnd.uniform(0.6, 1.0) for _ in texts]),
+        packed_sentences=PackedSentences.from_words(texts, starts),
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -46,6 +46,11 @@ class Episode(beanie.Document):
         ]
 
 
+class EpisodeDatesProjection(pydantic.BaseModel):
+    episode_number: Optional[int] = None
+    published_date: datetime.datetime
+
+
 class EpisodeLightProjection(pydantic.BaseModel):
     title: str
     summary: Optional[str] = None
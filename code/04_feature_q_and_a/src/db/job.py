@@ -14,11 +14,15 @@ from strenum import StrEnum
 
 
 class JobStatus(StrEnum):
+    # Waiting for the job in depends_on to finish, then it is awaiting like any other.
+    blocked = 'blocked'
     awaiting = 'awaiting'
     processing = 'processing'
     unneeded = 'unneeded'
     failed = 'failed'
     success = 'success'
+    # Failed max_job_attempts times, or kept stranding its workers. Not retried again.
+    dead = 'dead'
 
 
 class JobActions(StrEnum):
@@ -36,13 +40,74 @@ class BackgroundJob(beanie.Document):
     action: str
     episode_number: Optional[int] = None
     podcast_id: str
+    # The worker process that claimed the job, and until when that claim holds. The worker
+    # pushes lease_expires out with every heartbeat while the job runs.
+    lease_owner: Optional[str] = None
+    lease_expires: Optional[datetime.datetime] = None
+    heartbeat_date: Optional[datetime.datetime] = None
+    # Times claimed so far. A job retried after a failure or a lost worker waits until not_before.
+    attempts: int = 0
+    not_before: Optional[datetime.datetime] = None
+    error_msg: Optional[str] = None
+    # The AssemblyAI transcript an attempt submitted. A retry waits on it instead of submitting (and paying) again.
+    assemblyai_id: Optional[str] = None
+    # The job that has to finish first, e.g. the transcription a summary needs.
+    depends_on: Optional[beanie.PydanticObjectId] = None
+    # For the scheduling policies (services/job_scheduler.py): interactive or bulk, who asked
+    # first, and the episode's length in seconds as the estimate of the work.
+    priority: int = 0
+    user_id: Optional[beanie.PydanticObjectId] = None
+    duration_in_sec: Optional[int] = None
 
     class Settings:
         name = 'jobs'
         indexes = [
+            # Claiming the oldest waiting job for a set of actions.
+            pymongo.IndexModel(
+                keys=[
+                    ('processing_status', pymongo.ASCENDING),
+                    ('action', pymongo.ASCENDING),
+                    ('created_date', pymongo.ASCENDING),
+                ],
+                name='status_action_created_ascend',
+            ),
+            # The same, for the priority, shortest-first and fair-share scheduling policies.
+            pymongo.IndexModel(
+                keys=[
+                    ('processing_status', pymongo.ASCENDING),
+                    ('action', pymongo.ASCENDING),
+                    ('priority', pymongo.DESCENDING),
+                    ('created_date', pymongo.ASCENDING),
+                ],
+                name='status_action_priority_created',
+            ),
+            pymongo.IndexModel(
+                keys=[
+                    ('processing_status', pymongo.ASCENDING),
+                    ('action', pymongo.ASCENDING),
+                    ('duration_in_sec', pymongo.ASCENDING),
+                    ('created_date', pymongo.ASCENDING),
+                ],
+                name='status_action_duration_created',
+            ),
+            pymongo.IndexModel(
+                keys=[
+                    ('processing_status', pymongo.ASCENDING),
+                    ('user_id', pymongo.ASCENDING),
+                    ('action', pymongo.ASCENDING),
+                    ('priority', pymongo.DESCENDING),
+                    ('created_date', pymongo.ASCENDING),
+                ],
+                name='status_user_action_priority_created',
+            ),
             # pymongo.IndexModel(keys=[('created_date', pymongo.ASCENDING)], name='created_date_ascend'),
             pymongo.IndexModel(keys=[('is_finished', pymongo.ASCENDING)], name='finished_ascend'),
             pymongo.IndexModel(keys=[('processing_status', pymongo.ASCENDING)], name='status_ascend'),
+            # Finding the processing jobs whose worker stopped renewing the lease.
+            pymongo.IndexModel(
+                keys=[('processing_status', pymongo.ASCENDING), ('lease_expires', pymongo.ASCENDING)],
+                name='status_lease_expires_ascend',
+            ),
             pymongo.IndexModel(
                 keys=[('podcast_id', pymongo.ASCENDING), ('episode_number', pymongo.ASCENDING)],
                 name='podcast_and_episode_ascend',
@@ -55,6 +120,20 @@ class BackgroundJob(beanie.Document):
                 ],
                 name='podcast_and_episode_status_ascend',
             ),
+            # At most one unfinished job per action and episode, create_background_job() hands out the existing
+            # one. mongo_setup runs finish_duplicate_jobs() first, building it fails while duplicates exist.
+            pymongo.IndexModel(
+                keys=[
+                    ('podcast_id', pymongo.ASCENDING),
+                    ('episode_number', pymongo.ASCENDING),
+                    ('action', pymongo.ASCENDING),
+                ],
+                name='unique_unfinished_job',
+                unique=True,
+                partialFilterExpression={'is_finished': False},
+            ),
+            # Releasing the jobs that were waiting on a finished one.
+            pymongo.IndexModel(keys=[('depends_on', pymongo.ASCENDING)], name='depends_on_ascend'),
             # Do we want to expire and remove these docs? Probably.
             pymongo.IndexModel(
                 keys=[('created_date', pymongo.ASCENDING)],
@@ -62,3 +141,38 @@ class BackgroundJob(beanie.Document):
                 expireAfterSeconds=int(datetime.timedelta(days=7).total_seconds()),
             ),
         ]
+
+
+async def finish_duplicate_jobs(database) -> int:
+    """
+    Keeps one unfinished job per action and episode, the running one or else the oldest, and marks the rest
+    unneeded. Queues from before unique_unfinished_job are full of these, and the index can't be built over them.
+    """
+    collection = database[BackgroundJob.Settings.name]
+    groups = collection.aggregate([
+        {'$match': {'is_finished': False}},
+        # 'processing' sorts ahead of 'awaiting' and 'blocked'.
+        {'$sort': {'processing_status': pymongo.DESCENDING, 'created_date': pymongo.ASCENDING}},
+        {'$group': {
+            '_id': {'podcast_id': '$podcast_id', 'episode_number': '$episode_number', 'action': '$action'},
+            'job_ids': {'$push': '$_id'},
+        }},
+        {'$match': {'job_ids.1': {'$exists': True}}},
+    ])
+    extra_ids = [job_id async for group in groups for job_id in group['job_ids'][1:]]
+    if not extra_ids:
+        return 0
+
+    result = await collection.update_many(
+        {'_id': {'$in': extra_ids}, 'is_finished': False},
+        {'$set': {
+            'processing_status': JobStatus.unneeded,
+            'is_finished': True,
+            'finished_date': datetime.datetime.now(),
+            'lease_owner': None,
+            'lease_expires': None,
+        }},
+    )
+    print(f'Marked {result.modified_count:,} duplicate background jobs unneeded.')
+
+    return result.modified_count
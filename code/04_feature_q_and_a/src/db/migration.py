@@ -0,0 +1,26 @@
+import datetime
+from typing import Optional
+
+import beanie
+import pydantic
+import pymongo
+from beanie import PydanticObjectId
+
+
+class MigrationCheckpoint(beanie.Document):
+    # One per migration, so an interrupted run picks up after the last document it wrote.
+    name: str
+    created_date: datetime.datetime = pydantic.Field(default_factory=datetime.datetime.now)
+    updated_date: datetime.datetime = pydantic.Field(default_factory=datetime.datetime.now)
+    completed_date: Optional[datetime.datetime] = None
+
+    last_id: Optional[PydanticObjectId] = None
+    scanned: int = 0
+    converted: int = 0
+    failed: int = 0
+
+    class Settings:
+        name = 'migrations'
+        indexes = [
+            pymongo.IndexModel(keys=[('name', pymongo.ASCENDING)], name='name_ascend', unique=True),
+        ]
@@ -1,9 +1,12 @@
 from db.chat import ChatQA
 from db.episode import Episode
 from db.job import BackgroundJob
+from db.migration import MigrationCheckpoint
 from db.podcast import Podcast
 from db.podcast_image import PodcastImage
 from db.search_record import SearchRecord
+from db.transcript_payload import TranscriptPayload
+from db.transcript_positions import TranscriptPositions
 from db.transcripts import EpisodeTranscript
 from db.user import User
 
@@ -16,4 +19,7 @@ all_models = [
     SearchRecord,
     BackgroundJob,
     PodcastImage,
+    TranscriptPositions,
+    MigrationCheckpoint,
+    TranscriptPayload,
 ]
@@ -4,7 +4,7 @@ from typing import Optional
 import beanie
 import motor.motor_asyncio
 
-from db import models
+from db import job, models
 
 development_mode: bool = True
 
@@ -49,6 +49,9 @@ async def _motor_init(
     # Crete Motor client
     client = motor.motor_asyncio.AsyncIOMotorClient(conn_string)
 
+    # Before init_beanie builds the unique job index, which fails over duplicate jobs.
+    await job.finish_duplicate_jobs(client[database])
+
     # Init beanie with the Product document class
     await beanie.init_beanie(database=client[database], document_models=models_classes)
     print(f'Init done for db {database}')
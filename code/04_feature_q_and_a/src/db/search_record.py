@@ -2,6 +2,7 @@ import datetime
 from typing import Optional
 
 import beanie
+import numpy as np
 import pydantic
 import pymongo
 from beanie import PydanticObjectId
@@ -15,6 +16,14 @@ class SearchRecord(beanie.Document):
     podcast_id: str
 
     keywords: set[str]
+    # Occurrences of each keyword, aligned with sorted(keywords). Used for BM25 ranking.
+    keyword_counts: list[int] = []
+    document_length: int = 0
+    nlp_model: Optional[str] = None
+    keywords_hash: Optional[str] = None
+    # Normalized float32 rows: the whole episode first, then one per transcript chunk.
+    semantic_vectors_data: Optional[bytes] = None
+    semantic_vector_dims: int = 0
 
     class Settings:
         name = 'search_records'
@@ -31,6 +40,12 @@ class SearchRecord(beanie.Document):
             ),
         ]
 
+    def keyword_frequencies(self) -> dict[str, int]:
+        return keyword_frequencies(self.keywords, self.keyword_counts)
+
+    def semantic_vectors(self) -> Optional[np.ndarray]:
+        return semantic_vectors(self.semantic_vectors_data, self.semantic_vector_dims)
+
 
 class SearchRecordLite(pydantic.BaseModel):
     created_date: datetime.datetime = pydantic.Field(default_factory=datetime.datetime.now)
@@ -38,3 +53,35 @@ class SearchRecordLite(pydantic.BaseModel):
     episode_id: Optional[PydanticObjectId] = None
     episode_number: Optional[int] = None
     podcast_id: str
+    document_length: int = 0
+    nlp_model: Optional[str] = None
+    keywords_hash: Optional[str] = None
+
+
+class SearchRecordKeywords(SearchRecordLite):
+    keywords: set[str] = set()
+    keyword_counts: list[int] = []
+    semantic_vectors_data: Optional[bytes] = None
+    semantic_vector_dims: int = 0
+
+    def keyword_frequencies(self) -> dict[str, int]:
+        return keyword_frequencies(self.keywords, self.keyword_counts)
+
+    def semantic_vectors(self) -> Optional[np.ndarray]:
+        return semantic_vectors(self.semantic_vectors_data, self.semantic_vector_dims)
+
+
+def keyword_frequencies(keywords: set[str], keyword_counts: list[int]) -> dict[str, int]:
+    ordered = sorted(keywords)
+    if len(keyword_counts) != len(ordered):
+        # Indexed before frequencies were tracked, every keyword counts once.
+        return {k: 1 for k in ordered}
+
+    return dict(zip(ordered, keyword_counts))
+
+
+def semantic_vectors(data: Optional[bytes], dims: int) -> Optional[np.ndarray]:
+    if not data or not dims:
+        return None
+
+    return np.frombuffer(data, dtype=np.float32).reshape(-1, dims)
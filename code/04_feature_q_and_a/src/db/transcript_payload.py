@@ -0,0 +1,71 @@
+import datetime
+import json
+import zlib
+from typing import Optional
+
+import beanie
+import pydantic
+import pymongo
+
+try:
+    import zstandard
+except ImportError:
+    # Optional, zlib from the standard library is used without it.
+    zstandard = None
+
+
+class TranscriptPayload(beanie.Document):
+    """
+    The raw AssemblyAI response for a transcript, compressed JSON. It repeats every word plus
+    utterances and metadata, so it lives here rather than in the transcripts collection that
+    the indexer, chat and summaries load all the time. Only read it on demand.
+    """
+    created_date: datetime.datetime = pydantic.Field(default_factory=datetime.datetime.now)
+    podcast_id: str
+    episode_number: Optional[int] = None
+    assemblyai_id: Optional[str] = None
+
+    codec: str = 'zlib'
+    raw_size: int = 0
+    data: bytes = b''
+
+    class Settings:
+        name = 'transcript_payloads'
+        indexes = [
+            pymongo.IndexModel(keys=[('assemblyai_id', pymongo.ASCENDING)], name='assemblyai_id_ascend'),
+            pymongo.IndexModel(
+                keys=[('podcast_id', pymongo.ASCENDING), ('episode_number', pymongo.ASCENDING)],
+                name='podcast_and_episode_ascend',
+            ),
+        ]
+
+    @classmethod
+    def from_json(
+            cls, podcast_id: str, episode_number: Optional[int], assemblyai_id: Optional[str], payload: dict
+    ) -> 'TranscriptPayload':
+        return cls(podcast_id=podcast_id, episode_number=episode_number, assemblyai_id=assemblyai_id,
+                   **compress_payload(payload))
+
+    def to_json(self) -> dict:
+        return decompress_payload(self.codec, self.data)
+
+
+def compress_payload(payload: dict) -> dict:
+    raw = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+    if zstandard is not None:
+        return {'codec': 'zstd', 'raw_size': len(raw), 'data': zstandard.ZstdCompressor(level=9).compress(raw)}
+
+    return {'codec': 'zlib', 'raw_size': len(raw), 'data': zlib.compress(raw, 6)}
+
+
+def decompress_payload(codec: str, data: bytes) -> dict:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('This transcript payload is zstd compressed, pip install zstandard to read it.')
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == 'zlib':
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f'Unknown transcript payload codec {codec}.')
+
+    return json.loads(raw)
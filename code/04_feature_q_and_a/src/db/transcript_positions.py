@@ -0,0 +1,46 @@
+import datetime
+from typing import Optional
+
+import beanie
+import pydantic
+import pymongo
+
+
+class TermPositions(pydantic.BaseModel):
+    term: str
+    # Word offsets into the transcript, delta-encoded as varints (see services/phrase_index.py).
+    positions: bytes
+    # float32 start_in_sec for each of those offsets, so hits have a timestamp without the full transcript.
+    times: bytes
+
+
+class TranscriptPositions(beanie.Document):
+    created_date: datetime.datetime = pydantic.Field(default_factory=datetime.datetime.now)
+    # updated_date of the transcript these positions were built from.
+    transcript_date: Optional[datetime.datetime] = None
+    podcast_id: str
+    episode_number: int
+    word_count: int = 0
+
+    terms: list[TermPositions] = []
+
+    class Settings:
+        name = 'transcript_positions'
+        indexes = [
+            pymongo.IndexModel(keys=[('terms.term', pymongo.ASCENDING)], name='terms_term_ascend'),
+            pymongo.IndexModel(
+                keys=[('podcast_id', pymongo.ASCENDING), ('episode_number', pymongo.ASCENDING)],
+                name='podcast_and_episode_ascend',
+            ),
+        ]
+
+
+class TranscriptPositionsDates(pydantic.BaseModel):
+    episode_number: int
+    transcript_date: Optional[datetime.datetime] = None
+
+
+class TranscriptPositionsTerms(pydantic.BaseModel):
+    podcast_id: str
+    episode_number: int
+    terms: list[TermPositions] = []
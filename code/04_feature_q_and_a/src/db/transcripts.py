@@ -1,11 +1,26 @@
+import collections.abc
 import datetime
-from typing import Optional
+from typing import Iterator, Optional, Sequence, Union
 
 import beanie
+import numpy as np
 import pydantic
 import pymongo
 from assemblyai import TranscriptStatus
 
+try:
+    import zstandard
+except ImportError:
+    # Optional, without it transcripts are packed uncompressed.
+    zstandard = None
+
+# Version 1 of the packed word format: the words as UTF-8 separated by '\n', start_in_sec as little
+# endian float32, and confidence quantized to uint8 (0..255). With the 'zstd' codec each blob is compressed.
+packed_words_version = 1
+packed_words_zstd_level = 3
+packed_sentences_version = 1
+sentence_end_punctuation = {'.', '?', '!'}
+
 
 class TranscriptWord(pydantic.BaseModel):
     text: str
@@ -13,13 +28,201 @@ class TranscriptWord(pydantic.BaseModel):
     confidence: float
 
 
-class EpisodeTranscript(beanie.Document):
+class PackedWords(pydantic.BaseModel):
+    version: int = packed_words_version
+    codec: str = 'none'
+    count: int = 0
+    text: bytes = b''
+    starts: bytes = b''
+    confidences: bytes = b''
+
+    _unpacked: Optional['PackedWordSequence'] = pydantic.PrivateAttr(default=None)
+
+    @classmethod
+    def pack(cls, texts: list[str], starts: Sequence[float], confidences: Sequence[float],
+             compress: bool = True) -> 'PackedWords':
+        text_blob = '\n'.join(t.replace('\n', ' ') for t in texts).encode('utf-8')
+        starts_blob = np.asarray(starts, dtype='<f4').tobytes()
+        confidences_blob = np.rint(np.clip(np.asarray(confidences, dtype=np.float32), 0.0, 1.0) * 255).astype(
+            np.uint8).tobytes()
+
+        codec = 'zstd' if compress and zstandard is not None else 'none'
+        if codec == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=packed_words_zstd_level)
+            text_blob, starts_blob, confidences_blob = (
+                compressor.compress(b) for b in (text_blob, starts_blob, confidences_blob)
+            )
+
+        return cls(codec=codec, count=len(texts), text=text_blob, starts=starts_blob, confidences=confidences_blob)
+
+    @classmethod
+    def from_words(cls, words: Sequence[TranscriptWord], compress: bool = True) -> 'PackedWords':
+        return cls.pack(
+            [w.text for w in words], [w.start_in_sec for w in words], [w.confidence for w in words], compress
+        )
+
+    def unpack(self) -> 'PackedWordSequence':
+        if self._unpacked is None:
+            self._unpacked = PackedWordSequence(self)
+        return self._unpacked
+
+
+class PackedWordSequence(collections.abc.Sequence):
+    """
+    Read-only TranscriptWord sequence over PackedWords. Blobs are decoded on first use, the
+    starts and confidences are NumPy views straight onto those bytes, and the 15k TranscriptWord
+    objects of a long episode are only ever built if someone walks the words one at a time.
+    """
+    __slots__ = ['packed', '__text', '__texts', '__starts', '__confidences']
+
+    def __init__(self, packed: PackedWords):
+        if packed.version != packed_words_version:
+            raise ValueError(f'Unsupported packed words version {packed.version}.')
+
+        self.packed = packed
+        self.__text: Optional[bytes] = None
+        self.__texts: Optional[list[str]] = None
+        self.__starts: Optional[np.ndarray] = None
+        self.__confidences: Optional[np.ndarray] = None
+
+    @property
+    def text(self) -> str:
+        """All the words joined by spaces, without splitting them apart first."""
+        if self.__text is None:
+            self.__text = self.__decode(self.packed.text)
+        return self.__text.replace(b'\n', b' ').decode('utf-8')
+
+    @property
+    def texts(self) -> list[str]:
+        if self.__texts is None:
+            if self.__text is None:
+                self.__text = self.__decode(self.packed.text)
+            self.__texts = self.__text.decode('utf-8').split('\n') if self.packed.count else []
+        return self.__texts
+
+    @property
+    def starts(self) -> np.ndarray:
+        if self.__starts is None:
+            self.__starts = np.frombuffer(self.__decode(self.packed.starts), dtype='<f4')
+        return self.__starts
+
+    @property
+    def confidences(self) -> np.ndarray:
+        """Quantized uint8 confidences, divide by 255 for the 0..1 value."""
+        if self.__confidences is None:
+            self.__confidences = np.frombuffer(self.__decode(self.packed.confidences), dtype=np.uint8)
+        return self.__confidences
+
+    def __len__(self) -> int:
+        return self.packed.count
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[TranscriptWord, list[TranscriptWord]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        return TranscriptWord.model_construct(
+            text=self.texts[index],
+            start_in_sec=float(self.starts[index]),
+            confidence=float(self.confidences[index]) / 255,
+        )
+
+    def __iter__(self) -> Iterator[TranscriptWord]:
+        for text, start, confidence in zip(self.texts, self.starts.tolist(), self.confidences.tolist()):
+            yield TranscriptWord.model_construct(text=text, start_in_sec=start, confidence=confidence / 255)
+
+    def __decode(self, blob: bytes) -> Union[bytes, memoryview]:
+        if self.packed.codec == 'none':
+            return blob
+        if self.packed.codec == 'zstd':
+            if zstandard is None:
+                raise RuntimeError('These transcript words are zstd compressed, pip install zstandard to read them.')
+            return zstandard.ZstdDecompressor().decompress(blob)
+
+        raise ValueError(f'Unknown packed words codec {self.packed.codec}.')
+
+
+class PackedSentences(pydantic.BaseModel):
+    """
+    Sentence boundaries over a transcript's words, worked out once when the transcript is saved.
+    Parallel little endian arrays: uint32 index of the first word, uint32 index one past the last
+    word, and float32 start time of each sentence.
+    """
+    version: int = packed_sentences_version
+    count: int = 0
+    start_indexes: bytes = b''
+    end_indexes: bytes = b''
+    start_times: bytes = b''
+
+    @classmethod
+    def from_words(cls, texts: Sequence[str], starts: Sequence[float]) -> 'PackedSentences':
+        start_indexes, end_indexes = sentence_bounds(texts)
+        start_times = np.asarray(starts, dtype='<f4')[start_indexes] if start_indexes else np.empty(0, dtype='<f4')
+
+        return cls(
+            count=len(start_indexes),
+            start_indexes=np.asarray(start_indexes, dtype='<u4').tobytes(),
+            end_indexes=np.asarray(end_indexes, dtype='<u4').tobytes(),
+            start_times=start_times.tobytes(),
+        )
+
+    def bounds(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self.version != packed_sentences_version:
+            raise ValueError(f'Unsupported packed sentences version {self.version}.')
+
+        return (
+            np.frombuffer(self.start_indexes, dtype='<u4'),
+            np.frombuffer(self.end_indexes, dtype='<u4'),
+            np.frombuffer(self.start_times, dtype='<f4'),
+        )
+
+
+def sentence_bounds(texts: Sequence[str]) -> tuple[list[int], list[int]]:
+    start_indexes: list[int] = []
+    end_indexes: list[int] = []
+
+    start = 0
+    for idx, text in enumerate(texts):
+        if text and text[-1] in sentence_end_punctuation:
+            start_indexes.append(start)
+            end_indexes.append(idx + 1)
+            start = idx + 1
+
+    # Whatever trails the last full stop is still part of the transcript.
+    if start < len(texts):
+        start_indexes.append(start)
+        end_indexes.append(len(texts))
+
+    return start_indexes, end_indexes
+
+
+class TranscriptWordsMixin:
+    words: list[TranscriptWord]
+    packed_words: Optional[PackedWords]
+
+    @property
+    def transcript_words(self) -> Sequence[TranscriptWord]:
+        # Transcripts saved before the packed format still carry the list of subdocuments.
+        if self.packed_words is not None:
+            return self.packed_words.unpack()
+        return self.words
+
+    @property
+    def transcript_string(self) -> str:
+        if self.packed_words is not None:
+            return self.packed_words.unpack().text
+        return ' '.join([w.text for w in self.words])
+
+
+class EpisodeTranscript(TranscriptWordsMixin, beanie.Document):
     created_date: datetime.datetime = pydantic.Field(default_factory=datetime.datetime.now)
     updated_date: datetime.datetime = pydantic.Field(default_factory=datetime.datetime.now)
     episode_number: Optional[int] = None
     podcast_id: str
 
+    # Legacy one-subdocument-per-word format, new transcripts fill in packed_words instead.
     words: list[TranscriptWord] = []
+    packed_words: Optional[PackedWords] = None
+    packed_sentences: Optional[PackedSentences] = None
 
     summary_tldr: Optional[str] = None
     summary_bullets: Optional[str] = None
@@ -28,7 +231,9 @@ class EpisodeTranscript(beanie.Document):
     successful: bool
     status: TranscriptStatus
     assemblyai_id: str
-    json_result: dict
+    # The raw AssemblyAI json_response lives in TranscriptPayload. Transcripts saved before that may
+    # still carry a json_result field, it is left out here so no query loads it. Update these documents
+    # with targeted set() calls, a full save() would replace the document and drop that field.
 
     class Settings:
         name = 'transcripts'
@@ -44,10 +249,6 @@ class EpisodeTranscript(beanie.Document):
             ),
         ]
 
-    @property
-    def transcript_string(self) -> str:
-        return ' '.join([w.text for w in self.words])
-
 
 class EpisodeTranscriptProjection(pydantic.BaseModel):
     created_date: datetime.datetime = pydantic.Field(default_factory=datetime.datetime.now)
@@ -59,10 +260,29 @@ class EpisodeTranscriptProjection(pydantic.BaseModel):
     assemblyai_id: str
 
 
-class EpisodeTranscriptWords(EpisodeTranscriptProjection):
+class EpisodeTranscriptWords(TranscriptWordsMixin, EpisodeTranscriptProjection):
     words: list[TranscriptWord] = []
+    packed_words: Optional[PackedWords] = None
+    packed_sentences: Optional[PackedSentences] = None
 
 
 class EpisodeTranscriptSummary(EpisodeTranscriptProjection):
     summary_tldr: Optional[str] = None
     summary_bullets: Optional[str] = None
+
+
+class EpisodeTranscriptDates(pydantic.BaseModel):
+    episode_number: Optional[int] = None
+    updated_date: datetime.datetime = pydantic.Field(default_factory=datetime.datetime.now)
+
+
+class EpisodeAIStatus(pydantic.BaseModel):
+    podcast_id: str
+    episode_number: Optional[int] = None
+    has_transcript: bool = False
+    has_summary: bool = False
+
+    @property
+    def chat_ready(self) -> bool:
+        # LeMUR chat runs over the transcript text, nothing more is needed.
+        return self.has_transcript
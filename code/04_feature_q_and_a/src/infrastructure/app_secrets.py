@@ -4,12 +4,15 @@ from pathlib import Path
 assembly_ai_key = None
 mongo_port = None
 mongo_host = None
+# Optional, one of job_scheduler.policies. None keeps its default.
+job_scheduling_policy = None
 
 
 # noinspection SpellCheckingInspection
 def init():
     global mongo_host, mongo_port
     global assembly_ai_key
+    global job_scheduling_policy
 
     if assembly_ai_key:
         return
@@ -22,6 +25,7 @@ def init():
     assembly_ai_key = data['assemblyai_key']
     mongo_host = data['mongo_host']
     mongo_port = data['mongo_port']
+    job_scheduling_policy = data.get('job_scheduling_policy')
 
     print('Located access_key, secrets initialized.')
 
@@ -3,7 +3,7 @@ from contextlib import asynccontextmanager
 
 from db import mongo_setup
 from infrastructure import app_secrets
-from services import web_sync_service, background_service, search_service
+from services import web_sync_service, background_service, search_service, assemblyai_service, job_scheduler
 
 development_mode: bool = True
 
@@ -19,6 +19,9 @@ async def app_lifespan(_):
         # await mongo_setup.init_connection(...)
         ...
 
+    if app_secrets.job_scheduling_policy:
+        job_scheduler.select_policy(app_secrets.job_scheduling_policy)
+
     # Start the background workers
 
     # noinspection PyAsyncCall
@@ -32,4 +35,6 @@ async def app_lifespan(_):
 
     yield
 
-    # Nothing to clean up.
+    # Let running jobs finish (or put them back in the queue) before closing the AssemblyAI client they use.
+    await background_service.stop_workers()
+    await assemblyai_service.close()
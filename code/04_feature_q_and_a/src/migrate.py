@@ -0,0 +1,58 @@
+# Runs a data migration against the live database, outside the web app's process.
+# Migrations are resumable: stop one at any point and run the same command to pick up where it left off.
+#
+# Run from the src folder:
+#
+#     python migrate.py --list
+#     python migrate.py pack-transcript-words --workers 4 --max-docs-per-sec 200
+#
+import argparse
+import asyncio
+
+from db import mongo_setup
+from services import migration_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a resumable background data migration.')
+    parser.add_argument('migration', nargs='?', choices=sorted(migration_service.migrations))
+    parser.add_argument('--list', action='store_true', help='List the available migrations.')
+    parser.add_argument('--batch-size', type=int, default=migration_service.batch_size)
+    parser.add_argument('--workers', type=int, default=migration_service.worker_count)
+    parser.add_argument('--threads', action='store_true', help='Convert in threads rather than processes.')
+    parser.add_argument('--max-docs-per-sec', type=float, default=migration_service.max_docs_per_second)
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the top.')
+    parser.add_argument('--database', default='xray_podcasts')
+    parser.add_argument('--server', help='Defaults to mongo_host in settings.json.')
+    parser.add_argument('--port', type=int, help='Defaults to mongo_port in settings.json.')
+    args = parser.parse_args()
+
+    if args.list or not args.migration:
+        for name, migration in sorted(migration_service.migrations.items()):
+            print(f'{name:<24} {migration.description}')
+        return
+
+    asyncio.run(run(args))
+
+
+async def run(args: argparse.Namespace):
+    server, port = args.server, args.port
+    if not server or not port:
+        # Only needed here, app_secrets insists on a settings.json when imported.
+        from infrastructure import app_secrets
+        server = server or app_secrets.mongo_host
+        port = port or app_secrets.mongo_port
+
+    await mongo_setup.init_connection(args.database, server=server, port=port)
+    await migration_service.run_migration(
+        args.migration,
+        batch=args.batch_size,
+        workers=args.workers,
+        use_processes=not args.threads,
+        max_rate=args.max_docs_per_sec,
+        restart=args.restart,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,22 @@
 import asyncio
-import concurrent.futures
 import datetime
 import re
-from typing import Optional, Any
+from typing import Any, Awaitable, Callable, Optional
 
 import assemblyai
-import assemblyai.lemur
 from assemblyai import TranscriptStatus, LemurTaskResponse, LemurModel
+from assemblyai.types import TranscriptResponse
 
 from db.chat import ChatQA
+from db.transcript_payload import TranscriptPayload
 from db.transcripts import (
     EpisodeTranscript,
     EpisodeTranscriptWords,
     EpisodeTranscriptSummary,
-    EpisodeTranscriptProjection, TranscriptWord,
+    EpisodeTranscriptProjection, EpisodeTranscriptDates, PackedWords, EpisodeAIStatus,
+    PackedSentences,
 )
-from services import podcast_service
+from services import podcast_service, index_events, assemblyai_service
 
 regex_tlrd = re.compile('^Here is a [0-9]+ sentence .+:')
 regex_moments = re.compile('^Here is a [0-9]+ bullet point .+:')
@@ -27,6 +28,35 @@ async def full_transcript_for_episode(podcast_id: str, episode_number: int) -> O
     )
 
 
+async def raw_transcript_for_episode(podcast_id: str, episode_number: int) -> Optional[dict]:
+    # The full AssemblyAI response, only loaded on demand.
+    payload = await TranscriptPayload.find_one(
+        TranscriptPayload.podcast_id == podcast_id, TranscriptPayload.episode_number == episode_number
+    )
+    if payload:
+        return await asyncio.to_thread(payload.to_json)
+
+    # Not offloaded yet (see the offload-json-result migration).
+    legacy = await EpisodeTranscript.get_motor_collection().find_one(
+        {'podcast_id': podcast_id, 'episode_number': episode_number}, {'json_result': 1}
+    )
+    return legacy.get('json_result') if legacy else None
+
+
+async def save_raw_transcript(podcast_id: str, episode_number: int, assemblyai_id: str, json_response: dict):
+    payload = await asyncio.to_thread(
+        TranscriptPayload.from_json, podcast_id, episode_number, assemblyai_id, json_response
+    )
+
+    await TranscriptPayload.find(
+        TranscriptPayload.podcast_id == podcast_id, TranscriptPayload.episode_number == episode_number
+    ).delete()
+    await payload.insert()
+
+    print(f'Stored raw transcript for {podcast_id} number {episode_number}: '
+          f'{payload.raw_size / 1024:,.0f} KB as {len(payload.data) / 1024:,.0f} KB {payload.codec}.')
+
+
 async def summary_for_episode(podcast_id: str, episode_number: int) -> Optional[EpisodeTranscriptSummary]:
     summary = await EpisodeTranscript.find_one(
         EpisodeTranscript.podcast_id == podcast_id, EpisodeTranscript.episode_number == episode_number
@@ -44,19 +74,80 @@ async def transcript_words_for_episode(podcast_id: str, episode_number: int) ->
     ).project(EpisodeTranscriptWords)
 
 
+async def transcript_date_for_episode(podcast_id: str, episode_number: int) -> Optional[EpisodeTranscriptDates]:
+    return await EpisodeTranscript.find_one(
+        EpisodeTranscript.podcast_id == podcast_id, EpisodeTranscript.episode_number == episode_number
+    ).project(EpisodeTranscriptDates)
+
+
 async def transcript_lite_for_episode(podcast_id: str, episode_number: int) -> Optional[EpisodeTranscriptWords]:
     return await EpisodeTranscript.find_one(
         EpisodeTranscript.podcast_id == podcast_id, EpisodeTranscript.episode_number == episode_number
     ).project(EpisodeTranscriptProjection)
 
 
+async def ai_status_for_episode(podcast_id: str, episode_number: int) -> EpisodeAIStatus:
+    statuses = await ai_status_for_episodes(podcast_id, [episode_number])
+    return statuses.get(episode_number) or EpisodeAIStatus(podcast_id=podcast_id, episode_number=episode_number)
+
+
+async def ai_status_for_episodes(
+        podcast_id: str, episode_numbers: Optional[list[int]] = None
+) -> dict[int, EpisodeAIStatus]:
+    """
+    Transcript / summary / chat status for many episodes in one query. Mongo works out the flags
+    and only ships back a few booleans per episode, never the words or summaries themselves.
+    Episodes without a transcript are simply missing from the result.
+    """
+    match: dict[str, Any] = {'podcast_id': podcast_id}
+    if episode_numbers is not None:
+        match['episode_number'] = {'$in': list(episode_numbers)}
+
+    pipeline = [
+        {'$match': match},
+        {'$project': {
+            '_id': 0,
+            'podcast_id': 1,
+            'episode_number': 1,
+            'has_transcript': {'$and': [
+                {'$eq': ['$successful', True]},
+                {'$or': [
+                    {'$gt': [{'$ifNull': ['$packed_words.count', 0]}, 0]},
+                    {'$gt': [{'$size': {'$ifNull': ['$words', []]}}, 0]},
+                ]},
+            ]},
+            'has_summary': {'$gt': [{'$strLenCP': {'$ifNull': ['$summary_tldr', '']}}, 0]},
+        }},
+    ]
+
+    statuses: dict[int, EpisodeAIStatus] = {}
+    async for doc in EpisodeTranscript.get_motor_collection().aggregate(pipeline):
+        status = EpisodeAIStatus(**doc)
+        statuses[status.episode_number] = status
+
+    return statuses
+
+
+async def transcript_dates_for_podcast(podcast_id: str) -> list[EpisodeTranscriptDates]:
+    return await EpisodeTranscript.find(EpisodeTranscript.podcast_id == podcast_id).project(
+        EpisodeTranscriptDates
+    ).to_list()
+
+
 async def latest_transcript_for_podcast(podcast_id: str) -> Optional[EpisodeTranscript]:
     return (
         await EpisodeTranscript.find(EpisodeTranscript.podcast_id == podcast_id).sort('-created_date').first_or_none()
     )
 
 
-async def worker_transcribe_episode(podcast_id: str, episode_number: int) -> EpisodeTranscript:
+async def worker_transcribe_episode(
+        podcast_id: str,
+        episode_number: int,
+        assemblyai_id: Optional[str] = None,
+        on_submitted: Optional[Callable[[str], Awaitable]] = None,
+) -> EpisodeTranscript:
+    # assemblyai_id is a transcription an earlier attempt submitted, wait for it rather than paying
+    # for another. on_submitted gets the id of a new one, so the next attempt can do the same.
     t0 = datetime.datetime.now()
 
     db_transcript = await full_transcript_for_episode(podcast_id, episode_number)
@@ -75,7 +166,6 @@ async def worker_transcribe_episode(podcast_id: str, episode_number: int) -> Epi
     mp3_url = episode.enclosure_url
     print(f"We are transcribing {podcast.title} - {episode.title} from {mp3_url} ...")
 
-    transcriber = assemblyai.Transcriber()
     config = assemblyai.TranscriptionConfig(
         punctuate=True,
         format_text=True,
@@ -83,8 +173,10 @@ async def worker_transcribe_episode(podcast_id: str, episode_number: int) -> Epi
         disfluencies=False
     )
 
-    transcript_future = transcriber.transcribe_async(mp3_url, config)
-    transcript: assemblyai.Transcript = await run_future(transcript_future)
+    transcript: TranscriptResponse
+    transcript, raw_response = await assemblyai_service.transcribe(
+        mp3_url, config, transcript_id=assemblyai_id, on_submitted=on_submitted
+    )
 
     db_transcript = EpisodeTranscript(
         episode_number=episode_number,
@@ -92,7 +184,7 @@ async def worker_transcribe_episode(podcast_id: str, episode_number: int) -> Epi
         successful=transcript.status == TranscriptStatus.completed,
         status=transcript.status,
         assemblyai_id=transcript.id,
-        json_result=transcript.json_response
+        error_msg=transcript.error,
     )
 
     if not db_transcript.successful:
@@ -102,12 +194,14 @@ async def worker_transcribe_episode(podcast_id: str, episode_number: int) -> Epi
         )
         raise Exception(msg)
 
-    for word in transcript.words:
-        start_sec = word.start / 1000.0
-        tx_word = TranscriptWord(text=word.text, start_in_sec=start_sec, confidence=word.confidence)
-        db_transcript.words.append(tx_word)
+    texts = [word.text for word in transcript.words or []]
+    starts = [word.start / 1000.0 for word in transcript.words or []]
+    db_transcript.packed_words = PackedWords.pack(texts, starts, [word.confidence for word in transcript.words or []])
+    db_transcript.packed_sentences = PackedSentences.from_words(texts, starts)
 
+    await save_raw_transcript(podcast_id, episode_number, transcript.id, raw_response)
     await db_transcript.save()
+    index_events.notify_episode_changed(podcast_id, episode_number)
 
     dt = datetime.datetime.now() - t0
     print(f'Processing complete for transcription, dt = {dt.total_seconds():,.0f} sec.')
@@ -115,7 +209,12 @@ async def worker_transcribe_episode(podcast_id: str, episode_number: int) -> Epi
     return db_transcript
 
 
-async def worker_summarize_episode(podcast_id: str, episode_number: int):
+async def worker_summarize_episode(
+        podcast_id: str,
+        episode_number: int,
+        assemblyai_id: Optional[str] = None,
+        on_submitted: Optional[Callable[[str], Awaitable]] = None,
+):
     t0 = datetime.datetime.now()
 
     # Step 1: Do we already have all we need?
@@ -126,7 +225,7 @@ async def worker_summarize_episode(podcast_id: str, episode_number: int):
     # No TX? Make one
     if not db_transcript:
         print(f"No transcript yet, so let's make one for {podcast_id} {episode_number}")
-        db_transcript = await worker_transcribe_episode(podcast_id, episode_number)
+        db_transcript = await worker_transcribe_episode(podcast_id, episode_number, assemblyai_id, on_submitted)
 
     # Step 2: Get the podcast and episode
     podcast = await podcast_service.podcast_by_id(podcast_id)
@@ -149,37 +248,30 @@ async def worker_summarize_episode(podcast_id: str, episode_number: int):
     moments_prompt = prompt_base + 'Your response should be in the form of 10 bullet points.'
 
     # Step 4: Create transcript text.
-    transcript: str = ' '.join(w.text for w in db_transcript.words)
-
-    # Step 5: Send the request to LeMUR.
-    # First for TL;DR, second for key moments
-    # BTW, Lemur.task() is blocking...
-    #
-    # Please use
-    # future = lemur_client.task_async(...)
-    # resp = await run_future(future)
-    #
-    lemur_client = assemblyai.lemur.Lemur()
-
-    print('Summarizing with LeMUR, TL;DR mode.')
-    resp: LemurTaskResponse = lemur_client.task(
-        tldr_prompt,
-        final_model=LemurModel.basic,
-        max_output_size=2000,
-        temperature=0.25,
-        input_text=transcript
-    )
-    db_transcript.summary_tldr = resp.response.strip()
-
-    print('Summarizing with LeMUR, key moments mode.')
-    resp: LemurTaskResponse = lemur_client.task(
-        moments_prompt,
-        final_model=LemurModel.basic,
-        max_output_size=2000,
-        temperature=0.25,
-        input_text=transcript
+    transcript: str = db_transcript.transcript_string
+
+    # Step 5: Send the requests to LeMUR, TL;DR and key moments at the same time.
+    print('Summarizing with LeMUR, TL;DR and key moments modes.')
+    tldr_resp, moments_resp = await asyncio.gather(
+        assemblyai_service.lemur_task(
+            tldr_prompt,
+            final_model=LemurModel.basic,
+            max_output_size=2000,
+            temperature=0.25,
+            input_text=transcript,
+            background=True,
+        ),
+        assemblyai_service.lemur_task(
+            moments_prompt,
+            final_model=LemurModel.basic,
+            max_output_size=2000,
+            temperature=0.25,
+            input_text=transcript,
+            background=True,
+        ),
     )
-    db_transcript.summary_bullets = resp.response.strip()
+    db_transcript.summary_tldr = tldr_resp.response.strip()
+    db_transcript.summary_bullets = moments_resp.response.strip()
 
     # Step 6: Remove LLM restatements at the start of the response:
     # Here is a 5 sentence summary of the key details from the transcript in the style of an ArsTechnica tech reporter:
@@ -188,15 +280,25 @@ async def worker_summarize_episode(podcast_id: str, episode_number: int):
     db_transcript.summary_tldr = regex_tlrd.sub('', db_transcript.summary_tldr)
     db_transcript.summary_bullets = regex_moments.sub('', db_transcript.summary_bullets)
 
-    await db_transcript.save()
+    # Only the summary fields, a full save() would also rewrite every word.
+    await db_transcript.set({
+        EpisodeTranscript.summary_tldr: db_transcript.summary_tldr,
+        EpisodeTranscript.summary_bullets: db_transcript.summary_bullets,
+    })
+    index_events.notify_episode_changed(podcast_id, episode_number)
 
     dt = datetime.datetime.now() - t0
     print(f'Processing complete for summary, dt = {dt.total_seconds():,.0f} sec.')
 
 
-async def worker_enable_chat_episode(podcast_id: str, episode_number: int):
+async def worker_enable_chat_episode(
+        podcast_id: str,
+        episode_number: int,
+        assemblyai_id: Optional[str] = None,
+        on_submitted: Optional[Callable[[str], Awaitable]] = None,
+):
     print(f'Preparing episode for AI chat {podcast_id} and {episode_number}.')
-    return await worker_transcribe_episode(podcast_id, episode_number)
+    return await worker_transcribe_episode(podcast_id, episode_number, assemblyai_id, on_submitted)
 
 
 async def ask_chat(podcast_id: str, episode_number: int, email: str, question: str) -> ChatQA:
@@ -217,10 +319,8 @@ async def ask_chat(podcast_id: str, episode_number: int, email: str, question: s
     if chat.answer:
         return chat
 
-    lemur_client = assemblyai.lemur.Lemur()
-
     print(f'Asking LeMUR about {question}')
-    resp: LemurTaskResponse = lemur_client.task(
+    resp: LemurTaskResponse = await assemblyai_service.lemur_task(
         prompt,
         final_model=LemurModel.basic,
         temperature=0.25,
@@ -259,10 +359,3 @@ async def new_chat(podcast_id: str, episode_number: int, prompt: str, question:
 
     await chat.save()
     return chat
-
-
-async def run_future(future: concurrent.futures.Future) -> Any:
-    while future.running():
-        await asyncio.sleep(0.05)
-
-    return future.result()
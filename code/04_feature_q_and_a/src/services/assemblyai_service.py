@@ -0,0 +1,177 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+import assemblyai
+import httpx
+from assemblyai import LemurModel, types
+
+# Every AI call shares one pooled, keep-alive HTTP client to AssemblyAI.
+max_connections = 10
+connect_timeout = 10.0
+request_timeout = 30.0
+# LeMUR answers in the response to the request itself, summarizing a long transcript takes a while.
+lemur_timeout = 5 * 60.0
+# Background LeMUR calls (summaries) in flight at once across the process, others wait their turn without
+# holding anything, for up to lemur_slot_timeout. Interactive calls (chat) skip the line, someone is waiting on them.
+max_concurrent_lemur_calls = 4
+lemur_slot_timeout = 5 * 60.0
+# A transcription still not done after this long is given up on, until the next attempt picks it back up.
+transcribe_timeout = 3 * 60 * 60.0
+# Transcripts are polled from poll_interval, backing off to max_poll_interval while queued or processing.
+poll_interval = 3.0
+max_poll_interval = 30.0
+# None for the network, benchmarks swap in an httpx.MockTransport standing in for AssemblyAI.
+transport: Optional[httpx.AsyncBaseTransport] = None
+
+__client: Optional[httpx.AsyncClient] = None
+__background_lemur_slots: Optional[asyncio.Semaphore] = None
+
+
+def client() -> httpx.AsyncClient:
+    global __client
+
+    # Created on first use, the API key is only configured once the app starts.
+    if __client is None or __client.is_closed:
+        __client = httpx.AsyncClient(
+            base_url=assemblyai.settings.base_url,
+            headers={'authorization': assemblyai.settings.api_key},
+            timeout=httpx.Timeout(request_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    return __client
+
+
+def background_lemur_slots() -> asyncio.Semaphore:
+    global __background_lemur_slots
+
+    if __background_lemur_slots is None:
+        __background_lemur_slots = asyncio.Semaphore(max_concurrent_lemur_calls)
+
+    return __background_lemur_slots
+
+
+async def close():
+    global __client
+
+    if __client is not None:
+        await __client.aclose()
+        __client = None
+
+
+class TranscriptNotFoundError(types.TranscriptError):
+    pass
+
+
+class ServiceUnavailableError(Exception):
+    # AssemblyAI is rate limiting us, overloaded or down. Unlike its other errors, worth trying again later.
+    pass
+
+
+async def transcribe(
+        audio_url: str,
+        config: assemblyai.TranscriptionConfig,
+        timeout: float = transcribe_timeout,
+        transcript_id: Optional[str] = None,
+        on_submitted: Optional[Callable[[str], Awaitable]] = None,
+) -> tuple[types.TranscriptResponse, dict]:
+    """
+    Submits audio_url for transcription and waits for AssemblyAI to finish, without holding a thread.
+    Returns the parsed transcript and the response body as sent, including fields the SDK doesn't model.
+
+    A transcript can't be cancelled (or deleted) while queued or processing, so one given up on through
+    cancellation or the timeout keeps going remotely. on_submitted gets its id to store, pass that back
+    as transcript_id to pick up the wait rather than paying for the same transcription again.
+    """
+    if transcript_id:
+        try:
+            return await asyncio.wait_for(wait_for_transcript(transcript_id), timeout)
+        except TranscriptNotFoundError:
+            print(f'AssemblyAI transcript {transcript_id} is gone, submitting {audio_url} again.')
+
+    transcript_id = await submit_transcript(audio_url, config)
+    if on_submitted:
+        await on_submitted(transcript_id)
+
+    return await asyncio.wait_for(wait_for_transcript(transcript_id), timeout)
+
+
+async def submit_transcript(audio_url: str, config: assemblyai.TranscriptionConfig) -> str:
+    request = types.TranscriptRequest(audio_url=audio_url, **config.raw.dict(exclude_none=True))
+    response = await client().post('/v2/transcript', json=request.dict(exclude_none=True, by_alias=True))
+    if response.status_code != httpx.codes.OK:
+        raise api_error(response, types.TranscriptError, f'Failed to transcribe url {audio_url}')
+
+    return response.json()['id']
+
+
+async def wait_for_transcript(transcript_id: str) -> tuple[types.TranscriptResponse, dict]:
+    interval = poll_interval
+    while True:
+        response = await client().get(f'/v2/transcript/{transcript_id}')
+        if response.status_code == httpx.codes.NOT_FOUND:
+            raise TranscriptNotFoundError(f'Transcript {transcript_id} not found: {error_message(response)}')
+        if response.status_code != httpx.codes.OK:
+            raise api_error(response, types.TranscriptError, f'Failed to retrieve transcript {transcript_id}')
+
+        raw = response.json()
+        transcript = types.TranscriptResponse.parse_obj(raw)
+        if transcript.status in {types.TranscriptStatus.completed, types.TranscriptStatus.error}:
+            return transcript, raw
+
+        await asyncio.sleep(interval)
+        interval = min(interval * 1.5, max_poll_interval)
+
+
+async def lemur_task(
+        prompt: str,
+        input_text: str,
+        final_model: LemurModel = LemurModel.basic,
+        max_output_size: Optional[int] = None,
+        temperature: Optional[float] = None,
+        timeout: float = lemur_timeout,
+        background: bool = False,
+) -> types.LemurTaskResponse:
+    # Cancelling the caller drops the connection, and with it the LeMUR request.
+    request = types.LemurTaskRequest(
+        sources=[],
+        prompt=prompt,
+        input_text=input_text,
+        final_model=final_model,
+        max_output_size=max_output_size,
+        temperature=temperature,
+    )
+    if not background:
+        response = await client().post('/lemur/v3/generate/task', json=request.dict(exclude_none=True), timeout=timeout)
+    else:
+        slots = background_lemur_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), lemur_slot_timeout)
+        except asyncio.TimeoutError:
+            raise ServiceUnavailableError(f'No LeMUR slot free after {lemur_slot_timeout:,.0f} sec.')
+        try:
+            response = await client().post(
+                '/lemur/v3/generate/task', json=request.dict(exclude_none=True), timeout=timeout
+            )
+        finally:
+            slots.release()
+    if response.status_code != httpx.codes.OK:
+        raise api_error(response, types.LemurError, 'Failed to call LeMUR task')
+
+    return types.LemurTaskResponse.parse_obj(response.json())
+
+
+def api_error(response: httpx.Response, error_class: type, message: str) -> Exception:
+    if response.status_code == httpx.codes.TOO_MANY_REQUESTS or response.status_code >= 500:
+        return ServiceUnavailableError(f'{message}: {error_message(response)}')
+
+    return error_class(f'{message}: {error_message(response)}')
+
+
+def error_message(response: httpx.Response) -> str:
+    # noinspection PyBroadException
+    try:
+        return response.json()['error']
+    except Exception:
+        return f'{response.status_code} {response.text}'
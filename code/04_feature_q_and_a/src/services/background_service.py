@@ -1,63 +1,359 @@
 import asyncio
+import collections
 import datetime
+import os
+import socket
+import uuid
 from typing import Optional
 
 import bson
+import httpx
+import pymongo
+import pymongo.errors
 
 from db.job import BackgroundJob, JobStatus, JobActions
-from services import podcast_service, ai_service
+from services import podcast_service, ai_service, assemblyai_service, job_scheduler
 
+# Jobs run at once in this process, and within that, per action. A long transcription
+# only ties up one transcribe slot, summaries and chat prep keep flowing around it.
+max_concurrent_jobs = 16
+max_jobs_per_action: dict[str, int] = {
+    JobActions.transcribe: 8,
+    JobActions.summarize: 4,
+    JobActions.chat: 16,
+}
+# Seconds between looks at the queue when it is empty or every useful slot is busy.
+poll_interval = 1.0
+# On shutdown running jobs get this long to finish, then they are cancelled and put back in the queue.
+drain_timeout = 30.0
+# How long a claimed job belongs to this worker without a heartbeat. Running jobs heartbeat
+# every heartbeat_seconds, so a lease only runs out when its worker is gone or wedged.
+lease_seconds = 2 * 60
+heartbeat_seconds = 20
+# Seconds between sweeps for expired leases, their jobs go back in the queue (or to dead).
+reaper_interval = 60
+# Attempts before a job is dead, waiting retry_backoff_seconds * 2^(attempt - 1) between them.
+max_job_attempts = 5
+retry_backoff_seconds = 30
+max_retry_backoff_seconds = 60 * 60
 
-async def create_background_job(action: JobActions, podcast_id: str, episode_number: int) -> BackgroundJob:
-    job = BackgroundJob(action=action, podcast_id=podcast_id, episode_number=episode_number)
-    await job.save()
+# A job for one of these waits on the episode's transcribe job when there is no transcript yet.
+transcript_first_actions = {JobActions.summarize, JobActions.chat}
+# Every status short of is_finished. One job per action and episode in these, see create_background_job().
+unfinished_statuses = [JobStatus.blocked, JobStatus.awaiting, JobStatus.processing]
+
+# Failures worth another attempt: the network, MongoDB or AssemblyAI having a bad moment. Anything
+# else (an AssemblyAI error status, a missing episode, an unknown action) would fail the same way
+# again, and a retried transcription is paid for again, so those jobs fail straight away.
+transient_errors = (
+    httpx.TransportError,
+    asyncio.TimeoutError,
+    pymongo.errors.ConnectionFailure,
+    assemblyai_service.ServiceUnavailableError,
+)
+
+# Identifies this process as the lease owner of the jobs it claims, unique across hosts and restarts.
+worker_id = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+
+async def create_background_job(
+        action: JobActions,
+        podcast_id: str,
+        episode_number: int,
+        priority: int = job_scheduler.bulk_priority,
+        user_id: Optional[bson.ObjectId] = None,
+) -> BackgroundJob:
+    """
+    Queues action for the episode, or returns the job already queued or running for it, so double-clicks
+    and a crowd on a new episode share one job. Without a transcript yet, a summary or chat job waits on
+    the episode's transcribe job (reused or queued here) rather than transcribing the episode a second time.
+    Reusing a job raises it (and what it waits on) to priority if that is higher.
+    """
+    job = await unfinished_job(action, podcast_id, episode_number)
+    if job:
+        print(f'Reusing background job {job.id} for {action} {podcast_id} episode {episode_number}.')
+        if priority > job.priority:
+            await raise_priority(job, priority)
+        return job
+
+    depends_on = None
+    if action in transcript_first_actions:
+        status = await ai_service.ai_status_for_episode(podcast_id, episode_number)
+        if not status.has_transcript:
+            depends_on = (await create_background_job(
+                JobActions.transcribe, podcast_id, episode_number, priority, user_id
+            )).id
+
+    episode = await podcast_service.episode_by_number(podcast_id, episode_number)
+    new_job = {
+        'created_date': datetime.datetime.now(),
+        'processing_status': JobStatus.blocked if depends_on else JobStatus.awaiting,
+        'is_finished': False,
+        'attempts': 0,
+        'depends_on': depends_on,
+        'user_id': user_id,
+        'duration_in_sec': (episode and episode.duration_in_sec) or job_scheduler.unknown_duration_seconds,
+    }
+    job = await upsert_job(action, podcast_id, episode_number, new_job, priority)
+    if job.depends_on and job.processing_status == JobStatus.blocked:
+        prerequisite = await job_by_id(job.depends_on)
+        if prerequisite and prerequisite.is_finished:
+            # The transcription finished before this job was saved, so settling its dependents missed us.
+            await settle_dependents(prerequisite.id, prerequisite.processing_status)
+            job = await job_by_id(job.id) or job
 
     return job
 
 
-async def pending_jobs(limit=1_000) -> list[BackgroundJob]:
+def unfinished_job_query(action: str, podcast_id: str, episode_number: int) -> dict:
+    # Backed by podcast_and_episode_status_ascend, unique_unfinished_job keeps it to one match.
+    return {
+        'podcast_id': podcast_id,
+        'episode_number': episode_number,
+        'processing_status': {'$in': unfinished_statuses},
+        'action': action,
+    }
+
+
+async def unfinished_job(action: str, podcast_id: str, episode_number: int) -> Optional[BackgroundJob]:
+    doc = await BackgroundJob.get_motor_collection().find_one(unfinished_job_query(action, podcast_id, episode_number))
+
+    return BackgroundJob.model_validate(doc) if doc else None
+
+
+async def upsert_job(action: str, podcast_id: str, episode_number: int, new_job: dict, priority: int) -> BackgroundJob:
+    # The equality fields of the query become part of the new document, new_job fills in the rest.
+    query = unfinished_job_query(action, podcast_id, episode_number)
+    update = {'$setOnInsert': new_job, '$max': {'priority': priority}}
+
+    collection = BackgroundJob.get_motor_collection()
     try:
-        return await (
-            BackgroundJob.find(BackgroundJob.processing_status == JobStatus.awaiting)
-            .sort('created_date')
-            .limit(limit)
-            .to_list()
+        doc = await collection.find_one_and_update(
+            query, update, upsert=True, return_document=pymongo.ReturnDocument.AFTER,
         )
-    except Exception as x:
-        print(f'Error retrieving pending jobs: {x}')
-        return []
+    except pymongo.errors.DuplicateKeyError:
+        # An identical request inserted between our lookup and insert, theirs is the job.
+        doc = await collection.find_one_and_update(query, {'$max': {'priority': priority}},
+                                                   return_document=pymongo.ReturnDocument.AFTER)
+        if not doc:
+            return await upsert_job(action, podcast_id, episode_number, new_job, priority)
 
+    return BackgroundJob.model_validate(doc)
 
-async def start_job_processing(job_id: bson.ObjectId) -> Optional[BackgroundJob]:
-    job = await job_by_id(job_id)
-    if not job:
-        raise Exception(f'No nob with that ID: {job_id}')
 
-    if job.processing_status != JobStatus.awaiting:
-        raise Exception(f'Cannot start job {job_id} with status {job.processing_status}.')
+async def raise_priority(job: BackgroundJob, priority: int):
+    # A summary someone is now waiting on makes the transcription it is blocked on just as urgent.
+    job_ids = [job.id, job.depends_on] if job.depends_on else [job.id]
+    await BackgroundJob.get_motor_collection().update_many(
+        {'_id': {'$in': job_ids}, 'is_finished': False}, {'$max': {'priority': priority}},
+    )
 
-    job.processing_status = JobStatus.processing
-    job.started_date = datetime.datetime.now()
-    await job.save()
 
-    return job
+async def settle_dependents(job_id: bson.ObjectId, processing_status: str) -> int:
+    """
+    Call once job_id is finished. If it succeeded the jobs blocked on it are queued, otherwise they
+    fail with it. Retrying them would only redo the failed work, e.g. pay for another transcription.
+    """
+    update = {'processing_status': JobStatus.awaiting}
+    if processing_status not in (JobStatus.success, JobStatus.unneeded):
+        update = {
+            'processing_status': JobStatus.failed, 'is_finished': True, 'finished_date': datetime.datetime.now(),
+            'error_msg': f'The job {job_id} this one depends on finished as {processing_status}.',
+        }
 
+    result = await BackgroundJob.get_motor_collection().update_many(
+        {'depends_on': job_id, 'processing_status': JobStatus.blocked}, {'$set': update},
+    )
 
-async def complete_job(job_id: bson.ObjectId, processing_status: JobStatus) -> Optional[BackgroundJob]:
-    job = await job_by_id(job_id)
-    if not job:
-        raise Exception(f'No job with ID {job_id}.')
+    return result.modified_count
 
-    if job.processing_status != JobStatus.processing:
-        raise Exception(f'Cannot complete job {job_id} with status {job.processing_status}.')
 
-    job.processing_status = processing_status
-    job.is_finished = True
-    job.finished_date = datetime.datetime.now()
+async def release_stranded_dependents() -> int:
+    """Settles blocked jobs whose prerequisite finished without settling them, e.g. its worker died in between."""
+    collection = BackgroundJob.get_motor_collection()
+    blocked_on = await collection.distinct('depends_on', {'processing_status': JobStatus.blocked})
 
-    await job.save()
+    count = 0
+    for job_id in blocked_on:
+        prerequisite = await job_by_id(job_id) if job_id else None
+        if prerequisite is None:
+            # Gone altogether, the 7 day expiry removed it. Let them run and find out.
+            count += await settle_dependents(job_id, JobStatus.success)
+        elif prerequisite.is_finished:
+            count += await settle_dependents(job_id, prerequisite.processing_status)
 
-    return job
+    return count
+
+
+async def claim_job(actions: Optional[list[str]] = None) -> Optional[BackgroundJob]:
+    """
+    Takes the next waiting job (for one of actions) off the queue, next as in the scheduling policy
+    set in job_scheduler. The check and the claim are one find_one_and_update, so any number of
+    worker processes can share the queue without running a job twice.
+    """
+    query = {
+        'processing_status': JobStatus.awaiting,
+        '$or': [{'not_before': None}, {'not_before': {'$lte': datetime.datetime.now()}}],
+    }
+    if actions is not None:
+        query['action'] = {'$in': list(actions)}
+
+    policy = job_scheduler.current_policy()
+    narrowed = await policy.candidates(query) if policy.candidates else [{}]
+    for narrowing in narrowed:
+        doc = await BackgroundJob.get_motor_collection().find_one_and_update(
+            {**query, **narrowing},
+            {'$set': claim_update(), '$inc': {'attempts': 1}},
+            sort=policy.sort,
+            return_document=pymongo.ReturnDocument.AFTER,
+        )
+        if doc:
+            return BackgroundJob.model_validate(doc)
+
+    return None
+
+
+def claim_update() -> dict:
+    now = datetime.datetime.now()
+    return {
+        'processing_status': JobStatus.processing,
+        'started_date': now,
+        'heartbeat_date': now,
+        'lease_owner': worker_id,
+        'lease_expires': now + datetime.timedelta(seconds=lease_seconds),
+    }
+
+
+async def renew_lease(job_id: bson.ObjectId) -> bool:
+    now = datetime.datetime.now()
+    result = await BackgroundJob.get_motor_collection().update_one(
+        {'_id': job_id, 'processing_status': JobStatus.processing, 'lease_owner': worker_id},
+        {'$set': {'heartbeat_date': now, 'lease_expires': now + datetime.timedelta(seconds=lease_seconds)}},
+    )
+
+    return result.matched_count > 0
+
+
+async def retry_or_bury_job(
+        job_id: bson.ObjectId, attempts: int, error_msg: str, guard: dict
+) -> Optional[JobStatus]:
+    """
+    Puts a job that failed or lost its worker back in the queue after a backoff, or marks it dead
+    once it has had max_job_attempts. guard narrows which state it may change from. Returns the new
+    status, or None when the guard no longer matched and the job was left alone.
+    """
+    now = datetime.datetime.now()
+    if attempts >= max_job_attempts:
+        update = {
+            'processing_status': JobStatus.dead, 'is_finished': True, 'finished_date': now,
+        }
+    else:
+        backoff = min(retry_backoff_seconds * 2 ** max(attempts - 1, 0), max_retry_backoff_seconds)
+        update = {
+            'processing_status': JobStatus.awaiting, 'started_date': None,
+            'not_before': now + datetime.timedelta(seconds=backoff),
+        }
+
+    update.update({'lease_owner': None, 'lease_expires': None, 'error_msg': error_msg})
+    result = await BackgroundJob.get_motor_collection().update_one({'_id': job_id, **guard}, {'$set': update})
+    if not result.modified_count:
+        return None
+    if update['processing_status'] == JobStatus.dead:
+        await settle_dependents(job_id, JobStatus.dead)
+
+    return update['processing_status']
+
+
+async def fail_job(job: BackgroundJob, error_msg: str, retry: bool) -> Optional[JobStatus]:
+    """
+    Retries the job later when retry is set, fails it for good otherwise. Returns
+    the new status, or None if this worker no longer held the job.
+    """
+    guard = {'processing_status': JobStatus.processing, 'lease_owner': worker_id}
+    if retry:
+        return await retry_or_bury_job(job.id, job.attempts, error_msg, guard)
+
+    result = await BackgroundJob.get_motor_collection().update_one({'_id': job.id, **guard}, {'$set': {
+        'processing_status': JobStatus.failed,
+        'is_finished': True,
+        'finished_date': datetime.datetime.now(),
+        'lease_owner': None,
+        'lease_expires': None,
+        'error_msg': error_msg,
+    }})
+    if not result.modified_count:
+        return None
+
+    await settle_dependents(job.id, JobStatus.failed)
+    return JobStatus.failed
+
+
+async def reap_expired_leases() -> int:
+    """Sends processing jobs whose worker stopped heartbeating back to the queue. Returns how many."""
+    now = datetime.datetime.now()
+    expired = {
+        'processing_status': JobStatus.processing,
+        '$or': [
+            {'lease_expires': {'$lt': now}},
+            # Claimed before jobs had leases.
+            {'lease_expires': None, 'started_date': {'$lt': now - datetime.timedelta(seconds=lease_seconds)}},
+        ],
+    }
+
+    count = 0
+    async for doc in BackgroundJob.get_motor_collection().find(expired, {'attempts': 1, 'lease_owner': 1}):
+        # Only if it is still the same expired claim, the owner may have renewed it in the meantime.
+        guard = {'processing_status': JobStatus.processing, 'lease_owner': doc.get('lease_owner'), **expired}
+        status = await retry_or_bury_job(
+            doc['_id'], doc.get('attempts') or 0, f'Worker {doc.get("lease_owner")} stopped responding.', guard
+        )
+        if status is None:
+            continue
+        print(f'Reaped background job {doc["_id"]} from {doc.get("lease_owner")}, now {status}.')
+        count += 1
+
+    return count
+
+
+async def save_assemblyai_id(job_id: bson.ObjectId, assemblyai_id: str):
+    await BackgroundJob.get_motor_collection().update_one(
+        {'_id': job_id, 'processing_status': JobStatus.processing, 'lease_owner': worker_id},
+        {'$set': {'assemblyai_id': assemblyai_id}},
+    )
+
+
+async def requeue_job(job_id: bson.ObjectId):
+    # An interrupted job goes back in the queue as if it never started.
+    await BackgroundJob.get_motor_collection().update_one(
+        {'_id': job_id, 'processing_status': JobStatus.processing, 'lease_owner': worker_id},
+        {
+            '$set': {
+                'processing_status': JobStatus.awaiting, 'started_date': None,
+                'lease_owner': None, 'lease_expires': None,
+            },
+            # Not the job's fault, this attempt doesn't count.
+            '$inc': {'attempts': -1},
+        },
+    )
+
+
+async def complete_job(job_id: bson.ObjectId, processing_status: JobStatus) -> Optional[BackgroundJob]:
+    # Only the lease owner can finish a job, anyone else lost it along the way.
+    doc = await BackgroundJob.get_motor_collection().find_one_and_update(
+        {'_id': job_id, 'processing_status': JobStatus.processing, 'lease_owner': worker_id},
+        {'$set': {
+            'processing_status': processing_status,
+            'is_finished': True,
+            'finished_date': datetime.datetime.now(),
+            'lease_expires': None,
+        }},
+        return_document=pymongo.ReturnDocument.AFTER,
+    )
+    if not doc:
+        raise Exception(f'Cannot complete job {job_id}, it is not processing under this worker ({worker_id}).')
+
+    await settle_dependents(job_id, processing_status)
+    return BackgroundJob.model_validate(doc)
 
 
 async def job_by_id(job_id: bson.ObjectId) -> Optional[BackgroundJob]:
@@ -72,57 +368,188 @@ async def is_job_finished(job_id: bson.ObjectId) -> bool:
     return job.is_finished
 
 
+class WorkerPool:
+    __slots__ = ['running', 'running_by_action', 'stopping', 'slot_freed', 'dispatcher']
+
+    def __init__(self):
+        self.running: dict[bson.ObjectId, asyncio.Task] = {}
+        self.running_by_action: collections.Counter = collections.Counter()
+        self.stopping = False
+        self.slot_freed = asyncio.Event()
+        self.dispatcher: Optional[asyncio.Task] = None
+
+    def open_actions(self) -> list[str]:
+        """The actions with a free slot, jobs for any other action stay in the queue for now."""
+        if len(self.running) >= max_concurrent_jobs:
+            return []
+
+        return [action for action, limit in max_jobs_per_action.items() if self.running_by_action[action] < limit]
+
+    async def run(self):
+        print(f'Background asyncio service worker up and running, {max_concurrent_jobs} jobs at a time.')
+        await asyncio.sleep(1)
+
+        loop = asyncio.get_running_loop()
+        next_reap = loop.time()
+        while not self.stopping:
+            if loop.time() >= next_reap:
+                next_reap = loop.time() + reaper_interval
+                try:
+                    await reap_expired_leases()
+                    await release_stranded_dependents()
+                except Exception as x:
+                    print(f'Error reaping expired background job leases: {x}')
+
+            started = 0
+            actions = self.open_actions()
+            while actions and not self.stopping:
+                try:
+                    job = await claim_job(actions)
+                except Exception as x:
+                    print(f'Error claiming a background job: {x}')
+                    job = None
+                if not job:
+                    break
+
+                self.start(job)
+                started += 1
+                actions = self.open_actions()
+
+            if not started:
+                # Nothing we have room for, wait for a job to finish or for new work to show up.
+                self.slot_freed.clear()
+                try:
+                    await asyncio.wait_for(self.slot_freed.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self, job: BackgroundJob):
+        task = asyncio.create_task(process_job(job))
+        self.running[job.id] = task
+        self.running_by_action[job.action] += 1
+
+        def finished(_: asyncio.Task):
+            self.running.pop(job.id, None)
+            self.running_by_action[job.action] -= 1
+            self.slot_freed.set()
+
+        task.add_done_callback(finished)
+
+    async def drain(self, timeout: float = drain_timeout):
+        self.stopping = True
+        self.slot_freed.set()
+        if self.dispatcher:
+            await asyncio.gather(self.dispatcher, return_exceptions=True)
+
+        tasks = list(self.running.values())
+        if not tasks:
+            return
+
+        print(f'Waiting up to {timeout:,.1f} sec for {len(tasks):,} background jobs to finish ...')
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            print(f'Cancelled {len(pending):,} unfinished background jobs, they will run again on restart.')
+
+
+__pool: Optional[WorkerPool] = None
+
+
 async def worker_function():
-    print('Background asyncio service worker up and running.')
-    await asyncio.sleep(1)
+    global __pool
 
-    while True:
-        jobs = await pending_jobs(1)
-        if not jobs:
-            # print('No new jobs to process, chilling for now ...')
-            await asyncio.sleep(1)
-            continue
+    __pool = WorkerPool()
+    __pool.dispatcher = asyncio.current_task()
+    await __pool.run()
+
+
+async def stop_workers():
+    if __pool is not None:
+        await __pool.drain()
 
-        job = jobs[0]
+
+async def process_job(job: BackgroundJob):
+    # Already claimed by this worker through claim_job().
+    print(f'Starting new job: {job.id}, {job.action} {job.podcast_id} episode {job.episode_number}')
+
+    heartbeat = asyncio.create_task(keep_lease(job, asyncio.current_task()))
+    try:
+        await run_job(job)
+    except asyncio.CancelledError:
+        await asyncio.shield(requeue_job(job.id))
+        raise
+    finally:
+        heartbeat.cancel()
+
+
+async def keep_lease(job: BackgroundJob, job_task: asyncio.Task):
+    while True:
+        await asyncio.sleep(heartbeat_seconds)
         try:
-            await start_job_processing(job.id)
-            print(f'Starting new job: {job.id}, {job.podcast_id} episode {job.episode_number}')
+            renewed = await renew_lease(job.id)
         except Exception as x:
-            print(f'Error starting new job: {job.id}: {x}')
+            # Try again next beat, the lease has room for a few missed ones.
+            print(f'Error renewing the lease on background job {job.id}: {x}')
             continue
 
-        try:
-            episode = await podcast_service.episode_by_number(job.podcast_id, job.episode_number)
-            if not episode:
-                print(f'Error, cannot process job {job.id}, episode not found.')
-                await complete_job(job.id, JobStatus.failed)
-                continue
-        except Exception as x:
-            print(f'Error getting podcast details for job: j={job.id}, p={job.podcast_id}, e={job.episode_number}: {x}')
+        if not renewed:
+            # Reaped and maybe running elsewhere by now, stop rather than do the work twice.
+            print(f'Lost the lease on background job {job.id}, stopping it here.')
+            job_task.cancel()
+            return
 
-        try:
-            # match job.action:
-            #     case JobActions.summarize:
-            #         await ai_service.worker_summarize_episode(job.podcast_id, job.episode_number)
-            #     case JobActions.transcribe:
-            #         await ai_service.worker_transcribe_episode(job.podcast_id, job.episode_number)
-            #     case JobActions.chat:
-            #         await ai_service.worker_enable_chat_episode(job.podcast_id, job.episode_number)
-            #     case _:
-            #         raise Exception(f'What am I supposed to do with {job.action}?')
-
-            # Here is a Python 3.9 compatible version. If you are using 3.10 or later,
-            # please prefer the above.
-            if job.action == JobActions.summarize:
-                await ai_service.worker_summarize_episode(job.podcast_id, job.episode_number)
-            elif job.action == JobActions.transcribe:
-                await ai_service.worker_transcribe_episode(job.podcast_id, job.episode_number)
-            elif job.action == JobActions.chat:
-                await ai_service.worker_enable_chat_episode(job.podcast_id, job.episode_number)
-            else:
-                raise Exception(f'What am I supposed to do with {job.action}?')
-
-            await complete_job(job.id, JobStatus.success)
-        except Exception as x:
-            print(f'Error processing job {job.id} for {job.action}: {x}')
-            await complete_job(job.id, JobStatus.failed)
+
+async def run_job(job: BackgroundJob):
+    try:
+        episode = await podcast_service.episode_by_number(job.podcast_id, job.episode_number)
+        if not episode:
+            print(f'Error, cannot process job {job.id}, episode not found.')
+            await fail_job(job, 'Episode not found.', retry=False)
+            return
+    except Exception as x:
+        print(f'Error getting podcast details for job: j={job.id}, p={job.podcast_id}, e={job.episode_number}: {x}')
+
+    async def on_submitted(assemblyai_id: str):
+        await save_assemblyai_id(job.id, assemblyai_id)
+
+    try:
+        # match job.action:
+        #     case JobActions.summarize:
+        #         await ai_service.worker_summarize_episode(
+        #             job.podcast_id, job.episode_number, job.assemblyai_id, on_submitted
+        #         )
+        #     case JobActions.transcribe:
+        #         await ai_service.worker_transcribe_episode(
+        #             job.podcast_id, job.episode_number, job.assemblyai_id, on_submitted
+        #         )
+        #     case JobActions.chat:
+        #         await ai_service.worker_enable_chat_episode(
+        #             job.podcast_id, job.episode_number, job.assemblyai_id, on_submitted
+        #         )
+        #     case _:
+        #         raise Exception(f'What am I supposed to do with {job.action}?')
+
+        # Here is a Python 3.9 compatible version. If you are using 3.10 or later,
+        # please prefer the above.
+        if job.action == JobActions.summarize:
+            await ai_service.worker_summarize_episode(
+                job.podcast_id, job.episode_number, job.assemblyai_id, on_submitted
+            )
+        elif job.action == JobActions.transcribe:
+            await ai_service.worker_transcribe_episode(
+                job.podcast_id, job.episode_number, job.assemblyai_id, on_submitted
+            )
+        elif job.action == JobActions.chat:
+            await ai_service.worker_enable_chat_episode(
+                job.podcast_id, job.episode_number, job.assemblyai_id, on_submitted
+            )
+        else:
+            raise Exception(f'What am I supposed to do with {job.action}?')
+
+        await complete_job(job.id, JobStatus.success)
+    except Exception as x:
+        status = await fail_job(job, f'{type(x).__name__}: {x}', retry=isinstance(x, transient_errors))
+        outcome = f'now {status}' if status else 'no longer held by this worker'
+        print(f'Error processing job {job.id} for {job.action} (attempt {job.attempts}), {outcome}: {x}')
@@ -0,0 +1,130 @@
+import datetime
+import hashlib
+import json
+from typing import Iterator, Optional
+
+from db.transcripts import EpisodeTranscriptWords
+from services import transcript_service
+
+# Bump when the output of any format changes, so clients holding the old ETag download it again.
+export_version = 1
+# Longest caption cue, sentences are split into cues of at most this many words and seconds.
+caption_max_words = 12
+caption_max_seconds = 7.0
+# How long the last cue stays up, there is no next word to end it.
+caption_tail_seconds = 2.0
+
+export_media_types = {
+    'srt': 'application/x-subrip',
+    'vtt': 'text/vtt',
+    'txt': 'text/plain',
+    'json': 'application/json',
+}
+
+
+class CaptionCue:
+    __slots__ = ['start', 'end', 'text']
+
+    def __init__(self, start: float, end: float, text: str):
+        self.start = start
+        self.end = end
+        self.text = text
+
+
+def export_etag(podcast_id: str, episode_number: int, export_format: str, updated_date: datetime.datetime) -> str:
+    # Strong ETag, the export is a pure function of the stored transcript, which bumps updated_date on change.
+    key = f'{podcast_id}|{episode_number}|{export_format}|{export_version}|{updated_date.isoformat()}'
+    return '"' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    # If-None-Match uses the weak comparison, W/"abc" matches "abc".
+    tags = {t.strip().removeprefix('W/') for t in if_none_match.split(',')}
+    return '*' in tags or etag in tags
+
+
+def export_transcript(db_tx: EpisodeTranscriptWords, export_format: str) -> Iterator[str]:
+    """
+    The transcript in export_format, yielded a cue / line / word at a time, so the response streams
+    out without the whole document ever being built as one string.
+    """
+    if export_format == 'srt':
+        return srt_lines(caption_cues(db_tx))
+    if export_format == 'vtt':
+        return vtt_lines(caption_cues(db_tx))
+    if export_format == 'txt':
+        return text_lines(db_tx)
+    if export_format == 'json':
+        return json_lines(db_tx)
+
+    raise ValueError(f'Unknown transcript export format {export_format}.')
+
+
+def caption_cues(db_tx: EpisodeTranscriptWords) -> Iterator[CaptionCue]:
+    texts = transcript_service.word_texts(db_tx)
+    starts = transcript_service.word_starts(db_tx)
+    start_indexes, end_indexes, _ = transcript_service.packed_sentences_for(db_tx, texts).bounds()
+
+    for sentence_start, sentence_end in zip(start_indexes.tolist(), end_indexes.tolist()):
+        cue_start = sentence_start
+        for idx in range(sentence_start + 1, sentence_end + 1):
+            if idx < sentence_end and idx - cue_start < caption_max_words \
+                    and starts[idx] - starts[cue_start] < caption_max_seconds:
+                continue
+
+            text = ' '.join(texts[cue_start:idx]).strip()
+            if text:
+                # Up until the next word is spoken, within reason.
+                end = starts[idx] if idx < len(starts) else starts[idx - 1] + caption_tail_seconds
+                end = min(end, starts[cue_start] + caption_max_seconds)
+                yield CaptionCue(starts[cue_start], max(end, starts[cue_start]), text)
+            cue_start = idx
+
+
+def srt_lines(cues: Iterator[CaptionCue]) -> Iterator[str]:
+    for number, cue in enumerate(cues, start=1):
+        yield f'{number}\n{caption_time(cue.start, ",")} --> {caption_time(cue.end, ",")}\n{cue.text}\n\n'
+
+
+def vtt_lines(cues: Iterator[CaptionCue]) -> Iterator[str]:
+    yield 'WEBVTT\n\n'
+    for cue in cues:
+        yield f'{caption_time(cue.start, ".")} --> {caption_time(cue.end, ".")}\n{cue.text}\n\n'
+
+
+def text_lines(db_tx: EpisodeTranscriptWords) -> Iterator[str]:
+    for sentence in transcript_service.sentences_for_transcript(db_tx):
+        yield sentence.text + '\n'
+
+
+def json_lines(db_tx: EpisodeTranscriptWords) -> Iterator[str]:
+    yield json.dumps({'podcast_id': db_tx.podcast_id, 'episode_number': db_tx.episode_number})[:-1]
+    yield ', "words": [\n'
+
+    separator = ''
+    for word in db_tx.transcript_words:
+        item = {'text': word.text, 'start_in_sec': round(word.start_in_sec, 3), 'confidence': round(word.confidence, 3)}
+        yield separator + json.dumps(item)
+        separator = ',\n'
+
+    yield '\n]}\n'
+
+
+def caption_time(seconds: float, millisecond_separator: str) -> str:
+    total_ms = max(0, int(round(seconds * 1000)))
+    hours, rest = divmod(total_ms, 3_600_000)
+    minutes, rest = divmod(rest, 60_000)
+    secs, ms = divmod(rest, 1000)
+
+    return f'{hours:02}:{minutes:02}:{secs:02}{millisecond_separator}{ms:03}'
+
+
+def export_filename(podcast_id: str, episode_number: int, export_format: str) -> str:
+    return f'{podcast_id}-episode-{episode_number}.{export_format}'
+
+
+def is_export_format(export_format: str) -> bool:
+    return export_format in export_media_types
@@ -0,0 +1,129 @@
+import asyncio
+import datetime
+from typing import Optional
+
+import pymongo.errors
+
+from db.episode import Episode
+from db.transcripts import EpisodeTranscript
+
+# How long the indexer waits for a burst of changes to settle, and the most it will
+# postpone a pass while changes keep streaming in.
+debounce_seconds = 5
+max_delay_seconds = 30
+
+# A change stream that fails is reopened after watch_retry_seconds, doubling up to max_watch_retry_seconds.
+watch_retry_seconds = 1
+max_watch_retry_seconds = 60
+# Server error codes for "change streams need a replica set", the only failure the watcher stops on.
+change_streams_unsupported_codes = {40573}
+# ChangeStreamHistoryLost, the resume token fell off the oplog.
+change_stream_history_lost_code = 286
+
+# (podcast_id, episode_number) pairs waiting to be re-indexed. An episode number of None
+# means "check the whole podcast" (e.g. a feed import just added many episodes).
+pending_changes: set[tuple[str, Optional[int]]] = set()
+full_pass_requested = False
+
+__changed: Optional[asyncio.Event] = None
+
+
+def notify_episode_changed(podcast_id: str, episode_number: Optional[int]):
+    if not podcast_id:
+        return
+
+    pending_changes.add((podcast_id, episode_number))
+    __changed_event().set()
+
+
+def notify_podcast_changed(podcast_id: str):
+    notify_episode_changed(podcast_id, None)
+
+
+def request_full_pass():
+    global full_pass_requested
+    full_pass_requested = True
+    __changed_event().set()
+
+
+async def wait_for_changes(timeout: float) -> tuple[set[tuple[str, Optional[int]]], bool]:
+    """
+    Waits until changes arrive (or the timeout passes), then debounces the burst.
+    Returns the pending (podcast_id, episode_number) pairs and whether a full pass is due.
+    """
+    global full_pass_requested
+
+    changed = __changed_event()
+    try:
+        await asyncio.wait_for(changed.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        # Nothing arrived, time for a safety-net sweep of the whole catalog.
+        full_pass_requested = True
+
+    t0 = datetime.datetime.now()
+    while changed.is_set() and (datetime.datetime.now() - t0).total_seconds() < max_delay_seconds:
+        changed.clear()
+        await asyncio.sleep(debounce_seconds)
+
+    changed.clear()
+    changes = set(pending_changes)
+    pending_changes.clear()
+    full_pass = full_pass_requested
+    full_pass_requested = False
+
+    return changes, full_pass
+
+
+async def watch_collections():
+    # Change streams only exist on replica sets. On a standalone dev server this
+    # gives up quietly and the in-process notify_* calls drive the indexer instead.
+    await asyncio.gather(
+        __watch_collection(Episode),
+        __watch_collection(EpisodeTranscript),
+    )
+
+
+async def __watch_collection(document_class):
+    collection = document_class.get_motor_collection()
+    pipeline = [
+        {'$match': {'operationType': {'$in': ['insert', 'update', 'replace']}}},
+        # Only the keys we need, never the transcript words.
+        {'$project': {'fullDocument.podcast_id': 1, 'fullDocument.episode_number': 1}},
+    ]
+
+    resume_token = None
+    backoff = watch_retry_seconds
+    while True:
+        try:
+            async with collection.watch(pipeline, full_document='updateLookup', resume_after=resume_token) as stream:
+                print(f'>>> Search Engine: Watching {collection.name} for changes.')
+                backoff = watch_retry_seconds
+                resume_token = stream.resume_token or resume_token
+                async for change in stream:
+                    doc = change.get('fullDocument') or {}
+                    notify_episode_changed(doc.get('podcast_id'), doc.get('episode_number'))
+                    resume_token = stream.resume_token
+        except pymongo.errors.OperationFailure as x:
+            if x.code in change_streams_unsupported_codes:
+                print(f'>>> Search Engine: Change streams unavailable for {collection.name}, '
+                      f'using in-process events only ({x.code}).')
+                return
+            print(f'!!! ERROR watching {collection.name} for changes, retrying in {backoff:,.0f} sec: {x}')
+            if x.code == change_stream_history_lost_code:
+                # Can't resume from there any more, start fresh and let a sweep catch what was missed.
+                resume_token = None
+                request_full_pass()
+        except Exception as x:
+            # Step-downs, network blips and killed cursors. Picks up where it left off from resume_token.
+            print(f'!!! ERROR watching {collection.name} for changes, retrying in {backoff:,.0f} sec: {x}')
+
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, max_watch_retry_seconds)
+
+
+def __changed_event() -> asyncio.Event:
+    global __changed
+    if __changed is None:
+        __changed = asyncio.Event()
+
+    return __changed
@@ -0,0 +1,101 @@
+import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+import pymongo
+
+from db.job import BackgroundJob, JobStatus
+
+# Jobs someone is waiting on in the browser outrank bulk work (imports, backfills) under the priority policy.
+interactive_priority = 10
+bulk_priority = 0
+# Stands in for the length of episodes whose feed doesn't list a duration, about a typical episode.
+unknown_duration_seconds = 60 * 60
+
+# Which policy claim_job() uses, set from job_scheduling_policy in settings.json. With every job
+# at the same priority, priority is plain oldest first.
+scheduling_policy = 'priority'
+
+
+class SchedulingPolicy:
+    __slots__ = ['name', 'description', 'sort', 'candidates']
+
+    def __init__(
+            self,
+            name: str,
+            description: str,
+            sort: list[tuple[str, int]],
+            candidates: Optional[Callable[[dict], Awaitable[list[dict]]]] = None,
+    ):
+        self.name = name
+        self.description = description
+        # Order of the waiting jobs, the claim takes the first one.
+        self.sort = sort
+        # Given the claim's query, the narrower queries to try in turn (e.g. one per user).
+        # None to claim straight from the query.
+        self.candidates = candidates
+
+
+async def fair_share_candidates(query: dict) -> list[dict]:
+    collection = BackgroundJob.get_motor_collection()
+    waiting = {
+        doc['_id']: doc['oldest'] async for doc in collection.aggregate([
+            {'$match': query},
+            {'$group': {'_id': '$user_id', 'oldest': {'$min': '$created_date'}}},
+        ])
+    }
+    running = {
+        doc['_id']: doc['count'] async for doc in collection.aggregate([
+            {'$match': {'processing_status': JobStatus.processing}},
+            {'$group': {'_id': '$user_id', 'count': {'$sum': 1}}},
+        ])
+    }
+
+    return [{'user_id': user_id} for user_id in fair_share_order(waiting, running)]
+
+
+def fair_share_order(waiting: dict[Any, datetime.datetime], running: dict[Any, int]) -> list:
+    """
+    The users with jobs waiting (oldest created_date of each), fewest jobs running first
+    and the one waiting longest first among equals. Jobs without a user count as one user.
+    """
+    return sorted(waiting, key=lambda user_id: (running.get(user_id, 0), waiting[user_id]))
+
+
+policies: dict[str, SchedulingPolicy] = {p.name: p for p in [
+    SchedulingPolicy(
+        'fifo',
+        'Oldest job first.',
+        sort=[('created_date', pymongo.ASCENDING)],
+    ),
+    SchedulingPolicy(
+        'priority',
+        'Highest priority first, interactive over bulk, oldest first within a priority.',
+        sort=[('priority', pymongo.DESCENDING), ('created_date', pymongo.ASCENDING)],
+    ),
+    SchedulingPolicy(
+        'shortest-first',
+        'Shortest episode first. Lowest mean wait, but long episodes can wait a long time under load.',
+        sort=[('duration_in_sec', pymongo.ASCENDING), ('created_date', pymongo.ASCENDING)],
+    ),
+    SchedulingPolicy(
+        'fair-share',
+        'Next job from the user with the fewest running, so one user clicking through a back catalog '
+        'does not hold everyone else up. Then by priority and age within that user\'s jobs.',
+        sort=[('priority', pymongo.DESCENDING), ('created_date', pymongo.ASCENDING)],
+        candidates=fair_share_candidates,
+    ),
+]}
+
+
+def select_policy(name: str):
+    global scheduling_policy
+
+    if name not in policies:
+        raise Exception(f'Unknown job scheduling policy {name}, choose one of {", ".join(sorted(policies))}.')
+
+    scheduling_policy = name
+    print(f'Background jobs are scheduled {name}: {policies[name].description}')
+
+
+def current_policy() -> SchedulingPolicy:
+    return policies[scheduling_policy]
@@ -0,0 +1,262 @@
+import asyncio
+import concurrent.futures
+import datetime
+import math
+import time
+from typing import Any, Callable, Optional
+
+import pymongo
+
+from db.migration import MigrationCheckpoint
+from db.transcript_payload import TranscriptPayload, compress_payload
+from db.transcripts import EpisodeTranscript, PackedSentences, PackedWords
+
+# Defaults for the migrate.py CLI.
+batch_size = 100
+worker_count = 4
+# None for no cap. Otherwise migrations pace themselves so production traffic keeps its share of the server.
+max_docs_per_second: Optional[float] = None
+
+# The update for the migrated document, plus optionally a document for the migration's side collection.
+ConvertResult = Optional[tuple[dict, Optional[dict]]]
+
+
+class Migration:
+    __slots__ = ['name', 'description', 'document_class', 'query', 'projection', 'convert', 'side_document_class',
+                 'side_key']
+
+    def __init__(
+            self,
+            name: str,
+            description: str,
+            document_class: type,
+            query: dict,
+            convert: Callable[[dict], ConvertResult],
+            projection: Optional[dict] = None,
+            side_document_class: Optional[type] = None,
+            side_key: Optional[list[str]] = None,
+    ):
+        self.name = name
+        self.description = description
+        self.document_class = document_class
+        # Matches the documents still in the old format, also guards each write
+        # so a document the app rewrote in the meantime is left alone.
+        self.query = query
+        # Raw BSON dict in, ConvertResult (or None to leave it be) out. Runs in a worker
+        # process, so it must be a module level function with nothing but the doc as input.
+        self.convert = convert
+        self.projection = projection
+        # Side documents are upserted on side_key before the migrated document is updated,
+        # so data moved out of a document is always stored before it is removed.
+        self.side_document_class = side_document_class
+        self.side_key = side_key or []
+
+
+def convert_transcript_words(doc: dict) -> ConvertResult:
+    words = doc.get('words') or []
+    if not words:
+        return None
+
+    texts = [w.get('text') or '' for w in words]
+    starts = [w.get('start_in_sec') or 0.0 for w in words]
+    packed = PackedWords.pack(texts, starts, [w.get('confidence') or 0.0 for w in words])
+    sentences = PackedSentences.from_words(texts, starts)
+
+    # Confidences come back quantized, a content change, so bump updated_date for the ETags and caches keyed on it.
+    return {
+        '$set': {
+            'packed_words': packed.model_dump(),
+            'packed_sentences': sentences.model_dump(),
+            'updated_date': datetime.datetime.now(),
+        },
+        '$unset': {'words': ''},
+    }, None
+
+
+def segment_transcript_sentences(doc: dict) -> ConvertResult:
+    if doc.get('packed_words'):
+        words = PackedWords(**doc['packed_words']).unpack()
+        texts, starts = words.texts, words.starts
+    else:
+        words = doc.get('words') or []
+        texts = [w.get('text') or '' for w in words]
+        starts = [w.get('start_in_sec') or 0.0 for w in words]
+
+    if not len(texts):
+        return None
+
+    # Exports and the transcript pages are built from the sentences, so they change with them.
+    return {'$set': {
+        'packed_sentences': PackedSentences.from_words(texts, starts).model_dump(),
+        'updated_date': datetime.datetime.now(),
+    }}, None
+
+
+def offload_json_result(doc: dict) -> ConvertResult:
+    update = {'$unset': {'json_result': ''}}
+    payload = doc.get('json_result')
+    if payload is None:
+        return update, None
+
+    side_document = {
+        'created_date': datetime.datetime.now(),
+        'podcast_id': doc.get('podcast_id'),
+        'episode_number': doc.get('episode_number'),
+        'assemblyai_id': doc.get('assemblyai_id'),
+        **compress_payload(payload),
+    }
+
+    return update, side_document
+
+
+migrations: dict[str, Migration] = {m.name: m for m in [
+    Migration(
+        'pack-transcript-words',
+        'Rewrite legacy EpisodeTranscript.words subdocuments into the packed_words format.',
+        EpisodeTranscript,
+        query={'words.0': {'$exists': True}},
+        convert=convert_transcript_words,
+        projection={'words': 1},
+    ),
+    Migration(
+        'segment-transcript-sentences',
+        'Store the sentence boundaries for transcripts saved before EpisodeTranscript.packed_sentences.',
+        EpisodeTranscript,
+        query={'successful': True, 'packed_sentences': None},
+        convert=segment_transcript_sentences,
+        projection={'packed_words': 1, 'words': 1},
+    ),
+    Migration(
+        'offload-json-result',
+        'Move the raw AssemblyAI EpisodeTranscript.json_result into compressed transcript_payloads.',
+        EpisodeTranscript,
+        query={'json_result': {'$exists': True}},
+        convert=offload_json_result,
+        projection={'json_result': 1, 'podcast_id': 1, 'episode_number': 1, 'assemblyai_id': 1},
+        side_document_class=TranscriptPayload,
+        side_key=['podcast_id', 'episode_number'],
+    ),
+]}
+
+
+async def run_migration(
+        name: str,
+        batch: int = batch_size,
+        workers: int = worker_count,
+        use_processes: bool = True,
+        max_rate: Optional[float] = max_docs_per_second,
+        restart: bool = False,
+) -> MigrationCheckpoint:
+    migration = migrations[name]
+    collection = migration.document_class.get_motor_collection()
+
+    checkpoint = await MigrationCheckpoint.find_one(MigrationCheckpoint.name == name)
+    if checkpoint is None or restart:
+        if checkpoint is not None:
+            await checkpoint.delete()
+        checkpoint = MigrationCheckpoint(name=name)
+        await checkpoint.save()
+
+    if checkpoint.completed_date:
+        print(f'>>> Migration {name}: Completed on {checkpoint.completed_date}, use restart to run it again.')
+        return checkpoint
+
+    remaining = await collection.count_documents(batch_query(migration, checkpoint))
+    print(f'>>> Migration {name}: {migration.description}')
+    print(f'    Resuming after {checkpoint.last_id}, ' if checkpoint.last_id else '    Starting, ', end='')
+    print(f'{remaining:,} documents to go.', flush=True)
+
+    loop = asyncio.get_running_loop()
+    executor_type = concurrent.futures.ProcessPoolExecutor if use_processes else concurrent.futures.ThreadPoolExecutor
+
+    t0 = time.perf_counter()
+    scanned_this_run = 0
+    with executor_type(max_workers=workers) as executor:
+        while True:
+            docs = await collection.find(
+                batch_query(migration, checkpoint), migration.projection
+            ).sort('_id', pymongo.ASCENDING).limit(batch).to_list(None)
+            if not docs:
+                break
+
+            # Conversion is CPU bound, keep it off the event loop and spread it over the pool.
+            size = math.ceil(len(docs) / workers)
+            parts = [docs[idx:idx + size] for idx in range(0, len(docs), size)]
+            results = await asyncio.gather(
+                *(loop.run_in_executor(executor, convert_batch, name, part) for part in parts)
+            )
+
+            operations = []
+            side_operations = []
+            for doc_id, converted, error in (r for part in results for r in part):
+                if error:
+                    checkpoint.failed += 1
+                    print(f'!!! Migration {name}: Could not convert {doc_id}: {error}')
+                elif converted:
+                    update, side_document = converted
+                    operations.append(pymongo.UpdateOne({'_id': doc_id, **migration.query}, update))
+                    if side_document:
+                        side_filter = {k: side_document.get(k) for k in migration.side_key}
+                        side_operations.append(pymongo.ReplaceOne(side_filter, side_document, upsert=True))
+
+            if side_operations:
+                await migration.side_document_class.get_motor_collection().bulk_write(side_operations, ordered=False)
+            if operations:
+                result = await collection.bulk_write(operations, ordered=False)
+                checkpoint.converted += result.modified_count
+
+            checkpoint.last_id = docs[-1]['_id']
+            checkpoint.scanned += len(docs)
+            checkpoint.updated_date = datetime.datetime.now()
+            await checkpoint.save()
+
+            scanned_this_run += len(docs)
+            elapsed = time.perf_counter() - t0
+            print_progress(checkpoint, scanned_this_run, remaining, elapsed)
+
+            if max_rate:
+                # Sleep off however far ahead of the cap this run has gotten.
+                ahead = scanned_this_run / max_rate - elapsed
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+
+    checkpoint.completed_date = datetime.datetime.now()
+    await checkpoint.save()
+
+    dt = time.perf_counter() - t0
+    print(f'<<< Migration {name}: Complete in {dt:,.1f} sec. {checkpoint.scanned:,} scanned, '
+          f'{checkpoint.converted:,} converted, {checkpoint.failed:,} failed.', flush=True)
+
+    return checkpoint
+
+
+def batch_query(migration: Migration, checkpoint: MigrationCheckpoint) -> dict:
+    query = dict(migration.query)
+    if checkpoint.last_id:
+        query['_id'] = {'$gt': checkpoint.last_id}
+
+    return query
+
+
+def convert_batch(name: str, docs: list[dict]) -> list[tuple[Any, ConvertResult, Optional[str]]]:
+    convert = migrations[name].convert
+
+    results = []
+    for doc in docs:
+        # noinspection PyBroadException
+        try:
+            results.append((doc['_id'], convert(doc), None))
+        except Exception as x:
+            results.append((doc['_id'], None, f'{type(x).__name__}: {x}'))
+
+    return results
+
+
+def print_progress(checkpoint: MigrationCheckpoint, scanned_this_run: int, remaining: int, elapsed: float):
+    rate = scanned_this_run / elapsed if elapsed else 0.0
+    left = max(0, remaining - scanned_this_run)
+    eta = f'{left / rate / 60:,.1f} min' if rate else '?'
+
+    print(f'    >>> Migration {checkpoint.name}: {scanned_this_run:,} of {remaining:,} '
+          f'({checkpoint.converted:,} converted, {checkpoint.failed:,} failed overall), '
+          f'{rate:,.0f} docs/sec, ETA {eta}.', flush=True)
@@ -0,0 +1,192 @@
+import array
+import bisect
+import datetime
+import re
+from typing import Iterable, Optional, Sequence
+
+import pymongo
+
+from db.transcript_positions import TermPositions, TranscriptPositions, TranscriptPositionsDates
+from db.transcript_positions import TranscriptPositionsTerms
+from db.transcripts import TranscriptWord
+
+# Timestamps returned per episode, every hit still counts towards ranking.
+hits_per_episode = 5
+# Common phrases ("you know") match most of the catalog, stop decoding positions after this many episodes.
+max_candidate_episodes = 1_000
+
+__word_pattern = re.compile(r'\w+')
+__phrase_pattern = re.compile(r'"([^"]+)"')
+
+
+class PhraseMatch:
+    __slots__ = ['podcast_id', 'episode_number', 'hit_count', 'hit_times']
+
+    def __init__(self, podcast_id: str, episode_number: int, hit_count: int, hit_times: list[float]):
+        self.podcast_id = podcast_id
+        self.episode_number = episode_number
+        self.hit_count = hit_count
+        self.hit_times = hit_times
+
+
+def terms_for_text(text: str) -> list[str]:
+    # Surface words, not lemmas, a quoted phrase should match what was actually said.
+    return __word_pattern.findall(text.lower())
+
+
+def parse_phrase_query(search_text: str) -> Optional[tuple[list[list[str]], list[str]]]:
+    """
+    Splits 'GIL "free threaded python"' into the quoted phrases and the loose words around them.
+    Returns None when there is nothing quoted, so the caller runs a regular search.
+    """
+    phrases = [terms for terms in (terms_for_text(p) for p in __phrase_pattern.findall(search_text or '')) if terms]
+    if not phrases:
+        return None
+
+    words = terms_for_text(__phrase_pattern.sub(' ', search_text))
+    return phrases, words
+
+
+def build_term_positions(words: Iterable[TranscriptWord]) -> tuple[list[TermPositions], int]:
+    positions: dict[str, list[int]] = {}
+    times: dict[str, array.array] = {}
+
+    position = 0
+    for word in words:
+        # A transcript word like "free-threaded" is two terms, both at the time it was spoken.
+        for term in terms_for_text(word.text):
+            positions.setdefault(term, []).append(position)
+            times.setdefault(term, array.array('f')).append(word.start_in_sec)
+            position += 1
+
+    terms = [
+        TermPositions(term=term, positions=encode_positions(positions[term]), times=times[term].tobytes())
+        for term in sorted(positions)
+    ]
+
+    return terms, position
+
+
+def encode_positions(positions: list[int]) -> bytes:
+    # Gaps between sorted offsets are small, as LEB128 varints most of them take a single byte.
+    data = bytearray()
+    previous = 0
+    for position in positions:
+        delta = position - previous
+        previous = position
+        while delta >= 0x80:
+            data.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        data.append(delta)
+
+    return bytes(data)
+
+
+def decode_positions(data: bytes) -> array.array:
+    positions = array.array('I')
+    previous = 0
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+
+        previous += value
+        positions.append(previous)
+        value = 0
+        shift = 0
+
+    return positions
+
+
+def phrase_starts(term_positions: list[array.array]) -> list[int]:
+    # Walk the rarest term and probe the others at their fixed offset from it.
+    rarest = min(range(len(term_positions)), key=lambda i: len(term_positions[i]))
+    others = [(i - rarest, set(p)) for i, p in enumerate(term_positions) if i != rarest]
+
+    return [
+        p - rarest
+        for p in term_positions[rarest]
+        if p >= rarest and all(p + offset in positions for offset, positions in others)
+    ]
+
+
+def phrase_hit_times(terms: list[TermPositions], phrases: list[list[str]]) -> list[float]:
+    """Start times of every phrase occurrence, in transcript order. Empty unless every phrase occurs."""
+    lookup = {t.term: t for t in terms}
+    decoded: dict[str, array.array] = {}
+
+    def positions_for(term: str) -> array.array:
+        if term not in decoded:
+            decoded[term] = decode_positions(lookup[term].positions) if term in lookup else array.array('I')
+        return decoded[term]
+
+    hits: list[tuple[int, float]] = []
+    for phrase in phrases:
+        starts = phrase_starts([positions_for(term) for term in phrase])
+        if not starts:
+            return []
+
+        first_positions = positions_for(phrase[0])
+        first_times = array.array('f')
+        first_times.frombytes(lookup[phrase[0]].times)
+        hits.extend((s, first_times[bisect.bisect_left(first_positions, s)]) for s in starts)
+
+    hits.sort()
+    return [t for _, t in hits]
+
+
+async def find_phrase_matches(phrases: list[list[str]], words: list[str], limit: int) -> list[PhraseMatch]:
+    phrase_terms = sorted({t for phrase in phrases for t in phrase})
+    pipeline = [
+        # Multikey index on terms.term: only episodes that say every word are even looked at.
+        {'$match': {'terms.term': {'$all': sorted(set(phrase_terms) | set(words))}}},
+        {'$limit': max_candidate_episodes},
+        # Ship back the position lists for the phrase words only, not the whole transcript's.
+        {'$project': {
+            'podcast_id': 1,
+            'episode_number': 1,
+            'terms': {'$filter': {'input': '$terms', 'as': 't', 'cond': {'$in': ['$$t.term', phrase_terms]}}},
+        }},
+    ]
+
+    matches: list[PhraseMatch] = []
+    async for doc in TranscriptPositions.get_motor_collection().aggregate(pipeline):
+        record = TranscriptPositionsTerms(**doc)
+        hit_times = phrase_hit_times(record.terms, phrases)
+        if hit_times:
+            matches.append(PhraseMatch(record.podcast_id, record.episode_number, len(hit_times),
+                                       hit_times[:hits_per_episode]))
+
+    matches.sort(key=lambda m: m.hit_count, reverse=True)
+    return matches[:limit]
+
+
+def positions_update(
+        podcast_id: str, episode_number: int, transcript_date: datetime.datetime, words: Sequence[TranscriptWord]
+) -> pymongo.UpdateOne:
+    terms, word_count = build_term_positions(words)
+
+    return pymongo.UpdateOne(
+        {'podcast_id': podcast_id, 'episode_number': episode_number},
+        {'$set': {
+            'created_date': datetime.datetime.now(),
+            'transcript_date': transcript_date,
+            'word_count': word_count,
+            'terms': [t.model_dump() for t in terms],
+        }},
+        upsert=True,
+    )
+
+
+async def save_positions(operations: list[pymongo.UpdateOne]):
+    if operations:
+        await TranscriptPositions.get_motor_collection().bulk_write(operations, ordered=False)
+
+
+async def positions_dates_for_podcast(podcast_id: str) -> list[TranscriptPositionsDates]:
+    return await TranscriptPositions.find(TranscriptPositions.podcast_id == podcast_id).project(
+        TranscriptPositionsDates
+    ).to_list()
@@ -3,7 +3,7 @@ from typing import Optional
 import bson
 import httpx
 from beanie.odm.operators.find.comparison import In
-from db.episode import Episode, EpisodeLightProjection
+from db.episode import Episode, EpisodeLightProjection, EpisodeDatesProjection
 from db.podcast import Podcast
 from db.podcast_image import PodcastImage
 from infrastructure import webutils
@@ -84,6 +84,18 @@ async def episodes_for_podcast_by_numbers_light(
     )
 
 
+async def episodes_for_podcast_by_numbers(podcast_id: str, episode_numbers: list[int]) -> list[Episode]:
+    return (
+        await Episode.find(Episode.podcast_id == podcast_id, In(Episode.episode_number, episode_numbers))
+        .sort('-episode_number')
+        .to_list()
+    )
+
+
+async def episode_dates_for_podcast(podcast_id: str) -> list[EpisodeDatesProjection]:
+    return await Episode.find(Episode.podcast_id == podcast_id).project(EpisodeDatesProjection).to_list()
+
+
 async def follow_podcast(podcast_id: str, user_id: bson.ObjectId):
     user = await user_service.find_user_by_id(user_id)
     if not user:
@@ -0,0 +1,507 @@
+import array
+import bisect
+import datetime
+import heapq
+import math
+from typing import Iterable, Optional
+
+import numpy as np
+
+from db.search_record import SearchRecord, SearchRecordKeywords
+
+# Doc IDs are dense ints handed out in increasing order, so appending to a
+# posting list always keeps it sorted. 'I' is a 4-byte unsigned int on every
+# platform we run on.
+posting_type_code = 'I'
+
+# Compact the posting lists once this fraction of doc IDs are stale re-index leftovers.
+compact_threshold = 0.25
+
+# BM25 tuning, the usual defaults.
+bm25_k1 = 1.2
+bm25_b = 0.75
+
+# Blend in a recency boost on episode_date: 0.0 turns it off, 1.0 ranks on recency alone.
+recency_weight = 0.2
+recency_half_life_days = 365.0
+
+# Prefix ranges up to this many terms are ranked on the fly for suggestions, wider ones
+# (the one and two letter prefixes) keep a cached top list that is updated in place.
+suggestion_scan_limit = 128
+suggestion_pool_size = 20
+
+# Hybrid search: weight of the semantic cosine vs. the (max normalized) BM25 keyword score.
+semantic_weight = 0.5
+
+min_date = datetime.datetime(year=1900, month=1, day=1)
+
+
+class IndexedEpisode:
+    __slots__ = ['podcast_id', 'episode_number', 'episode_date', 'length']
+
+    def __init__(self, podcast_id: str, episode_number: int, episode_date: Optional[datetime.datetime], length: int):
+        self.podcast_id = podcast_id
+        self.episode_number = episode_number
+        self.episode_date = episode_date or min_date
+        self.length = length
+
+
+class VectorStore:
+    """
+    Normalized float32 vectors in one contiguous matrix, each row owned by a doc ID.
+    Grows by doubling so appends are amortized O(1) rather than a copy per episode.
+    """
+
+    def __init__(self):
+        self.matrix: Optional[np.ndarray] = None
+        self.owners = array.array(posting_type_code)
+
+    @property
+    def count(self) -> int:
+        return len(self.owners)
+
+    @property
+    def rows(self) -> Optional[np.ndarray]:
+        return None if self.matrix is None else self.matrix[:self.count]
+
+    def append(self, doc_id: int, vectors: np.ndarray):
+        vectors = np.atleast_2d(vectors).astype(np.float32, copy=False)
+        if not len(vectors):
+            return
+
+        if self.matrix is None:
+            self.matrix = np.empty((max(1_024, len(vectors)), vectors.shape[1]), dtype=np.float32)
+
+        needed = self.count + len(vectors)
+        if needed > len(self.matrix):
+            grown = np.empty((max(needed, 2 * len(self.matrix)), self.matrix.shape[1]), dtype=np.float32)
+            grown[:self.count] = self.matrix[:self.count]
+            self.matrix = grown
+
+        self.matrix[self.count:needed] = vectors
+        self.owners.extend([doc_id] * len(vectors))
+
+    def best_scores(self, query: np.ndarray, document_count: int) -> np.ndarray:
+        """Cosine of each doc's best matching row, -1.0 for docs without vectors."""
+        best = np.full(document_count, -1.0, dtype=np.float32)
+        if not self.count or query.shape[0] != self.matrix.shape[1]:
+            return best
+
+        # One BLAS matrix-vector product for the whole catalog. Doc IDs only ever grow,
+        # so each doc's rows are contiguous and reduceat finds its best chunk in one pass.
+        similarities = self.rows @ query
+        owners = np.frombuffer(self.owners, dtype=np.uint32)
+        starts = np.flatnonzero(np.concatenate(([True], owners[1:] != owners[:-1])))
+        best[owners[starts]] = np.maximum.reduceat(similarities, starts)
+        return best
+
+    def remap(self, new_ids: array.array):
+        keep = [i for i, d in enumerate(self.owners) if new_ids[d] >= 0]
+        owners = array.array(posting_type_code, (new_ids[self.owners[i]] for i in keep))
+        if self.matrix is not None:
+            self.matrix = np.ascontiguousarray(self.matrix[keep])
+        self.owners = owners
+
+
+class TermDictionary:
+    """
+    Sorted keywords for prefix completion, weighted by document frequency.
+    Weights only ever grow between compactions (like the posting lists they mirror),
+    which is what lets the cached top lists be kept current one increment at a time.
+    """
+
+    def __init__(self, weights: Optional[dict[str, int]] = None):
+        self.weights: dict[str, int] = dict(weights or {})
+        self.terms: list[str] = sorted(self.weights)
+        self.top_for_prefix: dict[str, list[str]] = {}
+        self.longest_cached_prefix = 0
+
+    def increment(self, term: str, amount: int = 1):
+        weight = self.weights.get(term)
+        if weight is None:
+            bisect.insort(self.terms, term)
+            weight = 0
+        self.weights[term] = weight + amount
+
+        for size in range(1, min(len(term), self.longest_cached_prefix) + 1):
+            top = self.top_for_prefix.get(term[:size])
+            if top is not None:
+                self.__promote(top, term)
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[str]:
+        if not prefix:
+            return []
+
+        top = self.top_for_prefix.get(prefix)
+        if top is None:
+            lo = bisect.bisect_left(self.terms, prefix)
+            # Every term starting with prefix sorts before prefix + the highest code point.
+            hi = bisect.bisect_left(self.terms, prefix + '\U0010FFFF', lo)
+            top = heapq.nsmallest(max(limit, suggestion_pool_size), self.terms[lo:hi], key=self.__rank)
+            if hi - lo > suggestion_scan_limit:
+                self.top_for_prefix[prefix] = top
+                self.longest_cached_prefix = max(self.longest_cached_prefix, len(prefix))
+
+        return top[:limit]
+
+    def __rank(self, term: str) -> tuple[int, str]:
+        return -self.weights[term], term
+
+    def __promote(self, top: list[str], term: str):
+        if term not in top:
+            if len(top) >= suggestion_pool_size and self.__rank(term) > self.__rank(top[-1]):
+                return
+            top.append(term)
+
+        top.sort(key=self.__rank)
+        del top[suggestion_pool_size:]
+
+
+class InMemorySearchIndex:
+    def __init__(self):
+        self.keyword_ids: dict[str, int] = {}
+        self.postings: list[array.array] = []
+        # Term frequencies, parallel to the doc IDs in postings.
+        self.frequencies: list[array.array] = []
+        self.documents: list[Optional[IndexedEpisode]] = []
+        self.doc_ids: dict[tuple[str, int], int] = {}
+        self.retired_count = 0
+        self.total_length = 0
+        # Per doc ID, parallel to documents, for vectorized scoring.
+        self.lengths = array.array(posting_type_code)
+        self.live = bytearray()
+        # Episode vectors plus transcript chunk vectors, all normalized.
+        self.vectors = VectorStore()
+        # Built once the bulk load is done, kept current incrementally after that.
+        self.term_dictionary: Optional[TermDictionary] = None
+
+    @property
+    def document_count(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def keyword_count(self) -> int:
+        return len(self.keyword_ids)
+
+    def add_episode(
+        self,
+        podcast_id: str,
+        episode_number: int,
+        episode_date: Optional[datetime.datetime],
+        keyword_frequencies: dict[str, int],
+        document_length: int = 0,
+        vectors: Optional[np.ndarray] = None,
+    ):
+        self.remove_episode(podcast_id, episode_number)
+
+        length = document_length or sum(keyword_frequencies.values())
+        doc_id = len(self.documents)
+        self.documents.append(IndexedEpisode(podcast_id, episode_number, episode_date, length))
+        self.doc_ids[(podcast_id, episode_number)] = doc_id
+        self.total_length += length
+        self.lengths.append(length)
+        self.live.append(1)
+
+        if vectors is not None:
+            self.vectors.append(doc_id, vectors)
+
+        for keyword, frequency in keyword_frequencies.items():
+            keyword_id = self.keyword_ids.get(keyword)
+            if keyword_id is None:
+                keyword_id = len(self.postings)
+                self.keyword_ids[keyword] = keyword_id
+                self.postings.append(array.array(posting_type_code))
+                self.frequencies.append(array.array(posting_type_code))
+
+            self.postings[keyword_id].append(doc_id)
+            self.frequencies[keyword_id].append(frequency)
+
+            if self.term_dictionary is not None:
+                self.term_dictionary.increment(keyword)
+
+    def remove_episode(self, podcast_id: str, episode_number: int):
+        doc_id = self.doc_ids.pop((podcast_id, episode_number), None)
+        if doc_id is None:
+            return
+
+        # Leave the doc ID in the posting lists, it is filtered at query time and dropped on compaction.
+        self.total_length -= self.documents[doc_id].length
+        self.documents[doc_id] = None
+        self.live[doc_id] = 0
+        self.retired_count += 1
+
+        if self.retired_count > compact_threshold * len(self.documents):
+            self.compact()
+
+    def update_episode_date(self, podcast_id: str, episode_number: int, episode_date: Optional[datetime.datetime]):
+        doc_id = self.doc_ids.get((podcast_id, episode_number))
+        if doc_id is None:
+            return
+
+        self.documents[doc_id].episode_date = episode_date or min_date
+
+    def find(self, keywords: Iterable[str], limit: int = 100) -> list[IndexedEpisode]:
+        return [doc for _, doc in self.ranked(keywords, limit)]
+
+    def ranked(self, keywords: Iterable[str], limit: int = 100) -> list[tuple[float, IndexedEpisode]]:
+        keyword_ids = []
+        for keyword in set(keywords):
+            keyword_id = self.keyword_ids.get(keyword)
+            if keyword_id is None:
+                return []
+            keyword_ids.append(keyword_id)
+
+        if not keyword_ids:
+            return []
+
+        matches = intersect_postings([self.postings[k] for k in keyword_ids])
+        if not matches:
+            return []
+
+        document_count = len(self.doc_ids)
+        average_length = self.total_length / document_count if document_count else 1.0
+        now = datetime.datetime.now()
+
+        # Document frequency counts retired doc IDs too until compaction, close enough for IDF.
+        terms = [(self.postings[k], self.frequencies[k], idf(document_count, len(self.postings[k])))
+                 for k in keyword_ids]
+
+        def scored():
+            for doc_id in matches:
+                doc = self.documents[doc_id]
+                if doc is None:
+                    continue
+
+                score = 0.0
+                for posting, frequencies, term_idf in terms:
+                    tf = frequencies[bisect.bisect_left(posting, doc_id)]
+                    score += term_idf * bm25_tf(tf, doc.length, average_length)
+
+                if recency_weight:
+                    score *= (1.0 - recency_weight) + recency_weight * recency_decay(doc.episode_date, now)
+
+                yield score, doc
+
+        # Heap based top-k, O(n log k) rather than sorting every match.
+        return heapq.nlargest(limit, scored(), key=lambda pair: pair[0])
+
+    def ranked_semantic(
+        self, query_vector: np.ndarray, limit: int = 100, keywords: Optional[Iterable[str]] = None
+    ) -> list[tuple[float, IndexedEpisode]]:
+        document_count = len(self.documents)
+        if not document_count or limit <= 0:
+            return []
+
+        scores = self.vectors.best_scores(query_vector, document_count)
+        if keywords is not None:
+            # Hybrid: blend in BM25 over docs matching *any* keyword, scaled to 0..1.
+            keyword_scores = self.keyword_scores(keywords)
+            top_keyword = keyword_scores.max()
+            if top_keyword > 0:
+                keyword_scores /= top_keyword
+            scores = semantic_weight * np.clip(scores, 0.0, None) + (1.0 - semantic_weight) * keyword_scores
+
+        # Unrelated, vector-less, and retired docs never make the results.
+        scores[scores <= 0.0] = -np.inf
+        scores[np.frombuffer(self.live, dtype=np.uint8) == 0] = -np.inf
+
+        limit = min(limit, document_count)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+
+        return [(float(scores[i]), self.documents[i]) for i in top if np.isfinite(scores[i])]
+
+    def keyword_scores(self, keywords: Iterable[str]) -> np.ndarray:
+        document_count = len(self.documents)
+        scores = np.zeros(document_count, dtype=np.float32)
+        live_count = len(self.doc_ids)
+        if not live_count:
+            return scores
+
+        lengths = np.frombuffer(self.lengths, dtype=np.uint32).astype(np.float32)
+        average_length = self.total_length / live_count
+        for keyword in set(keywords):
+            keyword_id = self.keyword_ids.get(keyword)
+            if keyword_id is None:
+                continue
+
+            doc_ids = np.frombuffer(self.postings[keyword_id], dtype=np.uint32)
+            tf = np.frombuffer(self.frequencies[keyword_id], dtype=np.uint32).astype(np.float32)
+            norm = bm25_k1 * (1.0 - bm25_b + bm25_b * lengths[doc_ids] / average_length)
+            scores[doc_ids] += idf(live_count, len(doc_ids)) * tf * (bm25_k1 + 1.0) / (tf + norm)
+
+        return scores
+
+    def build_term_dictionary(self) -> TermDictionary:
+        # Document frequency of live docs only, keywords left with none are not suggested.
+        weights = {}
+        for keyword, keyword_id in self.keyword_ids.items():
+            frequency = sum(self.live[d] for d in self.postings[keyword_id])
+            if frequency:
+                weights[keyword] = frequency
+
+        self.term_dictionary = TermDictionary(weights)
+        return self.term_dictionary
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[str]:
+        if self.term_dictionary is None:
+            self.build_term_dictionary()
+
+        return self.term_dictionary.suggest(prefix, limit)
+
+    def compact(self):
+        new_ids = array.array('q', [-1]) * len(self.documents)
+        documents: list[Optional[IndexedEpisode]] = []
+        for old_id, doc in enumerate(self.documents):
+            if doc is None:
+                continue
+            new_ids[old_id] = len(documents)
+            documents.append(doc)
+
+        # Keywords only retired docs had are dropped, along with their (now empty) posting lists.
+        keyword_ids: dict[str, int] = {}
+        postings: list[array.array] = []
+        all_frequencies: list[array.array] = []
+        for keyword, keyword_id in self.keyword_ids.items():
+            posting = self.postings[keyword_id]
+            frequencies = self.frequencies[keyword_id]
+            live = [i for i, d in enumerate(posting) if new_ids[d] >= 0]
+            if not live:
+                continue
+            keyword_ids[keyword] = len(postings)
+            postings.append(array.array(posting_type_code, (new_ids[posting[i]] for i in live)))
+            all_frequencies.append(array.array(posting_type_code, (frequencies[i] for i in live)))
+
+        self.keyword_ids = keyword_ids
+        self.postings = postings
+        self.frequencies = all_frequencies
+
+        self.vectors.remap(new_ids)
+
+        self.documents = documents
+        self.doc_ids = {(d.podcast_id, d.episode_number): doc_id for doc_id, d in enumerate(documents)}
+        self.lengths = array.array(posting_type_code, (d.length for d in documents))
+        self.live = bytearray([1]) * len(documents)
+        self.retired_count = 0
+
+        if self.term_dictionary is not None:
+            self.build_term_dictionary()
+
+
+def idf(document_count: int, document_frequency: int) -> float:
+    return math.log(1.0 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def bm25_tf(tf: int, length: int, average_length: float) -> float:
+    norm = bm25_k1 * (1.0 - bm25_b + bm25_b * length / average_length)
+    return tf * (bm25_k1 + 1.0) / (tf + norm)
+
+
+def recency_decay(episode_date: datetime.datetime, now: datetime.datetime) -> float:
+    # Mixing tz aware RSS dates with naive ones would throw, compare on the naive wall clock.
+    age_days = max(0.0, (now - episode_date.replace(tzinfo=None)).total_seconds() / 86_400)
+    return 0.5 ** (age_days / recency_half_life_days)
+
+
+def intersect_postings(postings: list[array.array]) -> array.array:
+    # Smallest list first: the running result can only shrink, so every later
+    # step is bounded by the rarest keyword rather than the most common one.
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for posting in postings[1:]:
+        if not result:
+            break
+        result = intersect_pair(result, posting)
+
+    return result
+
+
+def intersect_pair(small: array.array, large: array.array) -> array.array:
+    result = array.array(posting_type_code)
+    lo = 0
+    hi = len(large)
+    for doc_id in small:
+        lo = bisect.bisect_left(large, doc_id, lo, hi)
+        if lo == hi:
+            break
+        if large[lo] == doc_id:
+            result.append(doc_id)
+
+    return result
+
+
+index: Optional[InMemorySearchIndex] = None
+
+
+async def load_index() -> InMemorySearchIndex:
+    global index
+
+    t0 = datetime.datetime.now()
+    print('>>> Search Engine: Loading in-memory index ...')
+
+    new_index = InMemorySearchIndex()
+    record: SearchRecordKeywords
+    async for record in SearchRecord.find().project(SearchRecordKeywords):
+        new_index.add_episode(
+            record.podcast_id,
+            record.episode_number,
+            record.episode_date,
+            record.keyword_frequencies(),
+            record.document_length,
+            record.semantic_vectors(),
+        )
+
+    # One sort at the end rather than an insort per new keyword while loading.
+    new_index.build_term_dictionary()
+    index = new_index
+
+    dt = datetime.datetime.now() - t0
+    print(f'<<< Search Engine: Index loaded with {index.document_count:,} episodes, '
+          f'{index.keyword_count:,} keywords, and {index.vectors.count:,} vectors '
+          f'in {dt.total_seconds():,.2f} seconds.', flush=True)
+
+    return index
+
+
+def index_episode(
+    podcast_id: str,
+    episode_number: int,
+    episode_date: Optional[datetime.datetime],
+    keyword_frequencies: dict[str, int],
+    document_length: int,
+    vectors: Optional[np.ndarray] = None,
+):
+    if index is None:
+        return
+
+    index.add_episode(podcast_id, episode_number, episode_date, keyword_frequencies, document_length, vectors)
+
+
+def update_episode_date(podcast_id: str, episode_number: int, episode_date: Optional[datetime.datetime]):
+    if index is None:
+        return
+
+    index.update_episode_date(podcast_id, episode_number, episode_date)
+
+
+def find_episodes(keywords: set[str], limit: int = 100) -> Optional[list[tuple[str, int]]]:
+    if index is None:
+        return None
+
+    return [(d.podcast_id, d.episode_number) for d in index.find(keywords, limit)]
+
+
+def find_episodes_semantic(
+    query_vector: np.ndarray, limit: int = 100, keywords: Optional[set[str]] = None
+) -> Optional[list[tuple[str, int]]]:
+    if index is None:
+        return None
+
+    return [(d.podcast_id, d.episode_number) for _, d in index.ranked_semantic(query_vector, limit, keywords)]
+
+
+def suggest_keywords(prefix: str, limit: int = 10) -> list[str]:
+    if index is None:
+        return []
+
+    return index.suggest(prefix, limit)
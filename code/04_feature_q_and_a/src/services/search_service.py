@@ -1,46 +1,124 @@
 import asyncio
+import collections
 import datetime
-from typing import Optional, Tuple
+import hashlib
+import math
+from typing import Callable, Iterable, Optional, Tuple
 
+import bson
 import html2text
+import numpy as np
 import pydantic
+import pymongo
+import pymongo.errors
 import spacy
+from beanie.odm.operators.find.comparison import In
 from spacy import Language
+from spacy.attrs import IS_PUNCT, IS_SPACE, IS_STOP, ORTH
+from spacy.tokens import Doc
 
-from db.episode import EpisodeLightProjection
+from db.episode import Episode, EpisodeLightProjection
 from db.podcast import Podcast
 from db.search_record import SearchRecord, SearchRecordLite
 from db.transcripts import EpisodeTranscript
-from services import podcast_service, ai_service
+from services import podcast_service, ai_service, search_engine, index_events, phrase_index
 
 indexing_startup = 5  # delay 30s
-indexing_frequency = 60  # 60 * 5  # every 5 minutes
+# Episode and transcript changes are indexed as they happen (see index_events).
+# The periodic full sweep is only a safety net for anything that slipped past.
+indexing_frequency = 60 * 30  # every 30 minutes
+
+# Single-flight guard, only one indexing pass runs per process at a time.
+index_lock = asyncio.Lock()
+
+# 'memory' answers keyword lookups from the in-process index in search_engine,
+# 'mongo' runs them as multikey queries against the search_records collection.
+search_engine_type = 'memory'
+max_search_results = 100
+
+# Search-as-you-type completions, served from the in-memory term dictionary only.
+max_suggestions = 8
+min_suggestion_prefix = 2
+
+# nlp.pipe settings for the indexer. Every extra process holds its own copy of the spaCy model.
+indexing_batch_size = 16
+# Keep this at 1 in the app. The indexer runs on a thread of the live server, and spaCy would fork
+# fresh workers (and reload the model) for every chunk from a process whose other threads may hold
+# locks, a recipe for deadlocks. Offline tools like the lemmatize benchmark can raise it.
+indexing_n_process = 1
+indexing_chunk_size = 128
+
+# Search only ever reads token.lemma_, which comes from tok2vec + tagger + attribute_ruler + lemmatizer.
+# 'full' loads everything, 'lemma-only' skips the parser and NER (same lemmas, less CPU and RAM),
+# 'small' swaps to en_core_web_sm which is a fraction of the memory but can lemmatize a few words differently.
+nlp_profiles: dict[str, tuple[str, list[str]]] = {
+    'full': ('en_core_web_lg', []),
+    'lemma-only': ('en_core_web_lg', ['parser', 'ner']),
+    'small': ('en_core_web_sm', ['parser', 'ner']),
+}
+nlp_profile = 'lemma-only'
 
 nlp: Optional[Language] = None
+# Records are stamped with the model that produced their keywords. If the profile switches to a
+# different model, those records get re-indexed so queries and the index stay lemmatized alike.
+nlp_model: Optional[str] = None
+default_nlp_model = 'en_core_web_lg'
+
+# Semantic search averages the model's word vectors (en_core_web_lg ships 300 dim ones) into one vector
+# per episode plus one per transcript chunk, so a query can match a single topic inside a long episode.
+# Each vector is 1.2 KB in memory, larger chunks mean fewer of them. Models without vectors disable it.
+semantic_search_enabled = True
+semantic_chunk_words = 2_000
+search_modes = ['keyword', 'semantic', 'hybrid']
 
 
 class RawSearchResult(pydantic.BaseModel):
     podcasts: list[Podcast] = []
     episodes: list[EpisodeLightProjection] = []
+    # Quoted phrase searches only: (podcast_id, episode_number) -> seconds into the episode of the first hits.
+    phrase_hits: dict[Tuple[str, int], list[float]] = {}
 
 
-def manually_trigger_index_build():
-    try:
-        # noinspection PyAsyncCall
-        asyncio.create_task(build_index_core())
-    except Exception as x:
-        print(f'!!! ERROR running search index: {x}')
+class IndexingStats:
+    __slots__ = ['skipped', 'upserted', 'bytes_written']
+
+    def __init__(self):
+        self.skipped = 0
+        self.upserted = 0
+        self.bytes_written = 0
+
+    def __str__(self):
+        return (f'{self.upserted:,} records upserted, {self.skipped:,} unchanged and skipped, '
+                f'{self.bytes_written / 1024:,.1f} KB written')
 
 
-async def search(search_text: str) -> RawSearchResult:
+def manually_trigger_index_build(podcast_id: Optional[str] = None):
+    # Queue the work for the indexer task rather than starting a competing pass.
+    if podcast_id:
+        index_events.notify_podcast_changed(podcast_id)
+    else:
+        index_events.request_full_pass()
+
+
+async def search(search_text: str, mode: str = 'keyword') -> RawSearchResult:
     search_enabled = nlp is not None
 
     if not search_enabled:
         print('Search not enabled!')
         return RawSearchResult()
 
+    phrase_query = phrase_index.parse_phrase_query(search_text)
+    if phrase_query:
+        return await search_phrases(*phrase_query)
+
     searchable_words = build_keywords(search_text)
 
+    if mode in ('semantic', 'hybrid'):
+        # None when vectors aren't available, plain keyword search covers that.
+        trimmed_results = search_episodes_semantic(search_text, searchable_words, hybrid=mode == 'hybrid')
+        if trimmed_results is not None:
+            return await hydrate_search_results(trimmed_results)
+
     raw_result = await search_episodes(searchable_words)
     return raw_result
 
@@ -49,42 +127,156 @@ async def search_episodes(searchable_words: set[str]) -> RawSearchResult:
     if not searchable_words:
         return RawSearchResult()
 
+    trimmed_results = None
+    if search_engine_type == 'memory':
+        # None until the index has been loaded, fall back to Mongo until then.
+        trimmed_results = search_engine.find_episodes(searchable_words, max_search_results)
+
+    if trimmed_results is None:
+        trimmed_results = await search_episodes_mongo(searchable_words)
+
+    return await hydrate_search_results(trimmed_results)
+
+
+def suggest(search_text: str, limit: int = max_suggestions) -> list[str]:
+    # Runs on every keystroke: no spaCy and no MongoDB, just the last word against indexed keywords.
+    text = (search_text or '').lower()
+    if not text.strip() or text[-1].isspace():
+        return []
+
+    prefix = text.split()[-1].lstrip('"')
+    if len(prefix) < min_suggestion_prefix:
+        return []
+
+    lead = text[:len(text) - len(prefix)]
+    completions = [k for k in search_engine.suggest_keywords(prefix, limit + 1) if k != prefix]
+
+    return [lead + keyword for keyword in completions[:limit]]
+
+
+async def search_phrases(phrases: list[list[str]], words: list[str]) -> RawSearchResult:
+    matches = await phrase_index.find_phrase_matches(phrases, words, max_search_results)
+
+    raw_result = await hydrate_search_results([(m.podcast_id, m.episode_number) for m in matches])
+    raw_result.phrase_hits = {(m.podcast_id, m.episode_number): m.hit_times for m in matches}
+    return raw_result
+
+
+def search_episodes_semantic(
+        search_text: str, searchable_words: set[str], hybrid: bool
+) -> Optional[list[Tuple[str, int]]]:
+    # The vector matrix only lives in the in-memory engine.
+    if search_engine_type != 'memory' or not semantic_search_available():
+        return None
+
+    query_vectors = semantic_vectors_for_doc(nlp(search_text.lower()))
+    if query_vectors is None:
+        return None
+
+    return search_engine.find_episodes_semantic(
+        query_vectors[0], max_search_results, searchable_words if hybrid else None
+    )
+
+
+async def search_episodes_mongo(searchable_words: set[str]) -> list[Tuple[str, int]]:
     words = list(searchable_words)
     word1 = words[0]
     query = SearchRecord.find(SearchRecord.keywords == word1)
     for word in words[1:]:
         query = query.find(SearchRecord.keywords == word)
 
-    query = query.sort('-episode_date')
+    query = query.sort('-episode_date').limit(max_search_results)
 
     episode_results: list[Tuple[str, int]] = []
     record: SearchRecord
     async for record in query:
         episode_results.append((record.podcast_id, record.episode_number))
 
-    trimmed_results = episode_results[:100]
+    return episode_results[:max_search_results]
+
+
+async def hydrate_search_results(trimmed_results: list[Tuple[str, int]]) -> RawSearchResult:
+    if not trimmed_results:
+        return RawSearchResult()
+
     podcast_ids = {r[0] for r in trimmed_results}
     podcasts = await podcast_service.podcasts_for_ids(list(podcast_ids))
 
-    all_episodes = []
+    episode_lookup: dict[Tuple[str, int], EpisodeLightProjection] = {}
     for podcast in podcasts:
         episode_numbers = [r[1] for r in trimmed_results if r[0] == podcast.id]
 
         episodes = await podcast_service.episodes_for_podcast_by_numbers_light(podcast, episode_numbers)
-        all_episodes.extend(episodes)
+        episode_lookup.update({(e.podcast_id, e.episode_number): e for e in episodes})
 
-    all_episodes.sort(key=lambda e: e.published_date, reverse=True)
+    # Keep the engine's ranking order (relevance in memory, newest first from Mongo).
+    all_episodes = [episode_lookup[r] for r in trimmed_results if r in episode_lookup]
     return RawSearchResult(episodes=all_episodes, podcasts=podcasts)
 
 
 def build_keywords(search_text: str) -> set[str]:
-    searchable_words = set()
-    doc = nlp(search_text.lower())
+    return set(build_keyword_counts(search_text))
+
+
+def build_keyword_counts(search_text: str) -> collections.Counter:
+    return keyword_counts_for_doc(nlp(search_text.lower()))
+
+
+def build_keyword_counts_batch(texts: list[str]) -> list[collections.Counter]:
+    return [keyword_counts_for_doc(doc) for doc in pipe_texts(texts)]
+
+
+def analyze_texts_batch(texts: list[str]) -> list[Tuple[collections.Counter, Optional[np.ndarray]]]:
+    return [(keyword_counts_for_doc(doc), semantic_vectors_for_doc(doc)) for doc in pipe_texts(texts)]
+
+
+def pipe_texts(texts: list[str]) -> Iterable[Doc]:
+    # Worker processes each load their own copy of the model, only worth it for a real backlog (and outside the app).
+    n_process = indexing_n_process if len(texts) > indexing_batch_size else 1
+    return nlp.pipe((t.lower() for t in texts), batch_size=indexing_batch_size, n_process=n_process)
+
+
+def keyword_counts_for_doc(doc: Doc) -> collections.Counter:
+    keyword_counts = collections.Counter()
     for word in doc:
         if word.lemma_ not in common_stop and word.lemma_.strip():
-            searchable_words.add(word.lemma_.lower().strip())
+            keyword_counts[word.lemma_.lower().strip()] += 1
+
+    return keyword_counts
+
+
+def semantic_vectors_for_doc(doc: Doc) -> Optional[np.ndarray]:
+    """
+    Normalized float32 rows: the mean vector of the whole doc, then one per chunk of
+    semantic_chunk_words when the doc is longer than that. None if nothing had a vector.
+    """
+    if not semantic_search_available() or not len(doc):
+        return None
+
+    # Straight to the vectors table with array ops, token.vector per word is far slower on 15k word transcripts.
+    attrs = doc.to_array([ORTH, IS_STOP, IS_PUNCT, IS_SPACE])
+    content = (attrs[:, 1] == 0) & (attrs[:, 2] == 0) & (attrs[:, 3] == 0)
+    vectors = doc.vocab.vectors
+    rows = vectors.find(keys=attrs[content, 0])
+    rows = rows[rows >= 0]
+    if not len(rows):
+        return None
 
-    return searchable_words
+    word_vectors = np.asarray(vectors.data[rows], dtype=np.float32)
+    means = [word_vectors.mean(axis=0)]
+    if len(word_vectors) > semantic_chunk_words:
+        chunk_count = math.ceil(len(word_vectors) / semantic_chunk_words)
+        means.extend(chunk.mean(axis=0) for chunk in np.array_split(word_vectors, chunk_count))
+
+    result = np.vstack(means)
+    norms = np.linalg.norm(result, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+
+    return (result / norms).astype(np.float32)
+
+
+def semantic_search_available() -> bool:
+    return semantic_search_enabled and nlp is not None and nlp.vocab.vectors.size > 0
 
 
 async def search_search_index_task():
@@ -94,30 +286,89 @@ async def search_search_index_task():
         print(">>> Search Engine: Shutting down...")
         return
 
+    if search_engine_type == 'memory':
+        # noinspection PyBroadException
+        try:
+            await search_engine.load_index()
+        except Exception as x:
+            print(f'!!! ERROR loading in-memory search index, using MongoDB for search: {x}')
+
+    # noinspection PyAsyncCall
+    asyncio.create_task(index_events.watch_collections())
+
+    changes: set[Tuple[str, Optional[int]]] = set()
+    full_pass = True
     while True:
         # noinspection PyBroadException
         try:
-            await build_index_core()
+            if full_pass:
+                await build_index_core()
+            else:
+                await build_index_for_changes(changes)
         except Exception as x:
             print(f'!!! ERROR building search index: {x}')
-        finally:
-            await asyncio.sleep(indexing_frequency)
+
+        changes, full_pass = await index_events.wait_for_changes(timeout=indexing_frequency)
 
 
 async def build_index_core():
-    t0 = datetime.datetime.now()
-    print('>>> Search Engine: Indexing starting... ')
+    async with index_lock:
+        t0 = datetime.datetime.now()
+        print('>>> Search Engine: Indexing starting... ')
 
-    podcasts = await podcast_service.all_podcast()
-    for podcast in podcasts:
-        print(f'    >>> Search Engine: Indexing {podcast.title} ...', flush=True)
-        await build_index_for_podcast(podcast)
+        stats = IndexingStats()
+        podcasts = await podcast_service.all_podcast()
+        for podcast in podcasts:
+            print(f'    >>> Search Engine: Indexing {podcast.title} ...', flush=True)
+            await build_index_for_podcast(podcast, stats)
+
+        dt = datetime.datetime.now() - t0
+        print(f'<<< Search Engine: Indexing complete in {dt.total_seconds():,.0f} seconds: {stats}.', flush=True)
+
+
+async def build_index_for_changes(changes: set[Tuple[str, Optional[int]]]):
+    if not changes:
+        return
 
-    dt = datetime.datetime.now() - t0
-    print(f'<<< Search Engine: Indexing complete in {dt.total_seconds():,.0f} seconds.', flush=True)
+    async with index_lock:
+        t0 = datetime.datetime.now()
+        print(f'>>> Search Engine: Indexing {len(changes):,} changed items ...')
 
+        by_podcast: dict[str, set[Optional[int]]] = collections.defaultdict(set)
+        for podcast_id, episode_number in changes:
+            by_podcast[podcast_id].add(episode_number)
+
+        stats = IndexingStats()
+        for podcast in await podcast_service.podcasts_for_ids(list(by_podcast)):
+            episode_numbers = by_podcast[podcast.id]
+            if None in episode_numbers:
+                await build_index_for_podcast(podcast, stats)
+            else:
+                await index_episodes(podcast, sorted(episode_numbers), stats)
+
+        dt = datetime.datetime.now() - t0
+        print(f'<<< Search Engine: Incremental indexing complete in {dt.total_seconds():,.1f} seconds: {stats}.',
+              flush=True)
+
+
+async def build_index_for_podcast(podcast: Podcast, stats: IndexingStats):
+    records = await search_records_lite_for_podcast(podcast.id)
+    # Records without a document length predate BM25 term frequencies, and records built with another
+    # spaCy model would not match query lemmas. Leave both out so they get re-indexed.
+    episode_to_record_date: dict[int: datetime.datetime] = {
+        r.episode_number: r.created_date
+        for r in records
+        if r.document_length and (r.nlp_model or default_nlp_model) == nlp_model
+    }
+
+    changed_numbers = await changed_episode_numbers(podcast.id, episode_to_record_date)
+    await index_episodes(podcast, changed_numbers, stats)
+
+
+async def index_episodes(podcast: Podcast, episode_numbers: list[int], stats: IndexingStats):
+    if not episode_numbers:
+        return
 
-async def build_index_for_podcast(podcast: Podcast):
     html_converter = html2text.HTML2Text(bodywidth=10_000)
     html_converter.ignore_links = True
 
@@ -133,69 +384,186 @@ async def build_index_for_podcast(podcast: Podcast):
             + (podcast.category or '')
     )
 
-    records = await search_records_lite_for_podcast(podcast.id)
-    episode_to_record_date: dict[int: datetime.datetime] = {r.episode_number: r.created_date for r in records}
-
-    for ep in await podcast_service.episodes_for_podcast(podcast):
-        if not await has_changed_contents(episode_to_record_date, ep.podcast_id, ep.episode_number):
-            # print(f'>>> Search Engine: NO CHANGES for episode {ep.episode_number} {ep.title}')
-            continue
+    changed_episodes = await podcast_service.episodes_for_podcast_by_numbers(podcast.id, episode_numbers)
 
-        print(f'        >>> Search Engine: Indexing episode {ep.title}')
+    # Lemmatize in chunks so a full rebuild neither holds every transcript in memory
+    # nor waits until the very end to write anything back.
+    for idx in range(0, len(changed_episodes), indexing_chunk_size):
+        chunk = changed_episodes[idx:idx + indexing_chunk_size]
 
-        desc = html_converter.handle(ep.description or '')
-        episode_text = (ep.title or '') + ' ' + desc + ' ' + ' '.join(ep.tags) + ' '
-        episode_text += ' ' + base_text + ' '
+        texts = []
+        positions_updates = []
+        for ep in chunk:
+            print(f'        >>> Search Engine: Indexing episode {ep.title}')
+            transcript: Optional[EpisodeTranscript] = await ai_service.full_transcript_for_episode(
+                ep.podcast_id, ep.episode_number
+            )
+            texts.append(episode_search_text(ep, transcript, base_text, html_converter))
 
-        transcript: Optional[EpisodeTranscript] = await ai_service.full_transcript_for_episode(
-            podcast.id,
-            ep.episode_number)
+            if transcript:
+                # Even without words, an empty record stamped with the transcript's date
+                # keeps has_stale_positions() from sending the episode back every sweep.
+                positions_updates.append(await asyncio.to_thread(
+                    phrase_index.positions_update,
+                    ep.podcast_id, ep.episode_number, transcript.updated_date, transcript.transcript_words,
+                ))
 
-        if transcript:
-            transcript_text = ' '.join(w.text for w in transcript.words)
-            episode_text += (
-                    ' ' + (transcript.summary_bullets or '') + ' ' +
-                    (transcript.summary_tldr or '') + ' ' + transcript_text
-            )
+        # nlp.pipe is CPU bound for minutes on a big catalog, keep it off the event loop.
+        analyses = await asyncio.to_thread(analyze_texts_batch, texts)
 
-        keywords: set[str] = build_keywords(episode_text.lower())
+        await save_search_records(podcast.id, chunk, analyses, stats)
+        await phrase_index.save_positions(positions_updates)
 
-        record: Optional[SearchRecord] = await search_record_for_episode(podcast.id, ep.episode_number)
 
-        if record is None:
-            record = SearchRecord(
-                podcast_id=podcast.id, episode_number=ep.episode_number, episode_id=ep.id, keywords=set()
-            )
+def episode_search_text(
+        ep: Episode, transcript: Optional[EpisodeTranscript], base_text: str, html_converter: html2text.HTML2Text
+) -> str:
+    desc = html_converter.handle(ep.description or '')
+    episode_text = (ep.title or '') + ' ' + desc + ' ' + ' '.join(ep.tags) + ' '
+    episode_text += ' ' + base_text + ' '
 
-        record.keywords = keywords
-        record.created_date = max(datetime.datetime.now(), ep.published_date)
-        record.episode_date = ep.published_date
+    if transcript:
+        transcript_text = transcript.transcript_string
+        episode_text += (
+                ' ' + (transcript.summary_bullets or '') + ' ' +
+                (transcript.summary_tldr or '') + ' ' + transcript_text
+        )
 
-        await record.save()
+    return episode_text.lower()
 
 
-async def has_changed_contents(
-        episode_to_record_date: dict[int: datetime.datetime], podcast_id: str, episode_number: int
+async def save_search_records(
+        podcast_id: str,
+        episodes: list[Episode],
+        analyses: list[Tuple[collections.Counter, Optional[np.ndarray]]],
+        stats: IndexingStats,
 ):
-    search_date = episode_to_record_date.get(episode_number)
+    existing = {
+        r.episode_number: r
+        for r in await SearchRecord.find(
+            SearchRecord.podcast_id == podcast_id, In(SearchRecord.episode_number, [e.episode_number for e in episodes])
+        ).project(SearchRecordLite).to_list()
+    }
+
+    operations = []
+    # Applied to the in-memory index only once the records are saved, so the two never disagree.
+    index_updates = []
+    for ep, (keyword_counts, vectors) in zip(episodes, analyses):
+        keywords = sorted(keyword_counts)
+        counts = [keyword_counts[k] for k in keywords]
+        keywords_hash = hash_keywords(keywords, counts, vectors is not None)
+
+        record_filter = {'podcast_id': ep.podcast_id, 'episode_number': ep.episode_number}
+        dates = {'created_date': max(datetime.datetime.now(), ep.published_date), 'episode_date': ep.published_date}
+
+        previous = existing.get(ep.episode_number)
+        if previous and previous.keywords_hash == keywords_hash and previous.nlp_model == nlp_model:
+            # Same lemmas as last time: only bump the dates so change detection settles,
+            # rather than rewriting the keywords array and its multikey index entries.
+            update = {'$set': dates}
+            stats.skipped += 1
+
+            # The keywords stand, but the episode may have been re-dated, which the recency boost ranks on.
+            index_updates.append((len(operations), search_engine.update_episode_date, (
+                ep.podcast_id, ep.episode_number, ep.published_date
+            )))
+        else:
+            update = {'$set': {
+                **dates,
+                'episode_id': ep.id,
+                'keywords': keywords,
+                'keyword_counts': counts,
+                'document_length': sum(counts),
+                'keywords_hash': keywords_hash,
+                'nlp_model': nlp_model,
+                'semantic_vectors_data': vectors.tobytes() if vectors is not None else None,
+                'semantic_vector_dims': vectors.shape[1] if vectors is not None else 0,
+            }}
+            stats.upserted += 1
+
+            index_updates.append((len(operations), search_engine.index_episode, (
+                ep.podcast_id, ep.episode_number, ep.published_date, dict(zip(keywords, counts)), sum(counts), vectors
+            )))
+
+        stats.bytes_written += len(bson.encode(update))
+        operations.append(pymongo.UpdateOne(record_filter, update, upsert=True))
+
+    try:
+        if operations:
+            await SearchRecord.get_motor_collection().bulk_write(operations, ordered=False)
+    except pymongo.errors.BulkWriteError as x:
+        # Unordered, so the rest were saved. Their hashes now match and later passes skip them, index them now.
+        failed = {e['index'] for e in x.details.get('writeErrors', [])}
+        apply_index_updates([u for u in index_updates if u[0] not in failed])
+        raise
+
+    apply_index_updates(index_updates)
+
+
+def apply_index_updates(index_updates: list[tuple[int, Callable, tuple]]):
+    for _, apply, args in index_updates:
+        apply(*args)
+
+
+def hash_keywords(keywords: list[str], counts: list[int], has_vectors: bool = False) -> str:
+    md5 = hashlib.md5()
+    for keyword, count in zip(keywords, counts):
+        md5.update(f'{keyword}\t{count}\n'.encode('utf-8'))
+
+    if has_vectors:
+        # Turning on vectors, or changing the chunking, must rewrite otherwise unchanged records.
+        md5.update(f'vectors\t{semantic_chunk_words}\n'.encode('utf-8'))
+
+    return md5.hexdigest()
+
+
+async def changed_episode_numbers(podcast_id: str, episode_to_record_date: dict[int: datetime.datetime]) -> list[int]:
+    # Two bulk projections per podcast, diffed in memory, rather than two queries per episode.
+    episode_dates = await podcast_service.episode_dates_for_podcast(podcast_id)
+    transcript_dates = {
+        t.episode_number: t.updated_date for t in await ai_service.transcript_dates_for_podcast(podcast_id)
+    }
+    positions_dates = {
+        p.episode_number: p.transcript_date for p in await phrase_index.positions_dates_for_podcast(podcast_id)
+    }
+
+    return [
+        e.episode_number
+        for e in episode_dates
+        if has_changed_contents(
+            episode_to_record_date.get(e.episode_number), e.published_date, transcript_dates.get(e.episode_number)
+        )
+        or has_stale_positions(transcript_dates.get(e.episode_number), positions_dates.get(e.episode_number))
+    ]
+
+
+def has_changed_contents(
+        search_date: Optional[datetime.datetime],
+        published_date: Optional[datetime.datetime],
+        transcript_date: Optional[datetime.datetime],
+) -> bool:
     if not search_date:
         # print('Returning TRUE, there are changes')
         return True
 
     changed_date = datetime.datetime(year=1900, month=1, day=1)
 
-    episode = await podcast_service.episode_lite_by_number(podcast_id, episode_number)
-
-    if episode and episode.published_date > changed_date:
-        changed_date = episode.published_date
+    if published_date and published_date > changed_date:
+        changed_date = published_date
 
-    transcript = await ai_service.transcript_lite_for_episode(podcast_id, episode_number)
-    if transcript and transcript.updated_date > changed_date:
-        changed_date = transcript.updated_date
+    if transcript_date and transcript_date > changed_date:
+        changed_date = transcript_date
 
     return changed_date >= search_date
 
 
+def has_stale_positions(
+        transcript_date: Optional[datetime.datetime], positions_date: Optional[datetime.datetime]
+) -> bool:
+    # Phrase positions are stamped with the transcript they came from, any other date means rebuild them.
+    return transcript_date is not None and transcript_date != positions_date
+
+
 async def search_record_for_episode(podcast_id: str, episode_number: int) -> Optional[SearchRecord]:
     record = await SearchRecord.find(
         SearchRecord.podcast_id == podcast_id, SearchRecord.episode_number == episode_number
@@ -218,15 +586,20 @@ async def latest_search_record_for_podcast(podcast_id: str) -> Optional[SearchRe
     return record
 
 
-def load_search_model() -> bool:
-    global nlp
+def load_search_model(profile: Optional[str] = None) -> bool:
+    global nlp, nlp_model
+    profile = profile or nlp_profile
+    model_name, excluded = nlp_profiles[profile]
+
     # noinspection PyBroadException
     try:
-        nlp = spacy.load('en_core_web_lg')
+        nlp = spacy.load(model_name, exclude=excluded)
+        nlp_model = model_name
+        print(f'>>> Search Engine: Loaded spaCy {model_name} with the {profile} profile: {", ".join(nlp.pipe_names)}')
         return True
     except Exception:
         print('WARNING: Search disabled. You must download the spacy model once to use search.')
-        print('Run: python -m spacy download en_core_web_lg in the virtual env for this project.')
+        print(f'Run: python -m spacy download {model_name} in the virtual env for this project.')
         return False
 
 
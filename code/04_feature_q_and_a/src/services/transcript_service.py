@@ -1,56 +1,175 @@
-from typing import Iterable
+import bisect
+import collections
+import datetime
+import math
+from typing import Any, Callable, Optional, Sequence
 
-from db.transcripts import TranscriptWord
+from db.transcripts import EpisodeTranscriptWords, PackedSentences, PackedWordSequence
 from services import ai_service
 
+# Decoded transcripts (sentences and timing tracks each) held in memory, a long episode is a few thousand sentences.
+sentence_cache_size = 64
+# Sentences rendered per request on the transcript page, later ones load as the reader scrolls.
+sentences_per_page = 150
+timing_track_version = 1
+# Words either side of the playback position returned by a timing window lookup.
+timing_window_words = 20
+
 
 class Sentence:
-    __slots__ = ['text', 'time']
+    __slots__ = ['text', 'time', 'word_index']
 
-    def __init__(self, text: str, time: float):
+    def __init__(self, text: str, time: float, word_index: int = 0):
         self.text = text
         self.time = time
+        # Index of the sentence's first word in the transcript, to line it up with the timing track.
+        self.word_index = word_index
+
+
+class TranscriptPage:
+    __slots__ = ['sentences', 'page', 'page_count']
+
+    def __init__(self, sentences: list[Sentence], page: int, page_count: int):
+        self.sentences = sentences
+        self.page = page
+        self.page_count = page_count
+
+    @property
+    def has_previous(self) -> bool:
+        return self.page > 0
+
+    @property
+    def has_next(self) -> bool:
+        return self.page + 1 < self.page_count
+
 
+class TimingTrack:
+    """
+    Start time of every word, for following along with the audio. Sentences are runs of words
+    starting at sentence_starts, matching the data-word attribute on the transcript page.
+    """
+    __slots__ = ['starts', 'texts', 'sentence_starts']
 
-transcript_cache: dict[(str, int): list[Sentence]] = {}
+    def __init__(self, starts: list[float], texts: Sequence[str], sentence_starts: list[int]):
+        self.starts = starts
+        self.texts = texts
+        self.sentence_starts = sentence_starts
+
+    def word_at(self, seconds: float) -> int:
+        """Index of the word being said at seconds, -1 before the first word."""
+        return bisect.bisect_right(self.starts, seconds) - 1
+
+    def window(self, seconds: float, size: int) -> list[tuple[int, float, str]]:
+        index = max(self.word_at(seconds), 0)
+        first = max(index - size, 0)
+        last = min(index + size + 1, len(self.starts))
+
+        return [(idx, self.starts[idx], self.texts[idx]) for idx in range(first, last)]
+
+    def to_json(self) -> dict:
+        # Delta encoded, most words are well under a second apart so each is a few digits of JSON.
+        starts_ms = [int(round(t * 1000)) for t in self.starts]
+        return {
+            'version': timing_track_version,
+            'count': len(starts_ms),
+            'starts_ms': [b - a for a, b in zip([0] + starts_ms, starts_ms)],
+            'sentence_starts': [b - a for a, b in zip([0] + self.sentence_starts, self.sentence_starts)],
+        }
+
+
+# Keyed on the transcript's updated_date too, so a re-transcribed episode is never served from a stale entry.
+transcript_cache: collections.OrderedDict[tuple[str, int, datetime.datetime], list[Sentence]] = \
+    collections.OrderedDict()
+timing_cache: collections.OrderedDict[tuple[str, int, datetime.datetime], TimingTrack] = collections.OrderedDict()
 
 
 async def transcript_text_for_episode(podcast_id: str, episode_number: int) -> list[Sentence]:
+    sentences = await __cached_for_episode(transcript_cache, podcast_id, episode_number, sentences_for_transcript)
+    return sentences or []
+
+
+async def timing_track_for_episode(podcast_id: str, episode_number: int) -> Optional[TimingTrack]:
+    return await __cached_for_episode(timing_cache, podcast_id, episode_number, timing_track_for_transcript)
+
+
+async def __cached_for_episode(
+        cache: collections.OrderedDict, podcast_id: str, episode_number: int,
+        build: Callable[[EpisodeTranscriptWords], Any]
+) -> Any:
+    # Just the date first, the words are only loaded on a cache miss.
+    dates = await ai_service.transcript_date_for_episode(podcast_id, episode_number)
+    if not dates:
+        return None
+
+    key = (podcast_id, episode_number, dates.updated_date)
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+        return value
+
     db_tx = await ai_service.transcript_words_for_episode(podcast_id, episode_number)
-    if not db_tx or not db_tx.words:
-        return []
+    if not db_tx or not db_tx.transcript_words:
+        return None
+
+    value = build(db_tx)
+
+    cache[(podcast_id, episode_number, db_tx.updated_date)] = value
+    while len(cache) > sentence_cache_size:
+        cache.popitem(last=False)
+
+    return value
+
+
+async def transcript_page_for_episode(
+        podcast_id: str, episode_number: int, page: int = 0, linked_time: Optional[float] = None
+) -> TranscriptPage:
+    """
+    One page of the transcript. With linked_time, the page holding the sentence being said at that time
+    (as linked from search results) rather than the page number given.
+    """
+    sentences = await transcript_text_for_episode(podcast_id, episode_number)
+    page_count = math.ceil(len(sentences) / sentences_per_page)
+
+    if linked_time is not None and sentences:
+        index = max(0, bisect.bisect_right(sentences, linked_time, key=lambda s: s.time) - 1)
+        page = index // sentences_per_page
+
+    page = min(max(page, 0), max(page_count - 1, 0))
+    start = page * sentences_per_page
+
+    return TranscriptPage(sentences[start:start + sentences_per_page], page, page_count)
+
 
-    sentences = words_to_sentences(db_tx.words)
-    return list(sentences)
+def sentences_for_transcript(db_tx: EpisodeTranscriptWords) -> list[Sentence]:
+    texts = word_texts(db_tx)
+    start_indexes, end_indexes, start_times = packed_sentences_for(db_tx, texts).bounds()
 
+    return [
+        Sentence(' '.join(texts[start:end]).strip(), time, start)
+        for start, end, time in zip(start_indexes.tolist(), end_indexes.tolist(), start_times.tolist())
+    ]
 
-def words_to_sentences(words: Iterable[TranscriptWord]) -> Iterable[Sentence]:
-    active_words = []
-    active_sentence = False
-    start_time = 0.0
 
-    for word in words:
-        if not active_sentence:
-            start_time = word.start_in_sec
-            active_sentence = True
+def timing_track_for_transcript(db_tx: EpisodeTranscriptWords) -> TimingTrack:
+    texts = word_texts(db_tx)
+    start_indexes, _, _ = packed_sentences_for(db_tx, texts).bounds()
 
-        active_words.append(word.text)
-        if __is_end_of_sentence(word.text):
-            sentence_text = ' '.join(active_words).strip()
-            sentence = Sentence(sentence_text, start_time)
+    return TimingTrack(list(word_starts(db_tx)), texts, start_indexes.tolist())
 
-            active_sentence = False
-            start_time = 0.0
-            active_words.clear()
 
-            yield sentence
+def word_texts(db_tx: EpisodeTranscriptWords) -> Sequence[str]:
+    words = db_tx.transcript_words
+    return words.texts if isinstance(words, PackedWordSequence) else [w.text for w in words]
 
 
-__end_punctuation = {'.', '?', '!'}
+def word_starts(db_tx: EpisodeTranscriptWords) -> Sequence[float]:
+    words = db_tx.transcript_words
+    return words.starts.tolist() if isinstance(words, PackedWordSequence) else [w.start_in_sec for w in words]
 
 
-def __is_end_of_sentence(text_fragment: str) -> bool:
-    if not text_fragment:
-        return False
+def packed_sentences_for(db_tx: EpisodeTranscriptWords, texts: Sequence[str]) -> PackedSentences:
+    if db_tx.packed_sentences is not None:
+        return db_tx.packed_sentences
 
-    return text_fragment[-1] in __end_punctuation
+    # Saved before sentences were stored and not migrated yet, segment on the fly.
+    return PackedSentences.from_words(texts, word_starts(db_tx))
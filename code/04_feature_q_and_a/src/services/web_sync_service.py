@@ -10,7 +10,7 @@ import parsel
 from db.episode import Episode
 from db.podcast import Podcast
 from infrastructure import webutils, date_data
-from services import podcast_service
+from services import podcast_service, index_events
 
 
 async def podcast_from_url(url: str) -> Optional[Podcast]:
@@ -235,6 +235,7 @@ async def add_episodes_for_new_podcast(podcast: Podcast, channel: Element):
 
     if episodes_to_add:
         await Episode.insert_many(episodes_to_add)
+        index_events.notify_podcast_changed(podcast.id)
 
 
 def __get_feed_date_text(d):
@@ -1,10 +1,171 @@
 function onLoad() {
-    var elements = document.getElementsByClassName('transcript-sentence');
+    bindTranscriptSentences(document.body);
+    // Later pages of the transcript arrive through htmx as the reader scrolls.
+    document.body.addEventListener('htmx:load', function (e) { return bindTranscriptSentences(e.target); });
+    seekToLinkedTime();
+    followAlong();
+}
+function bindTranscriptSentences(root) {
+    if (root.classList.contains('transcript-sentence')) {
+        root.addEventListener('click', playAtTime);
+    }
+    var elements = root.getElementsByClassName('transcript-sentence');
     for (var i = 0; i < elements.length; i++) {
         var element = elements[i];
         element.addEventListener('click', playAtTime);
     }
 }
+function seekToLinkedTime() {
+    // Search hits link here with ?t=<seconds>, jump to the sentence being said at that time.
+    var linked_time = parseFloat(new URLSearchParams(window.location.search).get('t'));
+    if (isNaN(linked_time)) {
+        return;
+    }
+    var player = document.getElementById('audio');
+    if (player) {
+        player.currentTime = linked_time;
+    }
+    // The server renders the transcript page holding that sentence, this only loads it when some other page is shown.
+    showTranscriptAt(linked_time, function () {
+        var linked_element = sentenceAt(linked_time);
+        if (linked_element) {
+            linked_element.classList.add('bg-green-200');
+            linked_element.scrollIntoView({ block: 'center' });
+        }
+    });
+}
+function sentenceAt(seconds) {
+    var elements = document.getElementsByClassName('transcript-sentence');
+    var element = null;
+    for (var i = 0; i < elements.length; i++) {
+        if (parseFloat(elements[i].getAttribute('data-time')) > seconds) {
+            break;
+        }
+        element = elements[i];
+    }
+    return element;
+}
+var transcriptPageRequested = false;
+function showTranscriptAt(seconds, done) {
+    // Swaps in the transcript page holding seconds, which the page route resolves from t, unless it is loaded already.
+    var pages = document.querySelector('[data-page-url]');
+    if (!pages || isTranscriptLoadedAt(pages, seconds)) {
+        done();
+        return;
+    }
+    if (transcriptPageRequested) {
+        return;
+    }
+    transcriptPageRequested = true;
+    var url = "".concat(pages.getAttribute('data-page-url'), "/0?t=").concat(seconds, "&direction=both");
+    var finished = function () {
+        transcriptPageRequested = false;
+        done();
+    };
+    htmx.ajax('GET', url, { target: pages, swap: 'innerHTML' }).then(finished, finished);
+}
+function isTranscriptLoadedAt(pages, seconds) {
+    var sentences = pages.getElementsByClassName('transcript-sentence');
+    if (!sentences.length) {
+        return false;
+    }
+    // Not loaded when it is past either end of the loaded sentences and there are more pages that way.
+    var first = parseFloat(sentences[0].getAttribute('data-time'));
+    var last = parseFloat(sentences[sentences.length - 1].getAttribute('data-time'));
+    if (seconds < first && pages.querySelector('.transcript-loader[data-direction="earlier"]')) {
+        return false;
+    }
+    return !(seconds > last && pages.querySelector('.transcript-loader[data-direction="later"]'));
+}
+// Word start times (seconds) and the index of each sentence's first word, from the timing track endpoint.
+var timingTrack = null;
+var timingTrackRequested = false;
+var currentWord = null;
+function followAlong() {
+    // Highlight the word being said as the episode plays, the timing track is only fetched once it does.
+    var player = document.getElementById('audio');
+    var transcript = document.querySelector('[data-timing-url]');
+    if (!player || !transcript) {
+        return;
+    }
+    player.addEventListener('play', function () { return loadTimingTrack(transcript.getAttribute('data-timing-url')); });
+    player.addEventListener('timeupdate', function () { return highlightWordAt(player.currentTime); });
+}
+function loadTimingTrack(url) {
+    if (timingTrackRequested) {
+        return;
+    }
+    timingTrackRequested = true;
+    fetch(url)
+        .then(function (response) { return response.ok ? response.json() : null; })
+        .then(function (track) {
+        if (!track) {
+            return;
+        }
+        timingTrack = {
+            starts: undelta(track.starts_ms).map(function (ms) { return ms / 1000; }),
+            sentenceStarts: undelta(track.sentence_starts),
+        };
+    });
+}
+function undelta(deltas) {
+    var total = 0;
+    return deltas.map(function (d) { return total += d; });
+}
+function bisectRight(values, x) {
+    var lo = 0;
+    var hi = values.length;
+    while (lo < hi) {
+        var mid = (lo + hi) >> 1;
+        if (x < values[mid]) {
+            hi = mid;
+        }
+        else {
+            lo = mid + 1;
+        }
+    }
+    return lo;
+}
+function highlightWordAt(seconds) {
+    if (!timingTrack) {
+        return;
+    }
+    var word = bisectRight(timingTrack.starts, seconds) - 1;
+    var sentence_start = timingTrack.sentenceStarts[bisectRight(timingTrack.sentenceStarts, word) - 1];
+    var sentence = word < 0 ? null : document.querySelector(".transcript-sentence[data-word=\"".concat(sentence_start, "\"]"));
+    if (word >= 0 && !sentence) {
+        // That page of the transcript hasn't been loaded, bring it in and highlight on a later timeupdate.
+        showTranscriptAt(timingTrack.starts[sentence_start], function () { return null; });
+    }
+    var element = sentence ? wordsOf(sentence, sentence_start)[word - sentence_start] : null;
+    if (element === currentWord) {
+        return;
+    }
+    if (currentWord) {
+        currentWord.classList.remove('transcript-word-current');
+    }
+    currentWord = element;
+    if (currentWord) {
+        currentWord.classList.add('transcript-word-current');
+    }
+}
+function wordsOf(sentence, first_word) {
+    // Sentences are rendered as plain text, split one into word spans the first time it is played.
+    var text = sentence.getElementsByClassName('sentence-text')[0];
+    if (!text.hasAttribute('data-split')) {
+        var words = text.textContent.split(' ');
+        text.textContent = '';
+        for (var i = 0; i < words.length; i++) {
+            var span = document.createElement('span');
+            span.className = 'transcript-word';
+            span.setAttribute('data-time', String(timingTrack.starts[first_word + i]));
+            span.textContent = words[i];
+            text.append(span, i + 1 < words.length ? ' ' : '');
+        }
+        text.setAttribute('data-split', '');
+    }
+    return text.getElementsByClassName('transcript-word');
+}
 function playAtTime(e) {
     var target = e.target;
     var player = document.getElementById('audio');
@@ -1,5 +1,21 @@
+// htmx is loaded by the layout, ahead of this script.
+declare const htmx: any;
+
 function onLoad() {
-    let elements = document.getElementsByClassName('transcript-sentence')
+    bindTranscriptSentences(document.body);
+    // Later pages of the transcript arrive through htmx as the reader scrolls.
+    document.body.addEventListener('htmx:load', (e) => bindTranscriptSentences(e.target as Element));
+
+    seekToLinkedTime();
+    followAlong();
+}
+
+function bindTranscriptSentences(root: Element) {
+    if (root.classList.contains('transcript-sentence')) {
+        root.addEventListener('click', playAtTime);
+    }
+
+    let elements = root.getElementsByClassName('transcript-sentence')
 
     for (let i = 0; i < elements.length; i++) {
         let element = elements[i];
@@ -7,6 +23,177 @@ function onLoad() {
     }
 }
 
+function seekToLinkedTime() {
+    // Search hits link here with ?t=<seconds>, jump to the sentence being said at that time.
+    const linked_time = parseFloat(new URLSearchParams(window.location.search).get('t'));
+    if (isNaN(linked_time)) {
+        return;
+    }
+
+    const player = document.getElementById('audio') as HTMLAudioElement;
+    if (player) {
+        player.currentTime = linked_time;
+    }
+
+    // The server renders the transcript page holding that sentence, this only loads it when some other page is shown.
+    showTranscriptAt(linked_time, () => {
+        const linked_element = sentenceAt(linked_time);
+        if (linked_element) {
+            linked_element.classList.add('bg-green-200');
+            linked_element.scrollIntoView({block: 'center'});
+        }
+    });
+}
+
+function sentenceAt(seconds: number): Element {
+    let elements = document.getElementsByClassName('transcript-sentence')
+    let element = null;
+    for (let i = 0; i < elements.length; i++) {
+        if (parseFloat(elements[i].getAttribute('data-time')) > seconds) {
+            break;
+        }
+        element = elements[i];
+    }
+    return element;
+}
+
+let transcriptPageRequested = false;
+
+function showTranscriptAt(seconds: number, done: () => void) {
+    // Swaps in the transcript page holding seconds, which the page route resolves from t, unless it is loaded already.
+    const pages = document.querySelector('[data-page-url]');
+    if (!pages || isTranscriptLoadedAt(pages, seconds)) {
+        done();
+        return;
+    }
+    if (transcriptPageRequested) {
+        return;
+    }
+    transcriptPageRequested = true;
+
+    const url = `${pages.getAttribute('data-page-url')}/0?t=${seconds}&direction=both`;
+    const finished = () => {
+        transcriptPageRequested = false;
+        done();
+    };
+    htmx.ajax('GET', url, {target: pages, swap: 'innerHTML'}).then(finished, finished);
+}
+
+function isTranscriptLoadedAt(pages: Element, seconds: number): boolean {
+    const sentences = pages.getElementsByClassName('transcript-sentence');
+    if (!sentences.length) {
+        return false;
+    }
+
+    // Not loaded when it is past either end of the loaded sentences and there are more pages that way.
+    const first = parseFloat(sentences[0].getAttribute('data-time'));
+    const last = parseFloat(sentences[sentences.length - 1].getAttribute('data-time'));
+    if (seconds < first && pages.querySelector('.transcript-loader[data-direction="earlier"]')) {
+        return false;
+    }
+    return !(seconds > last && pages.querySelector('.transcript-loader[data-direction="later"]'));
+}
+
+// Word start times (seconds) and the index of each sentence's first word, from the timing track endpoint.
+let timingTrack: { starts: number[], sentenceStarts: number[] } = null;
+let timingTrackRequested = false;
+let currentWord: Element = null;
+
+function followAlong() {
+    // Highlight the word being said as the episode plays, the timing track is only fetched once it does.
+    const player = document.getElementById('audio') as HTMLAudioElement;
+    const transcript = document.querySelector('[data-timing-url]');
+    if (!player || !transcript) {
+        return;
+    }
+
+    player.addEventListener('play', () => loadTimingTrack(transcript.getAttribute('data-timing-url')));
+    player.addEventListener('timeupdate', () => highlightWordAt(player.currentTime));
+}
+
+function loadTimingTrack(url: string) {
+    if (timingTrackRequested) {
+        return;
+    }
+    timingTrackRequested = true;
+
+    fetch(url)
+        .then(response => response.ok ? response.json() : null)
+        .then(track => {
+            if (!track) {
+                return;
+            }
+            timingTrack = {
+                starts: undelta(track.starts_ms).map(ms => ms / 1000),
+                sentenceStarts: undelta(track.sentence_starts),
+            };
+        });
+}
+
+function undelta(deltas: number[]): number[] {
+    let total = 0;
+    return deltas.map(d => total += d);
+}
+
+function bisectRight(values: number[], x: number): number {
+    let lo = 0;
+    let hi = values.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (x < values[mid]) {
+            hi = mid;
+        } else {
+            lo = mid + 1;
+        }
+    }
+    return lo;
+}
+
+function highlightWordAt(seconds: number) {
+    if (!timingTrack) {
+        return;
+    }
+
+    const word = bisectRight(timingTrack.starts, seconds) - 1;
+    const sentence_start = timingTrack.sentenceStarts[bisectRight(timingTrack.sentenceStarts, word) - 1];
+    const sentence = word < 0 ? null : document.querySelector(`.transcript-sentence[data-word="${sentence_start}"]`);
+    if (word >= 0 && !sentence) {
+        // That page of the transcript hasn't been loaded, bring it in and highlight on a later timeupdate.
+        showTranscriptAt(timingTrack.starts[sentence_start], () => null);
+    }
+    const element = sentence ? wordsOf(sentence, sentence_start)[word - sentence_start] : null;
+    if (element === currentWord) {
+        return;
+    }
+
+    if (currentWord) {
+        currentWord.classList.remove('transcript-word-current');
+    }
+    currentWord = element;
+    if (currentWord) {
+        currentWord.classList.add('transcript-word-current');
+    }
+}
+
+function wordsOf(sentence: Element, first_word: number): HTMLCollection {
+    // Sentences are rendered as plain text, split one into word spans the first time it is played.
+    const text = sentence.getElementsByClassName('sentence-text')[0];
+    if (!text.hasAttribute('data-split')) {
+        const words = text.textContent.split(' ');
+        text.textContent = '';
+        for (let i = 0; i < words.length; i++) {
+            const span = document.createElement('span');
+            span.className = 'transcript-word';
+            span.setAttribute('data-time', String(timingTrack.starts[first_word + i]));
+            span.textContent = words[i];
+            text.append(span, i + 1 < words.length ? ' ' : '');
+        }
+        text.setAttribute('data-split', '');
+    }
+
+    return text.getElementsByClassName('transcript-word');
+}
+
 function playAtTime(e) {
     const target = e.target;
     const player = document.getElementById('audio') as HTMLAudioElement;
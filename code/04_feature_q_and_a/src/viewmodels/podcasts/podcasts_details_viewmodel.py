@@ -4,7 +4,8 @@ from starlette.requests import Request
 
 from db.episode import EpisodeLightProjection
 from db.podcast import Podcast
-from services import podcast_service
+from db.transcripts import EpisodeAIStatus
+from services import podcast_service, ai_service
 from viewmodels.shared.viewmodel_base import ViewModelBase
 
 
@@ -23,6 +24,7 @@ class PodcastDetailsViewModel(ViewModelBase):
         self.podcast: Optional[Podcast] = None
         self.user_podcasts: list[Podcast] = []
         self.episodes: list[EpisodeLightProjection] = []
+        self.ai_statuses: dict[int, EpisodeAIStatus] = {}
         self.shorten_text = shorten_text
 
     async def load_data(self):
@@ -37,3 +39,4 @@ class PodcastDetailsViewModel(ViewModelBase):
         self.podcast = await podcast_service.podcast_by_id(self.podcast_id)
         if self.podcast:
             self.episodes = await podcast_service.episodes_for_podcast_light(self.podcast)
+            self.ai_statuses = await ai_service.ai_status_for_episodes(self.podcast.id)
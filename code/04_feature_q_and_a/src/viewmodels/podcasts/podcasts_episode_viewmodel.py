@@ -4,9 +4,9 @@ from starlette.requests import Request
 
 from db.episode import Episode
 from db.podcast import Podcast
-from db.transcripts import EpisodeTranscriptSummary
+from db.transcripts import EpisodeAIStatus, EpisodeTranscriptSummary
 from services import podcast_service, ai_service, transcript_service
-from services.transcript_service import Sentence
+from services.transcript_service import Sentence, TranscriptPage
 from viewmodels.shared.viewmodel_base import ViewModelBase
 
 
@@ -19,7 +19,10 @@ class PodcastEpisodeViewModel(ViewModelBase):
         self.episode: Optional[Episode] = None
 
         self.transcript_sentences: list[Sentence] = []
+        self.transcript_page: Optional[TranscriptPage] = None
+        self.transcript_page_url = f'/podcasts/hx-transcript/{podcast_id}/episode/{episode_number}/page'
         self.ai_summary: Optional[EpisodeTranscriptSummary] = None
+        self.ai_status: Optional[EpisodeAIStatus] = None
 
         self.transcript_url: Optional[str] = None
         self.summary_url: Optional[str] = None
@@ -32,17 +35,24 @@ class PodcastEpisodeViewModel(ViewModelBase):
 
         self.podcast = await podcast_service.podcast_by_id(self.podcast_id)
         self.episode = await podcast_service.episode_by_number(self.podcast_id, self.episode_number)
-        self.ai_summary = await ai_service.summary_for_episode(self.podcast_id, self.episode_number)
-        self.transcript_sentences = await transcript_service.transcript_text_for_episode(
-            self.podcast_id, self.episode_number
-        )
+        self.ai_status = await ai_service.ai_status_for_episode(self.podcast_id, self.episode_number)
+        if self.ai_status.has_summary:
+            self.ai_summary = await ai_service.summary_for_episode(self.podcast_id, self.episode_number)
 
         tx_url = f'/podcasts/transcript/{self.podcast_id}/episode/{self.episode_number}'
-        self.transcript_url = None if not self.transcript_sentences else tx_url
+        self.transcript_url = None if not self.ai_status.has_transcript else tx_url
 
         summary_url = f'/podcasts/summary/{self.podcast_id}/episode/{self.episode_number}'
         self.summary_url = None if not self.ai_summary else summary_url
 
+    async def load_transcript(self, linked_time: Optional[float] = None):
+        # Only the transcript page renders the sentences, the episode page just needs the status.
+        # Just the first page (or the one holding linked_time), later pages load as the reader scrolls.
+        self.transcript_page = await transcript_service.transcript_page_for_episode(
+            self.podcast_id, self.episode_number, linked_time=linked_time
+        )
+        self.transcript_sentences = self.transcript_page.sentences
+
     @classmethod
     def seconds_to_time_text(cls, total_seconds: float) -> str:
         if total_seconds is None:
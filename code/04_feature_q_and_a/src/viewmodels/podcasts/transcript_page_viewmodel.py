@@ -0,0 +1,31 @@
+from typing import Optional
+
+from starlette.requests import Request
+
+from services import transcript_service
+from services.transcript_service import TranscriptPage
+from viewmodels.podcasts.podcasts_episode_viewmodel import PodcastEpisodeViewModel
+from viewmodels.shared.viewmodel_base import ViewModelBase
+
+
+class TranscriptPageViewModel(ViewModelBase):
+    def __init__(self, request: Request, podcast_id: str, episode_number: int, page: int, direction: str,
+                 linked_time: Optional[float] = None):
+        super().__init__(request)
+        self.podcast_id: str = podcast_id
+        self.episode_number: int = episode_number
+        self.page: int = page
+        # 'earlier' or 'later', which way the reader is paging, so only that way's loader is rendered.
+        # 'both' when jumping to linked_time, the page then replaces the loaded ones and pages either way.
+        self.direction: str = direction if direction in {'earlier', 'later', 'both'} else 'later'
+        # Seconds into the episode, the page holding that time is rendered rather than page.
+        self.linked_time: Optional[float] = linked_time
+
+        self.transcript_page: Optional[TranscriptPage] = None
+        self.transcript_page_url = f'/podcasts/hx-transcript/{podcast_id}/episode/{episode_number}/page'
+        self.to_time_text = PodcastEpisodeViewModel.seconds_to_time_text
+
+    async def load_data(self):
+        self.transcript_page = await transcript_service.transcript_page_for_episode(
+            self.podcast_id, self.episode_number, self.page, linked_time=self.linked_time
+        )
@@ -6,16 +6,21 @@ from starlette.requests import Request
 from db.episode import EpisodeLightProjection
 from db.podcast import Podcast
 from services import search_service
+from viewmodels.podcasts.podcasts_episode_viewmodel import PodcastEpisodeViewModel
 from viewmodels.shared.viewmodel_base import ViewModelBase
 
 
 class SearchResultsViewModel(ViewModelBase):
-    def __init__(self, request: Request, search_text: Optional[str]):
+    def __init__(self, request: Request, search_text: Optional[str], mode: Optional[str] = None):
         super().__init__(request)
         self.search_text: Optional[str] = search_text
+        self.mode: str = mode if mode in search_service.search_modes else 'keyword'
+        self.semantic_available: bool = search_service.semantic_search_available()
         self.episodes: list[EpisodeLightProjection] = []
         self.podcasts: list[Podcast] = []
         self.podcast_lookup: dict[str, Podcast] = {}
+        self.phrase_hits: dict[tuple[str, int], list[float]] = {}
+        self.to_time_text = PodcastEpisodeViewModel.seconds_to_time_text
         self.elapsed_time: float = 0.0
 
     async def load(self):
@@ -23,10 +28,11 @@ class SearchResultsViewModel(ViewModelBase):
             return
 
         t0 = datetime.datetime.now()
-        raw_search = await search_service.search(self.search_text)
+        raw_search = await search_service.search(self.search_text, self.mode)
         self.episodes = raw_search.episodes
         self.podcasts = raw_search.podcasts
         self.podcast_lookup = {p.id: p for p in self.podcasts}
+        self.phrase_hits = raw_search.phrase_hits
 
         dt = datetime.datetime.now() - t0
         self.elapsed_time = dt.total_seconds()
@@ -0,0 +1,18 @@
+from typing import Optional
+from urllib.parse import quote_plus
+
+from starlette.requests import Request
+
+from services import search_service
+from viewmodels.shared.viewmodel_base import ViewModelBase
+
+
+class SearchSuggestionsViewModel(ViewModelBase):
+    def __init__(self, request: Request, search_text: Optional[str]):
+        super().__init__(request)
+        self.search_text: Optional[str] = search_text
+        self.suggestions: list[str] = []
+        self.url_quote = quote_plus
+
+    async def load(self):
+        self.suggestions = search_service.suggest(self.search_text)
@@ -5,7 +5,7 @@ from starlette.requests import Request
 
 from db.job import JobActions
 from infrastructure import webutils
-from services import background_service
+from services import background_service, job_scheduler
 from viewmodels.ai.check_job_viewmodel import CheckJobViewModel
 from viewmodels.ai.start_job_viewmodel import StartJobViewModel
 
@@ -16,7 +16,10 @@ router = fastapi.APIRouter()
 @fastapi_chameleon.template('ai/job_running.html')
 async def start_job(request: Request, action: JobActions, podcast_id: str, episode_number: int):
     vm = StartJobViewModel(request, podcast_id, episode_number, action)
-    job = await background_service.create_background_job(action, podcast_id, episode_number)
+    # Someone is watching this one, it goes ahead of bulk work.
+    job = await background_service.create_background_job(
+        action, podcast_id, episode_number, job_scheduler.interactive_priority, vm.user_id
+    )
     vm.job_id = job.id
 
     return vm.to_dict()
@@ -1,18 +1,22 @@
+from typing import Optional
+
 import fastapi
 import fastapi_chameleon
 from starlette import status
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import JSONResponse, Response, StreamingResponse
 
 from db.podcast import Podcast
 from infrastructure import webutils
-from services import web_sync_service, podcast_service, user_service, search_service, ai_service
+from services import web_sync_service, podcast_service, user_service, search_service, ai_service, export_service
+from services import transcript_service
 from viewmodels.podcasts.episode_chat_viewmodel import EpisodeChatViewModel
 from viewmodels.podcasts.follow_podcast_viewmodel import FollowPodcastViewModel
 from viewmodels.podcasts.podcasts_details_viewmodel import PodcastDetailsViewModel
 from viewmodels.podcasts.podcasts_episode_viewmodel import PodcastEpisodeViewModel
 from viewmodels.podcasts.podcasts_followed_viewmodel import PodcastFollowedViewModel
 from viewmodels.podcasts.podcasts_index_viewmodel import PodcastIndexViewModel
+from viewmodels.podcasts.transcript_page_viewmodel import TranscriptPageViewModel
 
 router = fastapi.APIRouter()
 
@@ -54,7 +58,7 @@ async def index_post(request: Request):
         print(f'Created {podcast}')
         if vm.user:
             await podcast_service.follow_podcast(podcast.id, vm.user_id)
-        search_service.manually_trigger_index_build()
+        search_service.manually_trigger_index_build(podcast.id)
 
         return webutils.redirect_to(f'/podcasts/details/{podcast.id}')
     except Exception as x:
@@ -132,9 +136,81 @@ async def image(podcast_id: str, ext: str):
 
 @router.get('/podcasts/transcript/{podcast_id}/episode/{episode_number}')
 @fastapi_chameleon.template('podcasts/transcript.html')
-async def transcript(request: Request, podcast_id: str, episode_number: int):
+async def transcript(request: Request, podcast_id: str, episode_number: int, t: Optional[float] = None):
     vm = PodcastEpisodeViewModel(request, podcast_id, episode_number)
     await vm.load_data()
+    await vm.load_transcript(linked_time=t)
+    return vm.to_dict()
+
+
+@router.get('/podcasts/transcript/{podcast_id}/episode/{episode_number}/export.{export_format}')
+async def transcript_export(request: Request, podcast_id: str, episode_number: int, export_format: str):
+    if not export_service.is_export_format(export_format):
+        return webutils.return_not_found()
+
+    # Revalidations only cost the date lookup, the words are loaded when there is something to send.
+    dates = await ai_service.transcript_date_for_episode(podcast_id, episode_number)
+    if not dates:
+        return webutils.return_not_found()
+
+    etag = export_service.export_etag(podcast_id, episode_number, export_format, dates.updated_date)
+    headers = {'ETag': etag, 'Cache-Control': 'public, no-cache'}
+    if export_service.etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    db_tx = await ai_service.transcript_words_for_episode(podcast_id, episode_number)
+    if not db_tx or not db_tx.transcript_words:
+        return webutils.return_not_found()
+
+    headers['ETag'] = export_service.export_etag(podcast_id, episode_number, export_format, db_tx.updated_date)
+    filename = export_service.export_filename(podcast_id, episode_number, export_format)
+    headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+    return StreamingResponse(
+        export_service.export_transcript(db_tx, export_format),
+        media_type=export_service.export_media_types[export_format],
+        headers=headers,
+    )
+
+
+@router.get('/podcasts/timing/{podcast_id}/episode/{episode_number}')
+async def timing_track(request: Request, podcast_id: str, episode_number: int):
+    dates = await ai_service.transcript_date_for_episode(podcast_id, episode_number)
+    if not dates:
+        return webutils.return_not_found()
+
+    etag = export_service.export_etag(podcast_id, episode_number, 'timing', dates.updated_date)
+    headers = {'ETag': etag, 'Cache-Control': 'public, no-cache'}
+    if export_service.etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    track = await transcript_service.timing_track_for_episode(podcast_id, episode_number)
+    if not track:
+        return webutils.return_not_found()
+
+    return JSONResponse(track.to_json(), headers=headers)
+
+
+@router.get('/podcasts/timing/{podcast_id}/episode/{episode_number}/window')
+async def timing_window(podcast_id: str, episode_number: int, t: float,
+                        size: int = transcript_service.timing_window_words):
+    track = await transcript_service.timing_track_for_episode(podcast_id, episode_number)
+    if not track:
+        return webutils.return_not_found()
+
+    size = min(max(size, 0), 10 * transcript_service.timing_window_words)
+    return {
+        'index': track.word_at(t),
+        'words': [{'index': idx, 'start': round(start, 3), 'text': text} for idx, start, text in track.window(t, size)],
+    }
+
+
+@router.get('/podcasts/hx-transcript/{podcast_id}/episode/{episode_number}/page/{page}')
+@fastapi_chameleon.template('podcasts/partials/transcript-page.html')
+async def transcript_page(request: Request, podcast_id: str, episode_number: int, page: int,
+                          direction: str = 'later', t: Optional[float] = None):
+    vm = TranscriptPageViewModel(request, podcast_id, episode_number, page, direction, linked_time=t)
+    await vm.load_data()
     return vm.to_dict()
 
 
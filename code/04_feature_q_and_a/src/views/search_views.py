@@ -7,20 +7,30 @@ from starlette.requests import Request
 from services import search_service
 from services.search_service import RawSearchResult
 from viewmodels.search.search_results_viewmodel import SearchResultsViewModel
+from viewmodels.search.search_suggestions_viewmodel import SearchSuggestionsViewModel
 
 router = fastapi.APIRouter()
 
 
 @router.get('/search')
 @fastapi_chameleon.template('search/index.html')
-def search_get(request: Request):
-    return SearchResultsViewModel(request, '').to_dict()
+def search_get(request: Request, search_text: Optional[str] = None, mode: Optional[str] = None):
+    return SearchResultsViewModel(request, search_text or '', mode).to_dict()
 
 
 @router.get('/search/hx-search')
 @fastapi_chameleon.template('search/partials/search_results.html')
-async def search_hx_results(request: Request, search_text: Optional[str] = None):
-    vm = SearchResultsViewModel(request, search_text)
+async def search_hx_results(request: Request, search_text: Optional[str] = None, mode: Optional[str] = None):
+    vm = SearchResultsViewModel(request, search_text, mode)
+    await vm.load()
+
+    return vm.to_dict()
+
+
+@router.get('/search/hx-suggest')
+@fastapi_chameleon.template('search/partials/suggestions.html')
+async def search_hx_suggest(request: Request, search_text: Optional[str] = None):
+    vm = SearchSuggestionsViewModel(request, search_text)
     await vm.load()
 
     return vm.to_dict()